@@ -0,0 +1,282 @@
+"""
+Benchmarks offline del pipeline: parseo (por fuente, tamaño y motor),
+formato, envío con un Bot falso y el camino completo de obtener_mensaje()
+sirviendo las páginas desde snapshots en modo replay (sin red).
+
+Uso (desde la raíz del proyecto):
+    python benchmarks/bench_parrilla.py                   # ejecutar y comparar con la línea base
+    python benchmarks/bench_parrilla.py --guardar         # guardar los resultados como línea base
+    python benchmarks/bench_parrilla.py --guardar --referencia  # actualizar la línea base versionada
+    python benchmarks/bench_parrilla.py --filtro parseo   # solo los casos que contienen 'parseo'
+    python benchmarks/bench_parrilla.py grabar            # grabar las páginas reales como fixtures
+
+La línea base se guarda en src/data/benchmarks/baseline.json (depende de la
+máquina, no se versiona). Termina con código 1 si algún caso es más lento o
+usa más memoria que la línea base por encima de la tolerancia. Sin línea base
+propia se compara con la de referencia versionada en benchmarks/baseline.json:
+como es de otra máquina, las diferencias se informan pero no fallan.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(os.path.dirname(DIRECTORIO), 'src')
+sys.path[:0] = [SRC, DIRECTORIO]
+# Igual que el bot: config/.env, data/ y logs/ relativos a src
+os.chdir(SRC)
+os.environ.setdefault('PARSE_POOL_MODE', 'inline')
+os.environ['SNAPSHOTS_DIR'] = tempfile.mkdtemp(prefix='bench_snapshots_')
+# Sin cache persistente ni archivo: cada caso mide el camino en frío
+os.environ['WARM_CACHE_DB'] = ''
+os.environ['HISTORIAL_DB'] = ''
+
+import bot_parrilla as bp  # noqa: E402
+# Sin la pausa entre partes el envío directo mide solo su propio coste
+bp.PAUSA_ENTRE_PARTES = 0
+import fixtures  # noqa: E402
+from servicios.difusion import Difusor  # noqa: E402
+from servicios.http_cliente import cerrar_http_cliente, get_http_cliente  # noqa: E402
+from servicios.mensajes import MensajeRenderizado  # noqa: E402
+from servicios.metricas import metricas  # noqa: E402
+from servicios.parser_backend import BACKENDS  # noqa: E402
+from servicios.parser_incremental import TablasIncrementales  # noqa: E402
+from servicios.snapshots import SnapshotStore  # noqa: E402
+
+BASELINE = os.path.join('data', 'benchmarks', 'baseline.json')
+REFERENCIA = os.path.join(DIRECTORIO, 'baseline.json')
+# Diferencias menores se consideran ruido aunque superen la tolerancia relativa
+MINIMO_MS = 0.5
+MINIMO_KB = 64
+
+
+class BotFalso:
+    """Bot sin red: acepta send_message y cuenta mensajes y caracteres"""
+
+    def __init__(self):
+        self.mensajes = 0
+        self.caracteres = 0
+
+    async def send_message(self, chat_id, text, parse_mode=None, **kwargs):
+        self.mensajes += 1
+        self.caracteres += len(text)
+
+
+def medir(funcion, repeticiones: int) -> dict:
+    """Mediana y mínimo de 'repeticiones' ejecuciones y pico de memoria de una más"""
+    funcion()  # calentamiento (imports, caches de clasificación...)
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'mediana_ms': round(statistics.median(tiempos) * 1000, 3),
+        'min_ms': round(min(tiempos) * 1000, 3),
+        'pico_kb': round(pico / 1024, 1),
+    }
+
+
+def parsear_incremental(html: str, fragmento: int = 16384):
+    """Parrilla de FutbolRed alimentada en fragmentos como llegaría de la red (STREAMING_PARSE)"""
+    incremental = TablasIncrementales()
+    partidos_por_fecha = {}
+    for i in range(0, len(html), fragmento):
+        bp.FutbolRedScraper._extraer_tablas(incremental.alimentar(html[i:i + fragmento]), partidos_por_fecha)
+    bp.FutbolRedScraper._extraer_tablas(incremental.cerrar(), partidos_por_fecha)
+    return partidos_por_fecha
+
+
+def motores_instalados():
+    instalados = []
+    for nombre, clase in BACKENDS.items():
+        try:
+            clase()
+            instalados.append(nombre)
+        except ImportError:
+            pass
+    return instalados
+
+
+def casos(loop: asyncio.AbstractEventLoop):
+    """(nombre, función) de cada caso; las páginas se generan una sola vez"""
+    paginas_fr = fixtures.paginas('futbolred')
+    paginas_pdh = fixtures.paginas('partidos_de_hoy')
+    ejecutar = loop.run_until_complete
+
+    for tamano, html in paginas_fr.items():
+        for motor in motores_instalados():
+            yield f'parseo/futbolred/{tamano}/{motor}', lambda h=html, m=motor: bp.FutbolRedScraper.parsear_parrilla(h, m)
+        yield f'parseo/futbolred/{tamano}/incremental', lambda h=html: parsear_incremental(h)
+    for tamano, html in paginas_pdh.items():
+        for motor in motores_instalados():
+            yield f'parseo/partidos_de_hoy/{tamano}/{motor}', lambda h=html, m=motor: bp.PartidosDeHoyScrapper.parsear(h, m)
+
+    for tamano, html in paginas_fr.items():
+        por_fecha = bp.FutbolRedScraper.parsear_parrilla(html, 'auto')
+        todos = [p for partidos in por_fecha.values() for p in partidos]
+        semana = {bp.DateUtils.get_fecha_es(f): partidos for f, partidos in sorted(por_fecha.items())}
+        yield f'formato/dia/{tamano}', lambda t=todos: MensajeRenderizado.desde_bloques(
+            bp.DataFormatter.bloques_partidos(t, 'hoy'))
+        yield f'formato/semana/{tamano}', lambda s=semana: MensajeRenderizado.desde_bloques(
+            bp.DataFormatter.bloques_resumen_semanal(s))
+
+        # Envío del mensaje semanal a 50 chats sin límite de tasa: coste propio del camino de envío
+        partes = MensajeRenderizado.desde_bloques(bp.DataFormatter.bloques_resumen_semanal(semana)).partes
+
+        def envio(p=partes):
+            difusor = Difusor(BotFalso(), tasa_global=1e9, concurrencia=20, intervalo_por_chat=0)
+            ejecutar(difusor.difundir([str(i) for i in range(50)], p))
+        yield f'envio/50chats/{tamano}', envio
+
+        # Envío directo de las mismas partes a un chat (enviar_texto, /semana del modo cron)
+        def directo(p=partes):
+            ejecutar(bp.enviar_partes(BotFalso(), '1', p))
+        yield f'envio/directo/{tamano}', directo
+
+    # Camino completo: descarga (snapshot en replay), parseo, agregación y formato sin caches
+    for tamano in fixtures.TAMANOS:
+        def completo(tipo, t=tamano):
+            bp.snapshot_store = SnapshotStore(os.path.join(os.environ['SNAPSHOTS_DIR'], t), replay=True)
+            bp.snapshot_store.guardar(bp.URL, paginas_fr[t])
+            bp.snapshot_store.guardar(bp.PartidosDeHoyScrapper.URL, paginas_pdh[t])
+
+            def ejecutar_tipo():
+                bp._ultimo_parseo.clear()
+                bp.servicio.cache.invalidar()
+                bp.cache_mensajes.invalidar()
+                ejecutar(bp.obtener_mensaje(tipo))
+            return ejecutar_tipo
+        for tipo in ('hoy', 'semana'):
+            yield f'completo/{tipo}/{tamano}', completo(tipo)
+
+
+def comparar(resultados: dict, baseline: dict, tolerancia: float) -> list:
+    regresiones = []
+    for nombre, actual in resultados.items():
+        previo = baseline.get(nombre)
+        if previo is None:
+            continue
+        if (actual['mediana_ms'] > previo['mediana_ms'] * (1 + tolerancia)
+                and actual['mediana_ms'] - previo['mediana_ms'] > MINIMO_MS):
+            regresiones.append(f"{nombre}: {previo['mediana_ms']:.2f} ms -> {actual['mediana_ms']:.2f} ms")
+        if (actual['pico_kb'] > previo['pico_kb'] * (1 + tolerancia)
+                and actual['pico_kb'] - previo['pico_kb'] > MINIMO_KB):
+            regresiones.append(f"{nombre}: {previo['pico_kb']:.0f} KB -> {actual['pico_kb']:.0f} KB")
+    return regresiones
+
+
+def ejecutar_benchmarks(argumentos) -> int:
+    # Los logs por tabla falsearían los tiempos
+    logging.getLogger('ParrillaCronBot').setLevel(logging.WARNING)
+
+    # Sin línea base de esta máquina se compara con la de referencia
+    origen = REFERENCIA if argumentos.referencia or not os.path.exists(BASELINE) else BASELINE
+    referencia = origen == REFERENCIA
+    baseline = {}
+    if os.path.exists(origen):
+        with open(origen, encoding='utf-8') as f:
+            baseline = json.load(f).get('resultados', {})
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    resultados = {}
+    print(f"{'caso':<44} {'mediana ms':>11} {'min ms':>9} {'pico KB':>9} {'vs base':>8}")
+    try:
+        for nombre, funcion in casos(loop):
+            if argumentos.filtro and argumentos.filtro not in nombre:
+                continue
+            if nombre.startswith('completo/'):
+                metricas.reiniciar()
+            resultado = resultados[nombre] = medir(funcion, argumentos.repeticiones)
+            previo = baseline.get(nombre)
+            delta = f"{(resultado['mediana_ms'] / previo['mediana_ms'] - 1) * 100:+.0f}%" if previo else ''
+            print(f"{nombre:<44} {resultado['mediana_ms']:>11.2f} {resultado['min_ms']:>9.2f} "
+                  f"{resultado['pico_kb']:>9.0f} {delta:>8}")
+            if nombre.startswith('completo/') and argumentos.etapas:
+                for fila in metricas.etapas():
+                    if fila['n']:
+                        print(f"    {fila['etapa']:<12} {fila['etiquetas']:<26} media {fila['media'] * 1000:8.2f} ms")
+    finally:
+        loop.run_until_complete(cerrar_http_cliente())
+        bp.parse_pool.cerrar()
+        loop.close()
+        shutil.rmtree(os.environ['SNAPSHOTS_DIR'], ignore_errors=True)
+
+    if argumentos.guardar:
+        destino = REFERENCIA if argumentos.referencia else os.path.join(SRC, BASELINE)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        if argumentos.filtro and referencia == argumentos.referencia:
+            # Guardar solo los casos ejecutados sin perder el resto de la línea base
+            resultados = {**baseline, **resultados}
+        with open(destino, 'w', encoding='utf-8') as f:
+            json.dump({'guardado_en': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': sys.version.split()[0],
+                       'parseo': os.environ['PARSE_POOL_MODE'], 'resultados': resultados}, f, indent=2)
+            f.write('\n')
+        print(f"\n💾 Línea base guardada en {destino}")
+        return 0
+
+    regresiones = comparar(resultados, baseline, argumentos.tolerancia)
+    if not baseline:
+        print("\nℹ️ Sin línea base: ejecuta con --guardar para crearla")
+    elif referencia:
+        print(f"\nℹ️ Comparado con la línea base de referencia ({len(regresiones)} diferencias por encima de la "
+              f"tolerancia, informativas: es de otra máquina). Ejecuta con --guardar para crear la de esta máquina")
+        for regresion in regresiones:
+            print(f"   {regresion}")
+    elif regresiones:
+        print(f"\n❌ {len(regresiones)} regresiones (tolerancia {argumentos.tolerancia:.0%}):")
+        for regresion in regresiones:
+            print(f"   {regresion}")
+        return 1
+    else:
+        print(f"\n✅ Sin regresiones respecto a la línea base (tolerancia {argumentos.tolerancia:.0%})")
+    return 0
+
+
+async def grabar():
+    """Descarga las páginas reales de cada fuente como fixtures"""
+    os.makedirs(fixtures.DIRECTORIO, exist_ok=True)
+    try:
+        for fuente, url in (('futbolred', bp.URL), ('partidos_de_hoy', bp.PartidosDeHoyScrapper.URL)):
+            respuesta = await get_http_cliente().get(url)
+            ruta = os.path.join(fixtures.DIRECTORIO, f'{fuente}.html')
+            with open(ruta, 'w', encoding='utf-8') as f:
+                f.write(respuesta.text)
+            print(f"💾 {url} -> {ruta} ({len(respuesta.text) // 1024} KB)")
+    finally:
+        await cerrar_http_cliente()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks offline del bot de la parrilla')
+    parser.add_argument('comando', nargs='?', choices=('ejecutar', 'grabar'), default='ejecutar')
+    parser.add_argument('--repeticiones', type=int, default=10)
+    parser.add_argument('--filtro', default='', help='solo los casos cuyo nombre contiene este texto')
+    parser.add_argument('--tolerancia', type=float, default=0.25, help='empeoramiento admitido (0.25 = 25%%)')
+    parser.add_argument('--guardar', action='store_true', help='guardar los resultados como línea base')
+    parser.add_argument('--referencia', action='store_true',
+                        help='con --guardar, guardar en la línea base versionada (benchmarks/baseline.json)')
+    parser.add_argument('--etapas', action='store_true', help='desglose por etapa del camino completo')
+    argumentos = parser.parse_args()
+
+    if argumentos.comando == 'grabar':
+        asyncio.run(grabar())
+        return 0
+    return ejecutar_benchmarks(argumentos)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Páginas HTML para los benchmarks.
+
+benchmarks/fixtures/<fuente>.html se usa como tamaño "real". Las versionadas
+son páginas saneadas con el marcado de cada sitio (cabecera con scripts,
+menús, anuncios, entidades, una tabla de posiciones sin fecha) y fechas fijas;
+'python benchmarks/bench_parrilla.py grabar' las reemplaza por las actuales.
+Los demás tamaños se generan con la misma estructura que las páginas reales
+(tablas por día en FutbolRed, grupos .scf-league-group en partidos-de-hoy.co)
+y relleno de menús, scripts y anuncios, con fechas a partir de hoy para que
+el camino completo encuentre partidos de hoy y mañana.
+"""
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict, Optional
+
+DIRECTORIO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Partidos por página de cada tamaño; 'grande' es la página sintética de 500
+TAMANOS = {'pequena': 20, 'mediana': 120, 'grande': 500}
+
+MESES = ['enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio', 'julio', 'agosto',
+         'septiembre', 'octubre', 'noviembre', 'diciembre']
+DIAS = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+LIGAS = ['Liga BetPlay', 'Premier League', 'LaLiga EA Sports', 'Serie A', 'Bundesliga', 'Ligue 1',
+         'Champions League', 'Copa Libertadores', 'Liga MX', 'Liga Profesional Argentina', 'MLS',
+         'Copa Sudamericana', 'Eliminatorias Sudamericanas', 'Primera B']
+EQUIPOS = ['Millonarios', 'Atlético Nacional', 'América de Cali', 'Deportivo Cali', 'Junior',
+           'Independiente Santa Fe', 'Deportes Tolima', 'Once Caldas', 'Real Madrid', 'Barcelona',
+           'Atlético de Madrid', 'Manchester City', 'Arsenal', 'Liverpool', 'Chelsea', 'Inter',
+           'Juventus', 'Milan', 'Bayern Múnich', 'Borussia Dortmund', 'PSG', 'Boca Juniors',
+           'River Plate', 'Flamengo', 'Palmeiras', 'Club América', 'Tigres', 'Inter Miami']
+CANALES = ['Win Sports+', 'ESPN', 'ESPN 2', 'Disney+', 'Star+', 'DSports', 'Caracol TV',
+           'RCN', 'Fox Sports', 'Paramount+', 'Por confirmar']
+
+
+def _relleno(rng: random.Random, bloques: int) -> str:
+    """Marcado que no interesa al parser pero que este tiene que recorrer"""
+    partes = []
+    for i in range(bloques):
+        enlaces = ''.join(f'<li><a href="/noticia/{rng.randrange(10**6)}">Noticia {i}-{j}</a></li>'
+                          for j in range(8))
+        partes.append(f'<div class="modulo" data-id="{i}"><nav><ul>{enlaces}</ul></nav>'
+                      f'<script>window.dataLayer=window.dataLayer||[];dataLayer.push({{"slot":{i}}});</script>'
+                      f'<div class="publicidad"><img src="/ads/{i}.png" alt="anuncio"></div></div>')
+    return ''.join(partes)
+
+
+def _partido(rng: random.Random):
+    local, visitante = rng.sample(EQUIPOS, 2)
+    return local, visitante, rng.choice(LIGAS), f'{rng.randrange(6, 23)}:{rng.choice(("00", "15", "30", "45"))}', \
+        rng.choice(CANALES)
+
+
+def futbolred(partidos: int, desde: date = None, dias: int = 7, semilla: int = 1) -> str:
+    rng = random.Random(semilla)
+    desde = desde or date.today()
+    html = [f'<html><head><title>Parrilla de fútbol</title></head><body>{_relleno(rng, 20)}']
+    por_dia = [partidos // dias + (1 if d < partidos % dias else 0) for d in range(dias)]
+    for d, cantidad in enumerate(por_dia):
+        fecha = desde + timedelta(days=d)
+        html.append(f'<table class="parrilla"><tr><th colspan="4">{DIAS[fecha.weekday()]} '
+                    f'{fecha.day} de {MESES[fecha.month - 1]}</th></tr>')
+        for _ in range(cantidad):
+            local, visitante, liga, hora, canal = _partido(rng)
+            html.append(f'<tr><td><strong>{local} vs {visitante}</strong></td><td>{liga}</td>'
+                        f'<td>{hora}</td><td><span>{canal}</span></td></tr>')
+        html.append('</table>')
+        html.append(_relleno(rng, 3))
+    html.append('</body></html>')
+    return ''.join(html)
+
+
+def partidos_de_hoy(partidos: int, semilla: int = 2) -> str:
+    rng = random.Random(semilla)
+    hoy = date.today()
+    html = [f'<html><head><title>Partidos de hoy</title></head><body>{_relleno(rng, 20)}']
+    grupos = max(1, partidos // 8)
+    for g in range(grupos):
+        cantidad = partidos // grupos + (1 if g < partidos % grupos else 0)
+        html.append(f'<div class="scf-league-group"><h2>{LIGAS[g % len(LIGAS)]}</h2><ul class="scf-match-list">')
+        for _ in range(cantidad):
+            local, visitante, _, hora, canal = _partido(rng)
+            html.append(
+                f'<li><a class="scf-match-item" href="/partido/{rng.randrange(10**6)}">'
+                f'<span class="estado">No iniciado</span> {hoy.day} {MESES[hoy.month - 1][:3].title()} {hoy.year}, {hora} '
+                f'<div class="team-row home"><img src="/e.png" alt=""><span class="team-name">{local}</span></div> VS '
+                f'<div class="team-row away"><img src="/e.png" alt=""><span class="team-name">{visitante}</span></div>'
+                f'<div class="scf-match-canal"><img src="/c.png" alt="{canal}"></div></a></li>')
+        html.append('</ul></div>')
+    html.append('</body></html>')
+    return ''.join(html)
+
+
+GENERADORES = {'futbolred': futbolred, 'partidos_de_hoy': partidos_de_hoy}
+
+
+def grabada(fuente: str) -> Optional[str]:
+    ruta = os.path.join(DIRECTORIO, f'{fuente}.html')
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta, encoding='utf-8') as f:
+        return f.read()
+
+
+def paginas(fuente: str, tamanos: Dict[str, int] = None) -> Dict[str, str]:
+    """{tamaño: html} de una fuente, incluida la página grabada si existe"""
+    resultado = {nombre: GENERADORES[fuente](partidos) for nombre, partidos in (tamanos or TAMANOS).items()}
+    real = grabada(fuente)
+    if real is not None:
+        resultado['real'] = real
+    return resultado
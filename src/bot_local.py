@@ -1,18 +1,30 @@
 import os
+import sys
 from dotenv import load_dotenv
-from telegram import Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters, CallbackQueryHandler
-import requests
-from bs4 import BeautifulSoup
+from telegram import (Bot, Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle,
+                      InputTextMessageContent)
+from telegram.ext import (Application, CommandHandler, ContextTypes, MessageHandler, filters, CallbackQueryHandler,
+                          InlineQueryHandler)
+from telegram.request import BaseRequest
+import httpx
 from datetime import datetime, timedelta
 import logging
 import asyncio
+import functools
+import json
+import secrets
+import time
+from bot_parrilla import (DateUtils, ParrillaService, CACHE_REFRESH_INTERVAL, METRICAS_HOST, METRICAS_PUERTO,
+                          WARM_CACHE_CHECKPOINT,
+                          parse_pool, get_registro, cache_mensajes, cache_persistente, guardar_cache, bucle_checkpoint,
+                          registrar_medidores, setup_logging, servicio as servicio_parrilla)
+from servicios.http_cliente import cerrar_http_cliente
+from servicios.ligas import clasificar_liga, clasificador
+from servicios.webhook import ServidorWebhook, simular_telegram
+from servicios.metricas import metricas, servir_metricas
 
-# Configurar logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+# Configurar logging (consola y logs/bot_local.log)
+setup_logging('logs/bot_local.log')
 logger = logging.getLogger(__name__)
 
 # Cargar variables de entorno
@@ -23,15 +35,60 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN no está definido en las variables de entorno.")
 
-# Diccionario manual de meses en español
-MESES_ES = {
-    'January': 'enero', 'February': 'febrero', 'March': 'marzo',
-    'April': 'abril', 'May': 'mayo', 'June': 'junio',
-    'July': 'julio', 'August': 'agosto', 'September': 'septiembre',
-    'October': 'octubre', 'November': 'noviembre', 'December': 'diciembre'
-}
+# Modo webhook (python bot_local.py webhook)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # URL pública; vacía = no registrar el webhook en Telegram
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('FLASK_PORT', '10000')))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')  # vacío = uno aleatorio en cada arranque
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '8'))
+WEBHOOK_QUEUE = int(os.getenv('WEBHOOK_QUEUE', '1000'))
 
-def obtener_partidos(fecha_objetivo=None):
+# Cache de partidos compartida por todos los chats: el servicio de bot_parrilla, el
+# mismo que usan guardar_cache() y las métricas
+servicio = servicio_parrilla
+
+
+# Versión de las plantillas de este módulo (clave de la cache de mensajes)
+VERSION_PLANTILLA = 1
+
+
+def bloques_partidos(partidos, fecha_str):
+    """
+    Construye el mensaje de partidos de una fecha como bloques (uno por partido)
+    
+    Args:
+        partidos: lista de Partido
+        fecha_str: fecha en español, p. ej. '14 de febrero'
+    
+    Returns:
+        list: Bloques del mensaje; unidos forman el texto completo
+    """
+    bloques = [f"📺 *Partidos del {fecha_str}:*\n\n"]
+    
+    for partido in partidos:
+        # Emojis por tipo de liga
+        bloques.append(
+            f"{partido.emoji_liga} *{partido.equipos}*\n"
+            f"   🏆 {partido.liga}\n"
+            f"   🕐 {partido.hora}\n"
+            f"   📺 {partido.canal}\n\n"
+        )
+    
+    if not partidos:
+        bloques.append(
+            "No se encontraron partidos para esta fecha. 😔\n\n"
+            "💡 Prueba con:\n"
+            "• /hoy - Partidos de hoy\n"
+            "• /mañana - Partidos de mañana\n"
+            "• /semana - Partidos de la semana"
+        )
+    else:
+        bloques.append(f"📊 Total: {len(partidos)} partidos encontrados")
+    
+    return bloques
+
+async def obtener_partidos(fecha_objetivo=None):
     """
     Obtiene los partidos de fútbol de una fecha específica
     
@@ -39,112 +96,51 @@ def obtener_partidos(fecha_objetivo=None):
         fecha_objetivo: datetime object. Si es None, usa la fecha actual
     
     Returns:
-        str: Mensaje formateado con los partidos
+        list: Partes del mensaje listas para enviar (renderizadas una sola vez por parrilla)
     """
     if fecha_objetivo is None:
         fecha_objetivo = datetime.now()
     
-    dia = str(fecha_objetivo.day)
-    mes = MESES_ES[fecha_objetivo.strftime('%B')]
-    fecha_str = f"{dia} de {mes}"
-    
-    url = 'https://www.futbolred.com/parrilla-de-futbol'
+    fecha_str = DateUtils.get_fecha_es(fecha_objetivo)
     
     try:
         logger.info(f"Obteniendo partidos para {fecha_str}...")
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        mensaje = f"📺 *Partidos del {fecha_str}:*\n\n"
-        
-        # Buscar todas las tablas en la página
-        tablas = soup.find_all('table')
-        partidos_encontrados = False
-        contador_partidos = 0
-        
-        for tabla in tablas:
-            filas = tabla.find_all('tr')
-            if not filas:
-                continue
-                
-            # La primera fila contiene la fecha
-            primera_fila = filas[0]
-            fecha_texto = primera_fila.get_text(strip=True).lower()
-            
-            # Verificar si la fecha coincide
-            if f"{dia} de {mes}" in fecha_texto or fecha_str.lower() in fecha_texto:
-                logger.info(f"Fecha encontrada: {fecha_texto}")
-                
-                # Procesar las filas de partidos (saltar la primera que es la fecha)
-                for fila in filas[1:]:
-                    columnas = fila.find_all('td')
-                    if len(columnas) >= 4:
-                        partido = columnas[0].get_text(strip=True)
-                        liga = columnas[1].get_text(strip=True)
-                        hora = columnas[2].get_text(strip=True)
-                        canal = columnas[3].get_text(strip=True)
-                        
-                        if partido and liga and hora and canal:
-                            contador_partidos += 1
-                            # Emojis por tipo de liga
-                            emoji = get_liga_emoji(liga)
-                            mensaje += f"{emoji} *{partido}*\n"
-                            mensaje += f"   🏆 {liga}\n"
-                            mensaje += f"   🕐 {hora}\n"
-                            mensaje += f"   📺 {canal}\n\n"
-                            partidos_encontrados = True
-        
-        if not partidos_encontrados:
-            mensaje += "No se encontraron partidos para esta fecha. 😔\n\n"
-            mensaje += "💡 Prueba con:\n"
-            mensaje += "• /hoy - Partidos de hoy\n"
-            mensaje += "• /mañana - Partidos de mañana\n"
-            mensaje += "• /semana - Partidos de la semana"
-        else:
-            mensaje += f"📊 Total: {contador_partidos} partidos encontrados"
-        
-        return mensaje
+        partidos = await servicio.obtener_partidos(ParrillaService.AGREGADO, fecha_objetivo.date())
+        mensaje = cache_mensajes.obtener(
+            (ParrillaService.AGREGADO, fecha_objetivo.date(), 'local', VERSION_PLANTILLA), partidos,
+            lambda: bloques_partidos(partidos, fecha_str))
+        return mensaje.partes
     
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error de conexión: {e}")
-        return f"❌ Error de conexión: No se pudo acceder a la página de partidos.\n\nIntenta nuevamente en unos minutos."
+        return [f"❌ Error de conexión: No se pudo acceder a la página de partidos.\n\nIntenta nuevamente en unos minutos."]
     except Exception as e:
         logger.error(f"Error inesperado: {e}")
-        return f"❌ Error inesperado: {str(e)}"
+        return [f"❌ Error inesperado: {str(e)}"]
+
+async def responder_partes(message, partes):
+    """Responde con cada parte del mensaje en orden"""
+    for parte in partes:
+        await message.reply_text(parte, parse_mode='Markdown')
 
 def get_liga_emoji(liga):
     """Retorna emoji apropiado según la liga"""
-    liga_lower = liga.lower()
-    if 'premier' in liga_lower or 'premier league' in liga_lower:
-        return "🏴󠁧󠁢󠁥󠁮󠁧󠁿"
-    elif 'champions' in liga_lower or 'uefa' in liga_lower:
-        return "🏆"
-    elif 'colombia' in liga_lower or 'betplay' in liga_lower:
-        return "🇨🇴"
-    elif 'argentina' in liga_lower:
-        return "🇦🇷"
-    elif 'brasil' in liga_lower or 'brazil' in liga_lower:
-        return "🇧🇷"
-    elif 'españa' in liga_lower or 'laliga' in liga_lower or 'la liga' in liga_lower:
-        return "🇪🇸"
-    elif 'italia' in liga_lower or 'serie a' in liga_lower:
-        return "🇮🇹"
-    elif 'francia' in liga_lower or 'ligue' in liga_lower:
-        return "🇫🇷"
-    elif 'alemania' in liga_lower or 'bundesliga' in liga_lower:
-        return "🇩🇪"
-    elif 'amistoso' in liga_lower:
-        return "🤝"
-    else:
-        return "⚽"
+    return clasificar_liga(liga).emoji
 
 # Comando /start con botones interactivos
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Registrar el chat como suscriptor (conserva sus preferencias si ya existía)
+    try:
+        get_registro().registrar(update.effective_chat.id)
+    except Exception as e:
+        logger.error(f"Error registrando suscriptor: {e}")
+    
     keyboard = [
         [InlineKeyboardButton("📺 Partidos de Hoy", callback_data='partidos_hoy')],
         [InlineKeyboardButton("🗓️ Partidos de Mañana", callback_data='partidos_mañana')],
         [InlineKeyboardButton("📅 Partidos de la Semana", callback_data='partidos_semana')],
+        [InlineKeyboardButton("🏆 Por Liga", callback_data='ligas_menu'),
+         InlineKeyboardButton("👕 Por Equipo", callback_data='equipo_ayuda')],
         [InlineKeyboardButton("ℹ️ Ayuda", callback_data='help')]
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -164,64 +160,287 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 # Comando /partidos (hoy)
 async def partidos(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔍 Buscando partidos de hoy...")
-    partidos_texto = obtener_partidos()
-    await update.message.reply_text(partidos_texto, parse_mode='Markdown')
+    await responder_partes(update.message, await obtener_partidos())
 
 # Comando /hoy
 async def hoy(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔍 Buscando partidos de hoy...")
-    partidos_texto = obtener_partidos()
-    await update.message.reply_text(partidos_texto, parse_mode='Markdown')
+    await responder_partes(update.message, await obtener_partidos())
 
 # Comando /manana (sin ñ para compatibilidad)
 async def manana(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔍 Buscando partidos de mañana...")
     fecha_mañana = datetime.now() + timedelta(days=1)
-    partidos_texto = obtener_partidos(fecha_mañana)
-    await update.message.reply_text(partidos_texto, parse_mode='Markdown')
+    await responder_partes(update.message, await obtener_partidos(fecha_mañana))
+
+# Comando /ayer (del archivo de partidos: la fuente ya pasó de día)
+async def ayer(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    fecha_ayer = datetime.now() - timedelta(days=1)
+    await responder_partes(update.message, await obtener_partidos(fecha_ayer))
 
 # Comando /semana
 async def semana(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("🔍 Buscando partidos de los próximos 7 días...")
     
-    mensaje_completo = "📅 *Partidos de la Semana:*\n\n"
+    # Una sola descarga de la parrilla para los 7 días
+    try:
+        partidos_por_fecha = await servicio.obtener_rango(ParrillaService.AGREGADO, datetime.now().date(), 7)
+    except Exception as e:
+        # Con la cache vacía y el circuito abierto la fuente lanza CircuitoAbierto
+        logger.error(f"Error obteniendo la semana: {e!r}")
+        await update.message.reply_text(
+            "❌ Error de conexión: No se pudo acceder a la página de partidos.\n\nIntenta nuevamente en unos minutos."
+        )
+        return
+    
+    mensaje = cache_mensajes.obtener(
+        (ParrillaService.AGREGADO, datetime.now().date(), 'local-semana', VERSION_PLANTILLA), partidos_por_fecha,
+        lambda: bloques_semana(partidos_por_fecha))
+    # Partes divididas entre partidos: ya no hace falta truncar la lista
+    await responder_partes(update.message, mensaje.partes)
+
+def bloques_semana(partidos_por_fecha):
+    """Resumen de los próximos 7 días como bloques; el título del día va con su primer partido"""
+    bloques = ["📅 *Partidos de la Semana:*\n\n"]
     
     for i in range(7):
         fecha = datetime.now() + timedelta(days=i)
         dia_nombre = ["Hoy", "Mañana", "Pasado mañana"][i] if i < 3 else fecha.strftime("%A")
         
-        # Obtener partidos para cada día
-        partidos_dia = obtener_partidos(fecha)
-        
         # Solo agregar días que tengan partidos
-        if "No se encontraron partidos" not in partidos_dia:
-            mensaje_completo += f"📆 *{dia_nombre.capitalize()}*\n"
-            # Extraer solo los partidos, sin el encabezado
-            partidos_solo = partidos_dia.split('\n\n', 1)[1] if '\n\n' in partidos_dia else partidos_dia
-            mensaje_completo += partidos_solo + "\n\n"
+        partidos_dia = partidos_por_fecha.get(fecha.date(), [])
+        if partidos_dia:
+            # Solo los partidos, sin el encabezado ni el total de bloques_partidos
+            dia = bloques_partidos(partidos_dia, DateUtils.get_fecha_es(fecha))[1:]
+            dia[0] = f"📆 *{dia_nombre.capitalize()}*\n" + dia[0]
+            dia[-1] += "\n\n"
+            bloques.extend(dia)
+    
+    if len(bloques) == 1:
+        bloques.append("No se encontraron partidos para esta semana. 😔")
+    
+    return bloques
+
+def bloques_filtrados(titulo, partidos_con_fecha):
+    """Partidos de varios días (pares fecha, partido) como bloques, con la fecha unida al primer partido del día"""
+    bloques = [f"{titulo}\n\n"]
+    fecha_actual = None
+    for fecha, partido in partidos_con_fecha:
+        bloque = partido.to_markdown() + "\n"
+        if fecha != fecha_actual:
+            bloque = f"📆 *{DateUtils.get_fecha_es(fecha).capitalize()}*\n" + bloque
+            fecha_actual = fecha
+        bloques.append(bloque)
+    bloques.append(f"📊 Total: {len(partidos_con_fecha)} partidos encontrados")
+    return bloques
+
+async def obtener_indice():
+    """Índice de la semana; descarga la parrilla solo si la cache está vacía o vencida"""
+    await servicio.obtener_rango(ParrillaService.AGREGADO, datetime.now().date(), 7)
+    return servicio.indice()
+
+def teclado_ligas(indice, maximo=12):
+    """Botones con las ligas que tienen partidos esta semana (las de más partidos primero)"""
+    ligas_semana = sorted(indice.por_liga.items(), key=lambda x: -len(x[1]))[:maximo]
+    botones = []
+    for liga_id, partidos_liga in ligas_semana:
+        liga = clasificador.por_id(liga_id)
+        if liga is None:
+            continue
+        botones.append(InlineKeyboardButton(f"{liga.emoji} {liga.nombre} ({len(partidos_liga)})",
+                                            callback_data=f"liga:{liga_id}"))
+    return InlineKeyboardMarkup([botones[i:i + 2] for i in range(0, len(botones), 2)])
+
+async def responder_liga(message, liga):
+    """Partidos de la semana de una liga, desde la partición precalculada del índice"""
+    try:
+        indice = await obtener_indice()
+    except Exception as e:
+        logger.error(f"Error obteniendo partidos: {e}")
+        await message.reply_text("❌ Error de conexión: No se pudo acceder a la página de partidos.")
+        return
+    
+    partidos_liga = indice.por_liga.get(liga.id, [])
+    if not partidos_liga:
+        await responder_liga_pasada(message, liga)
+        return
+    
+    mensaje = cache_mensajes.obtener(
+        (ParrillaService.AGREGADO, datetime.now().date(), f"liga:{liga.id}", VERSION_PLANTILLA), partidos_liga,
+        lambda: bloques_filtrados(f"{liga.emoji} *{liga.nombre} - Próximos 7 días*", partidos_liga))
+    await responder_partes(message, mensaje.partes)
+
+async def responder_liga_pasada(message, liga):
+    """Sin partidos próximos de la liga: los de los últimos 7 días, del archivo de partidos (no descarga nada)"""
+    hoy = datetime.now().date()
+    pasados = await asyncio.to_thread(servicio.archivados_liga, liga.id, hoy - timedelta(days=7),
+                                      hoy - timedelta(days=1))
+    if not pasados:
+        await message.reply_text(f"{liga.emoji} No hay partidos de {liga.nombre} en los próximos 7 días.")
+        return
+    
+    mensaje = cache_mensajes.obtener(
+        (ParrillaService.AGREGADO, hoy, f"liga-pasada:{liga.id}", VERSION_PLANTILLA), pasados,
+        lambda: bloques_filtrados(f"{liga.emoji} *{liga.nombre} - Últimos 7 días*\n"
+                                  f"_No hay partidos en los próximos 7 días_", pasados))
+    await responder_partes(message, mensaje.partes)
+
+# Comando /liga <nombre> - Partidos de una liga
+async def liga(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    texto = " ".join(context.args)
+    if not texto:
+        try:
+            indice = await obtener_indice()
+        except Exception as e:
+            logger.error(f"Error obteniendo partidos: {e}")
+            indice = None
+        await update.message.reply_text(
+            "🏆 Elige una liga o escribe `/liga premier league`",
+            parse_mode='Markdown',
+            reply_markup=teclado_ligas(indice) if indice is not None and len(indice) else None
+        )
+        return
+    
+    liga_elegida = clasificador.buscar(texto)
+    if liga_elegida is None:
+        await update.message.reply_text(f"❌ Liga no reconocida: {texto}")
+        return
+    await responder_liga(update.message, liga_elegida)
+
+# Comando /equipo <nombre> - Partidos de un equipo
+async def equipo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    texto = " ".join(context.args)
+    if not texto:
+        await update.message.reply_text("👕 Uso: `/equipo millonarios`", parse_mode='Markdown')
+        return
+    
+    try:
+        indice = await obtener_indice()
+    except Exception as e:
+        logger.error(f"Error obteniendo partidos: {e}")
+        await update.message.reply_text("❌ Error de conexión: No se pudo acceder a la página de partidos.")
+        return
+    
+    equipos = indice.equipos(texto)
+    if not equipos:
+        await update.message.reply_text(f"👕 No hay partidos de \"{texto}\" en los próximos 7 días.")
+        return
+    
+    partidos_equipo = indice.partidos_de_equipos(equipos)
+    mensaje = cache_mensajes.obtener(
+        (ParrillaService.AGREGADO, datetime.now().date(), f"equipo:{'|'.join(equipos)}", VERSION_PLANTILLA),
+        partidos_equipo,
+        lambda: bloques_filtrados("👕 *Partidos del equipo - Próximos 7 días*", partidos_equipo))
+    await responder_partes(update.message, mensaje.partes)
+
+# Comando /historial <nombre> - Últimas jornadas archivadas de un equipo
+async def historial(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    texto = " ".join(context.args)
+    if not texto:
+        await update.message.reply_text("📜 Uso: `/historial millonarios`", parse_mode='Markdown')
+        return
+    
+    # Sale del archivo local: no descarga nada (la consulta a SQLite va en un hilo)
+    equipos, partidos_equipo = await asyncio.to_thread(servicio.historial_equipo, texto)
+    if not partidos_equipo:
+        await update.message.reply_text(f"📜 No hay partidos archivados de \"{texto}\".")
+        return
+    
+    mensaje = cache_mensajes.obtener(
+        ("historial", datetime.now().date(), '|'.join(equipos), VERSION_PLANTILLA), partidos_equipo,
+        lambda: bloques_filtrados("📜 *Historial del equipo - Últimas jornadas*", partidos_equipo))
+    await responder_partes(update.message, mensaje.partes)
+
+# Comando /hora HH:MM - Envío diario automático
+async def hora(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text(
+            "🕐 Uso: `/hora 07:00` para recibir los partidos de hoy cada día a esa hora.\n"
+            "Usa `/hora off` para desactivar el envío diario.",
+            parse_mode='Markdown'
+        )
+        return
+    
+    valor = context.args[0].lower()
+    try:
+        get_registro().configurar_envio(update.effective_chat.id, None if valor == 'off' else valor)
+    except ValueError:
+        await update.message.reply_text("❌ Hora no válida. Usa el formato HH:MM, por ejemplo `/hora 07:00`", parse_mode='Markdown')
+        return
     
-    if mensaje_completo == "📅 *Partidos de la Semana:*\n\n":
-        mensaje_completo += "No se encontraron partidos para esta semana. 😔"
+    if valor == 'off':
+        await update.message.reply_text("🔕 Envío diario desactivado.")
+    else:
+        await update.message.reply_text(f"✅ Recibirás los partidos de hoy todos los días a las {valor}.")
+
+# Comando /ligas - Ligas preferidas para el envío diario
+async def ligas(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    texto = " ".join(context.args)
+    if not texto:
+        suscriptor = get_registro().obtener(update.effective_chat.id)
+        if suscriptor and suscriptor.ligas:
+            actuales = ", ".join(sorted(clasificador.por_id(l).nombre if clasificador.por_id(l) else l
+                                        for l in suscriptor.ligas))
+        else:
+            actuales = "todas"
+        await update.message.reply_text(
+            f"🏆 Ligas actuales: {actuales}\n\n"
+            "Uso: `/ligas liga betplay, premier league` o `/ligas todas`",
+            parse_mode='Markdown'
+        )
+        return
     
-    # Telegram tiene límite de 4096 caracteres
-    if len(mensaje_completo) > 4000:
-        mensaje_completo = mensaje_completo[:4000] + "\n\n... (lista truncada)"
+    seleccion = []
+    if texto.strip().lower() != 'todas':
+        desconocidas = []
+        for nombre in texto.split(','):
+            if not nombre.strip():
+                continue
+            liga = clasificador.buscar(nombre)
+            if liga is None:
+                desconocidas.append(nombre.strip())
+            else:
+                seleccion.append(liga)
+        if desconocidas:
+            await update.message.reply_text(f"❌ Ligas no reconocidas: {', '.join(desconocidas)}")
+            return
     
-    await update.message.reply_text(mensaje_completo, parse_mode='Markdown')
+    get_registro().configurar_ligas(update.effective_chat.id, [liga.id for liga in seleccion])
+    if seleccion:
+        await update.message.reply_text(
+            "✅ Preferencias de ligas actualizadas: " + ", ".join(f"{l.emoji} {l.nombre}" for l in seleccion))
+    else:
+        await update.message.reply_text("✅ Preferencias de ligas actualizadas.")
+
+# Comando /cancelar - Baja de los envíos automáticos
+async def cancelar(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    get_registro().desactivar(update.effective_chat.id)
+    await update.message.reply_text("👋 Ya no recibirás envíos automáticos. Usa /start para volver a suscribirte.")
 
 # Comando /status - Estado del bot
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    try:
-        # Probar conexión
-        response = requests.get('https://www.futbolred.com/parrilla-de-futbol', timeout=5)
-        status_web = "🟢 Conectado" if response.status_code == 200 else "🟡 Problemas de conexión"
-    except:
-        status_web = "🔴 Sin conexión"
+    # Estado de las fuentes según las últimas consultas (sin hacer una petición nueva)
+    lineas_fuentes = []
+    for salud in servicio.salud.estado():
+        if salud['estado'] == 'abierto':
+            estado = f"🔴 Caída (reintento en {salud['reintentar_en']:.0f}s)"
+        elif salud['estado'] == 'semiabierto':
+            estado = "🟡 Probando"
+        elif salud['fallos_consecutivos']:
+            estado = f"🟡 {salud['fallos_consecutivos']} fallos recientes"
+        else:
+            estado = "🟢 Conectado"
+        latencia = f", p95 {salud['p95']:.1f}s" if salud['p95'] is not None else ""
+        ultimo = (f", último OK hace {int(time.time() - salud['ultimo_exito'])}s"
+                  if salud['ultimo_exito'] else "")
+        # Sin '_' en el nombre: rompería el Markdown
+        lineas_fuentes.append(f"• {salud['fuente'].replace('_', ' ')}: {estado}{latencia}{ultimo}\n")
+    status_web = "\n" + "".join(lineas_fuentes) if lineas_fuentes else "⚪ Sin consultas todavía\n"
     
     mensaje = (
         "📊 *Estado del Bot:*\n\n"
         f"🤖 Bot: 🟢 Funcionando\n"
-        f"🌐 Web: {status_web}\n"
+        f"🌐 Web: {status_web}"
         f"🕐 Hora: {datetime.now().strftime('%H:%M:%S')}\n"
         f"📅 Fecha: {datetime.now().strftime('%d/%m/%Y')}\n\n"
         "💡 *Comandos disponibles:*\n"
@@ -244,8 +463,16 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "• `/manana` - Partidos de mañana\n"
         "• `/partidos` - Alias de /hoy\n"
         "• `/semana` - Partidos de los próximos 7 días\n"
+        "• `/liga premier league` - Partidos de una liga\n"
+        "• `/equipo millonarios` - Partidos de un equipo\n"
+        "• `/ayer` - Partidos de ayer\n"
+        "• `/historial millonarios` - Últimos partidos de un equipo\n"
         "• `/status` - Estado del bot y conexión\n"
         "• `/help` - Esta ayuda\n\n"
+        "🔔 *Envío automático:*\n"
+        "• `/hora 07:00` - Recibir los partidos cada día a esa hora\n"
+        "• `/ligas liga betplay, premier league` - Solo esas ligas\n"
+        "• `/cancelar` - Dejar de recibir envíos\n\n"
         "🔍 *Búsqueda por texto:*\n"
         "Puedes escribir palabras como:\n"
         "• `partidos` - Muestra partidos de hoy\n"
@@ -269,20 +496,36 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if query.data == 'partidos_hoy':
         await query.edit_message_text("🔍 Buscando partidos de hoy...")
-        partidos_texto = obtener_partidos()
-        await query.message.reply_text(partidos_texto, parse_mode='Markdown')
+        await responder_partes(query.message, await obtener_partidos())
         
     elif query.data == 'partidos_mañana':
         await query.edit_message_text("🔍 Buscando partidos de mañana...")
         fecha_mañana = datetime.now() + timedelta(days=1)
-        partidos_texto = obtener_partidos(fecha_mañana)
-        await query.message.reply_text(partidos_texto, parse_mode='Markdown')
+        await responder_partes(query.message, await obtener_partidos(fecha_mañana))
         
     elif query.data == 'partidos_semana':
         await query.edit_message_text("🔍 Buscando partidos de la semana...")
         # Llamar a la función semana
         await semana(update, context)
         
+    elif query.data == 'ligas_menu':
+        try:
+            indice = await obtener_indice()
+        except Exception as e:
+            logger.error(f"Error obteniendo partidos: {e}")
+            await query.message.reply_text("❌ Error de conexión: No se pudo acceder a la página de partidos.")
+            return
+        await query.message.reply_text("🏆 Elige una liga:", reply_markup=teclado_ligas(indice))
+        
+    elif query.data.startswith('liga:'):
+        liga_elegida = clasificador.por_id(query.data.split(':', 1)[1])
+        if liga_elegida is not None:
+            await responder_liga(query.message, liga_elegida)
+        
+    elif query.data == 'equipo_ayuda':
+        await query.message.reply_text("👕 Escribe `/equipo` y el nombre, por ejemplo `/equipo millonarios`",
+                                       parse_mode='Markdown')
+        
     elif query.data == 'help':
         await help_command(update, context)
 
@@ -290,7 +533,9 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     text = update.message.text.lower()
     
-    if any(palabra in text for palabra in ['partidos', 'fútbol', 'futbol', 'hoy']):
+    if 'ayer' in text:
+        await ayer(update, context)
+    elif any(palabra in text for palabra in ['partidos', 'fútbol', 'futbol', 'hoy']):
         await hoy(update, context)
     elif 'mañana' in text:
         await manana(update, context)
@@ -300,6 +545,12 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await help_command(update, context)
     elif any(palabra in text for palabra in ['estado', 'status', 'funciona']):
         await status(update, context)
+    elif (encontrados := servicio.indice().buscar(text, limite=10)):
+        # Búsqueda en el índice de la cache: responde sin descargar la parrilla
+        mensaje = "🔎 *Partidos encontrados:*\n\n"
+        for fecha, partido in encontrados:
+            mensaje += f"📅 {DateUtils.get_fecha_es(fecha)}\n{partido.to_markdown()}\n"
+        await update.message.reply_text(mensaje, parse_mode='Markdown')
     else:
         await update.message.reply_text(
             "🤔 No entiendo ese comando.\n\n"
@@ -309,6 +560,260 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "• Escribe 'partidos' para ver los de hoy"
         )
 
+# Búsqueda inline (@bot real madrid) sobre el índice de la cache
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    consulta = update.inline_query.query
+    indice = servicio.indice()
+    
+    if not len(indice):
+        # Cache vacía: se responde enseguida y se precarga la semana para las próximas consultas
+        context.application.create_task(precargar_semana(context))
+        await update.inline_query.answer([], cache_time=5, is_personal=False)
+        return
+    
+    resultados = []
+    for fecha, partido in indice.buscar(consulta, limite=50):  # máximo que admite Telegram
+        fecha_es = DateUtils.get_fecha_es(fecha)
+        resultados.append(InlineQueryResultArticle(
+            id=f"{fecha.isoformat()}-{hash(partido) & 0xffffffff:x}",
+            title=f"{partido.emoji_liga} {partido.equipos}",
+            description=f"{partido.liga} · {fecha_es} {partido.hora} · {partido.canal}",
+            input_message_content=InputTextMessageContent(
+                f"📅 *{fecha_es}*\n{partido.to_markdown()}", parse_mode='Markdown'),
+        ))
+    
+    await update.inline_query.answer(resultados, cache_time=30)
+
+# Descarga la parrilla de la semana (alimenta la cache y el índice de búsqueda)
+async def precargar_semana(context: ContextTypes.DEFAULT_TYPE):
+    try:
+        await servicio.obtener_rango(ParrillaService.AGREGADO, datetime.now().date(), 7)
+        # Lo cargado de la cache persistente puede venir vencido: revalidarlo ya, no en el próximo refresco
+        await servicio.refrescar_vencidas()
+    except Exception as e:
+        logger.warning(f"No se pudo precargar la semana: {e}")
+
+# Job periódico: revalida en segundo plano las entradas vencidas de la cache
+async def refrescar_cache(context: ContextTypes.DEFAULT_TYPE):
+    await servicio.refrescar_vencidas()
+    # Recalcular índice y particiones ahora, no en la próxima consulta
+    servicio.indice()
+
+# Job periódico: checkpoint de la cache persistente (arranque en caliente tras un reinicio)
+async def checkpoint_cache(context: ContextTypes.DEFAULT_TYPE):
+    guardar_cache(servicio)
+
+# Cierra el pool de conexiones HTTP y el de parseo al detener el bot
+async def cerrar_conexiones(application: Application):
+    servidor_metricas = application.bot_data.get("servidor_metricas")
+    if servidor_metricas is not None:
+        servidor_metricas.close()
+    tarea_checkpoint = application.bot_data.get("tarea_checkpoint")
+    if tarea_checkpoint is not None:
+        tarea_checkpoint.cancel()
+    guardar_cache(servicio)
+    servicio.agregador.cancelar_pendientes()
+    await cerrar_http_cliente()
+    parse_pool.cerrar()
+
+def medido(nombre, callback):
+    """Envuelve un handler para medir su duración total en /metrics"""
+    @functools.wraps(callback)
+    async def envoltura(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        with metricas.medir("handler", handler=nombre):
+            return await callback(update, context)
+    return envoltura
+
+async def iniciar_tareas(application: Application):
+    """
+    Endpoint /metrics (en su propio puerto, también en modo webhook) y checkpoint
+    de la cache persistente cuando no hay JobQueue.
+    """
+    if METRICAS_PUERTO:
+        application.bot_data["servidor_metricas"] = await servir_metricas(METRICAS_PUERTO, METRICAS_HOST)
+    if cache_persistente is not None and not application.job_queue:
+        application.bot_data["tarea_checkpoint"] = asyncio.create_task(bucle_checkpoint(servicio))
+
+def crear_aplicacion(**opciones) -> Application:
+    """Aplicación con todos los handlers registrados (común a polling y webhook)"""
+    builder = Application.builder().token(BOT_TOKEN)
+    for opcion, valor in opciones.items():
+        builder = getattr(builder, opcion)(valor)
+    application = builder.build()
+    
+    # Circuitos, timeouts y consultas en vuelo del servicio que atiende a este bot
+    registrar_medidores(servicio)
+    
+    # Registrar comandos
+    comandos = {
+        "start": start, "partidos": partidos, "hoy": hoy, "manana": manana, "semana": semana,
+        "status": status, "help": help_command, "hora": hora, "ligas": ligas, "cancelar": cancelar,
+        "liga": liga, "equipo": equipo, "ayer": ayer, "historial": historial,
+    }
+    for comando, callback in comandos.items():
+        application.add_handler(CommandHandler(comando, medido(comando, callback)))
+    
+    # Manejador de botones
+    application.add_handler(CallbackQueryHandler(medido("botones", button_handler)))
+    
+    # Manejador de texto
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, medido("texto", handle_text)))
+    
+    # Búsqueda inline (activar con /setinline en @BotFather)
+    application.add_handler(InlineQueryHandler(medido("inline", inline_query)))
+    
+    # Refresco de la cache (stale-while-revalidate)
+    if application.job_queue:
+        application.job_queue.run_repeating(refrescar_cache, interval=CACHE_REFRESH_INTERVAL, first=CACHE_REFRESH_INTERVAL)
+        application.job_queue.run_once(precargar_semana, when=1)
+        if cache_persistente is not None:
+            application.job_queue.run_repeating(checkpoint_cache, interval=WARM_CACHE_CHECKPOINT,
+                                                first=WARM_CACHE_CHECKPOINT)
+        servicio.revalidar_en_segundo_plano = True
+    else:
+        logger.warning("JobQueue no disponible (instala python-telegram-bot[job-queue]); la cache se refrescará en cada consulta vencida")
+    
+    return application
+
+def secreto_webhook() -> str:
+    """WEBHOOK_SECRET, o uno aleatorio: el webhook nunca acepta updates sin secreto"""
+    if WEBHOOK_SECRET:
+        return WEBHOOK_SECRET
+    logger.warning("WEBHOOK_SECRET no definido: se usa uno aleatorio para este arranque "
+                   "(se registra en Telegram con el webhook; defínelo para enviar updates de prueba)")
+    return secrets.token_urlsafe(32)
+
+async def ejecutar_webhook():
+    """
+    Modo webhook: un servidor HTTP propio recibe los updates, los deja en una
+    cola acotada y WEBHOOK_WORKERS workers los pasan a la aplicación.
+    """
+    # Sin updater: los updates llegan por el servidor de webhook, no por getUpdates
+    application = crear_aplicacion(updater=None)
+    
+    async def procesar(datos):
+        await application.process_update(Update.de_json(datos, application.bot))
+    
+    secreto = secreto_webhook()
+    servidor = ServidorWebhook(procesar, host=WEBHOOK_HOST, puerto=WEBHOOK_PORT, ruta=WEBHOOK_PATH,
+                               secreto=secreto, workers=WEBHOOK_WORKERS, capacidad=WEBHOOK_QUEUE)
+    
+    async with application:
+        await application.start()
+        await iniciar_tareas(application)
+        await servidor.iniciar()
+        try:
+            if WEBHOOK_URL:
+                await application.bot.set_webhook(
+                    url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+                    secret_token=secreto,
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True,
+                )
+                logger.info(f"🔗 Webhook registrado en {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+            else:
+                logger.warning("WEBHOOK_URL no definido: no se registra el webhook en Telegram (modo prueba local)")
+            await servidor.servir_siempre()
+        finally:
+            await servidor.detener()
+            await application.stop()
+            # post_shutdown solo lo llaman run_polling/run_webhook
+            await cerrar_conexiones(application)
+
+def main_webhook():
+    print(f"🌐 Iniciando bot en modo webhook en {WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    print(f"   • {WEBHOOK_WORKERS} workers, cola de {WEBHOOK_QUEUE} updates")
+    if METRICAS_PUERTO:
+        print(f"   • Métricas en http://{METRICAS_HOST}:{METRICAS_PUERTO}/metrics")
+    print("\n🛑 Presiona Ctrl+C para detener el bot")
+    try:
+        asyncio.run(ejecutar_webhook())
+    except KeyboardInterrupt:
+        print("\n👋 Bot detenido por el usuario")
+
+class BotApiLocal(BaseRequest):
+    """
+    Bot API de Telegram simulada para 'simular': getMe y los envíos se responden
+    aquí mismo, así la prueba de carga mide la cola y los workers del webhook y
+    no los límites ni los errores de la API real.
+    """
+    
+    def __init__(self):
+        self.llamadas = {}
+    
+    @property
+    def read_timeout(self):
+        return None
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
+    
+    async def do_request(self, url, method, request_data=None, read_timeout=None, write_timeout=None,
+                         connect_timeout=None, pool_timeout=None):
+        metodo = url.rsplit('/', 1)[-1]
+        self.llamadas[metodo] = self.llamadas.get(metodo, 0) + 1
+        parametros = request_data.parameters if request_data is not None else {}
+        if metodo == 'getMe':
+            resultado = {'id': 1, 'is_bot': True, 'first_name': 'Simulado', 'username': 'simulado_bot'}
+        elif metodo in ('sendMessage', 'editMessageText'):
+            resultado = {
+                'message_id': sum(self.llamadas.values()), 'date': int(time.time()), 'text': parametros.get('text', ''),
+                'chat': {'id': int(parametros.get('chat_id', 0)), 'type': 'private'},
+            }
+        else:
+            resultado = True
+        return 200, json.dumps({'ok': True, 'result': resultado}).encode('utf-8')
+
+async def ejecutar_simulacion(cantidad):
+    """Webhook y aplicación en este proceso, con BotApiLocal, recibiendo 'cantidad' updates falsos"""
+    api = BotApiLocal()
+    application = crear_aplicacion(updater=None, request=api)
+    
+    async def procesar(datos):
+        await application.process_update(Update.de_json(datos, application.bot))
+    
+    # El cliente falso está en este proceso: basta un secreto de esta ejecución
+    secreto = WEBHOOK_SECRET or secrets.token_urlsafe(32)
+    servidor = ServidorWebhook(procesar, host='127.0.0.1', puerto=WEBHOOK_PORT, ruta=WEBHOOK_PATH,
+                               secreto=secreto, workers=WEBHOOK_WORKERS, capacidad=WEBHOOK_QUEUE)
+    
+    async with application:
+        await application.start()
+        await servidor.iniciar()
+        try:
+            resultado = await simular_telegram(f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}", cantidad,
+                                               concurrencia=min(cantidad, 20), secreto=secreto)
+        finally:
+            # Espera a que los workers vacíen la cola antes de contar las respuestas
+            await servidor.detener()
+            await application.stop()
+            await cerrar_conexiones(application)
+    resultado['respuestas'] = api.llamadas.get('sendMessage', 0)
+    return resultado
+
+def main_simular(cantidad=100, url=None):
+    """
+    Cliente de Telegram falso. Sin URL levanta el webhook en este proceso con una
+    Bot API local (nada sale a Telegram); con URL envía los updates a un webhook
+    ya en marcha, que responderá a través de la API real.
+    """
+    if url is None:
+        print(f"🧪 Enviando {cantidad} updates al webhook local (Bot API simulada)...")
+        resultado = asyncio.run(ejecutar_simulacion(cantidad))
+    else:
+        print(f"🧪 Enviando {cantidad} updates a {url}...")
+        resultado = asyncio.run(simular_telegram(url, cantidad, concurrencia=min(cantidad, 20),
+                                                 secreto=WEBHOOK_SECRET or None))
+    print(f"✅ {resultado['enviados']} updates en {resultado['duracion']}s "
+          f"({resultado['updates_por_segundo']} updates/s)")
+    for estado, total in sorted(resultado['estados'].items()):
+        print(f"   HTTP {estado or 'sin respuesta'}: {total}")
+    if 'respuestas' in resultado:
+        print(f"   Respuestas del bot (locales): {resultado['respuestas']}")
+
 def main():
     print("🚀 Iniciando bot mejorado en modo local...")
     print("📊 Funcionalidades disponibles:")
@@ -319,22 +824,7 @@ def main():
     print("   • Estado de conexión")
     
     # Crear la aplicación
-    application = Application.builder().token(BOT_TOKEN).build()
-    
-    # Registrar comandos
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("partidos", partidos))
-    application.add_handler(CommandHandler("hoy", hoy))
-    application.add_handler(CommandHandler("manana", manana))
-    application.add_handler(CommandHandler("semana", semana))
-    application.add_handler(CommandHandler("status", status))
-    application.add_handler(CommandHandler("help", help_command))
-    
-    # Manejador de botones
-    application.add_handler(CallbackQueryHandler(button_handler))
-    
-    # Manejador de texto
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
+    application = crear_aplicacion(post_init=iniciar_tareas, post_shutdown=cerrar_conexiones)
     
     print("\n✅ Bot iniciado correctamente!")
     print("🎮 Comandos disponibles:")
@@ -357,4 +847,10 @@ def main():
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    main()
+    modo = sys.argv[1] if len(sys.argv) > 1 else "polling"
+    if modo == "webhook":
+        main_webhook()
+    elif modo == "simular":
+        main_simular(int(sys.argv[2]) if len(sys.argv) > 2 else 100, sys.argv[3] if len(sys.argv) > 3 else None)
+    else:
+        main()
@@ -1,13 +1,36 @@
-import requests
-from bs4 import BeautifulSoup
-from telegram import Bot
 import asyncio
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 import logging
-from typing import List, Dict, Optional
-from config.emoji_ligas import EMOJI_LIGAS
+import itertools
+import re
+import sys
+from datetime import date
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Dict, Optional, Tuple
+from servicios.cache import CacheParrilla
+from servicios.cache_persistente import CachePersistente
+from servicios.historial import ArchivoPartidos
+from servicios.http_cliente import get_http_cliente, cerrar_http_cliente
+from servicios.parseo import ParsePool
+from servicios.parser_backend import obtener_backend
+from servicios.snapshots import Snapshot, SnapshotStore
+from servicios.cambios import Cambios, MotorCambios
+from servicios.programador import Programador, Tarea, parsear_programacion
+from servicios.difusion import Difusor, ResultadoDifusion
+from servicios.suscripciones import RegistroSuscripciones
+from servicios.ligas import clasificar_liga, clasificador
+from servicios.mensajes import CacheMensajes, MensajeRenderizado, dividir_en_partes
+from servicios.agregador import Agregador
+from servicios.salud import CircuitoAbierto, MonitorSalud
+from servicios.indice import IndicePartidos
+from servicios.vuelo_unico import VueloUnico
+from servicios.metricas import metricas, servir_metricas
+
+# python-telegram-bot y httpx se importan solo en los caminos que los usan:
+# 'test', 'stats' o una ejecución de cron con la cache caliente no pagan su carga
+if TYPE_CHECKING:
+    from telegram import Bot
 
 # Cargar variables de entorno desde un archivo .env
 load_dotenv('config/.env')
@@ -15,14 +38,78 @@ load_dotenv('config/.env')
 # === CONFIGURACIÓN ===
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 CHAT_ID = os.getenv("CHAT_ID")
+# Chats adicionales para difusión, separados por coma
+CHAT_IDS = [c.strip() for c in os.getenv("CHAT_IDS", "").split(",") if c.strip()]
 URL = 'https://www.futbolred.com/parrilla-de-futbol'
 
+# Cache de partidos (segundos)
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+CACHE_TTL_MAX = int(os.getenv("CACHE_TTL_MAX", "3600"))
+CACHE_REFRESH_INTERVAL = int(os.getenv("CACHE_REFRESH_INTERVAL", "60"))
+
+# Parseo de HTML fuera del event loop: inline | thread | process
+PARSE_POOL_MODE = os.getenv("PARSE_POOL_MODE", "thread")
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", "2"))
+
+# Motor de parseo: auto | selectolax | lxml | soup | soup-completo
+PARSER_BACKEND = os.getenv("PARSER_BACKEND", "auto")
+
+# Parrilla de FutbolRed en streaming: cada tabla se procesa en cuanto llega
+STREAMING_PARSE = os.getenv("STREAMING_PARSE", "False").lower() == "true"
+
+# Último HTML descargado por URL (GET condicional y fixtures reproducibles)
+SNAPSHOTS_DIR = os.getenv("SNAPSHOTS_DIR", "data/snapshots")
+SNAPSHOTS_REPLAY = os.getenv("SNAPSHOTS_REPLAY", "False").lower() == "true"
+
+# Cache persistente (SQLite) para arrancar en caliente tras un reinicio; vacío = desactivada
+WARM_CACHE_DB = os.getenv("WARM_CACHE_DB", "data/cache.sqlite")
+WARM_CACHE_CHECKPOINT = int(os.getenv("WARM_CACHE_CHECKPOINT", "60"))
+
+# Archivo histórico de todos los partidos descargados (SQLite); vacío = desactivado
+HISTORIAL_DB = os.getenv("HISTORIAL_DB", "data/historial.sqlite")
+
+# Última parrilla notificada, para enviar solo los cambios
+CAMBIOS_FILE = os.getenv("CAMBIOS_FILE", "data/cambios.json")
+
+# Programación del modo daemon: "<acción> <HH:MM> [días]" separadas por ';'
+DAEMON_SCHEDULE = os.getenv("DAEMON_SCHEDULE", "hoy 07:00; manana 20:00; semana 09:00 lun")
+DAEMON_TZ = os.getenv("DAEMON_TZ", "")
+
+# Difusión a muchos chats (límites de Telegram: ~30 msg/s global, ~1 msg/s por chat)
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+BROADCAST_RETRIES = int(os.getenv("BROADCAST_RETRIES", "3"))
+# Pausa entre las partes de un mismo mensaje en el envío directo (segundos)
+PAUSA_ENTRE_PARTES = 1
+
+# Suscriptores y sus preferencias (SQLite)
+SUSCRIPCIONES_DB = os.getenv("SUSCRIPCIONES_DB", "data/suscripciones.sqlite")
+DAEMON_SUSCRIPCIONES = os.getenv("DAEMON_SUSCRIPCIONES", "True").lower() == "true"
+
+# Agregación de fuentes: espera a las demás tras la primera respuesta (segundos)
+# y tolerancia de hora para deduplicar partidos (minutos)
+AGREGADOR_ESPERA = float(os.getenv("AGREGADOR_ESPERA", "1.5"))
+AGREGADOR_TOLERANCIA = int(os.getenv("AGREGADOR_TOLERANCIA", "30"))
+
+# Salud de las fuentes: circuito (fallos seguidos antes de abrirlo, enfriamiento en
+# segundos) y timeout adaptativo según la latencia observada (segundos)
+CIRCUITO_UMBRAL = int(os.getenv("CIRCUITO_UMBRAL", "3"))
+CIRCUITO_ENFRIAMIENTO = float(os.getenv("CIRCUITO_ENFRIAMIENTO", "30"))
+TIMEOUT_INICIAL = float(os.getenv("TIMEOUT_INICIAL", "15"))
+TIMEOUT_MIN = float(os.getenv("TIMEOUT_MIN", "3"))
+TIMEOUT_MAX = float(os.getenv("TIMEOUT_MAX", "30"))
+
+# Endpoint /metrics en modo daemon, polling y webhook (puerto 0 = desactivado); solo
+# en localhost salvo que METRICAS_HOST diga otra cosa (0.0.0.0 lo expone sin autenticación)
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", "0"))
+METRICAS_HOST = os.getenv("METRICAS_HOST", "127.0.0.1")
+
 
 # Configurar logging de manera más robusta
-def setup_logging():
-    """Configura el sistema de logging"""
+def setup_logging(archivo: str = 'logs/bot_parrilla.log'):
+    """Configura el sistema de logging: consola y el archivo de log de quien lo llama"""
     # Crear directorio de logs si no existe
-    log_dir = 'logs'
+    log_dir = os.path.dirname(archivo) or '.'
     try:
         if not os.path.exists(log_dir):
             os.makedirs(log_dir, exist_ok=True)
@@ -32,7 +119,7 @@ def setup_logging():
         
         # Intentar agregar archivo si es posible
         try:
-            file_handler = logging.FileHandler('logs/bot_parrilla.log', encoding='utf-8')
+            file_handler = logging.FileHandler(archivo, encoding='utf-8')
             handlers.append(file_handler)
         except Exception as e:
             print(f"⚠️ No se pudo crear archivo de log: {e}")
@@ -53,10 +140,43 @@ def setup_logging():
         print(f"⚠️ Configuración de logging simplificada: {e}")
 
 
-# Inicializar logging
-setup_logging()
+# setup_logging() lo llama cada punto de entrada, no la importación del módulo
 logger = logging.getLogger('ParrillaCronBot')
 
+# Pool compartido para el parseo de HTML
+parse_pool = ParsePool(PARSE_POOL_MODE, PARSE_POOL_WORKERS)
+
+# Snapshots de páginas y último parseo por URL: (hash del HTML, resultado)
+snapshot_store = SnapshotStore(SNAPSHOTS_DIR, replay=SNAPSHOTS_REPLAY)
+_ultimo_parseo: Dict[str, tuple] = {}
+
+
+async def descargar_y_parsear(url: str, parser, timeout: float = 15, fuente: str = None):
+    """
+    Descarga la URL con GET condicional y la procesa con parser(html, backend) en el pool.
+    Si el contenido tiene el mismo hash que el último parseo, se reutiliza ese resultado.
+    """
+    fuente = fuente or url
+    with metricas.medir("descarga", fuente=fuente):
+        snapshot, cambio = await get_http_cliente().get_condicional(url, snapshot_store, timeout=timeout)
+    return await parsear_snapshot(snapshot, parser, fuente)
+
+
+async def parsear_snapshot(snapshot: Snapshot, parser, fuente: str):
+    """Procesa un snapshot en el pool, salvo que ya se haya parseado ese mismo contenido"""
+    url = snapshot.url
+    previo = _ultimo_parseo.get(url)
+    if previo is not None and previo[0] == snapshot.hash:
+        logger.info(f"📦 Contenido sin cambios, se omite el parseo: {url}")
+        metricas.incrementar("parrilla_parseos_omitidos_total", fuente=fuente)
+        return previo[1]
+    
+    # Incluye la espera por un worker libre del pool; 'parseo' y 'extraccion' se miden dentro
+    with metricas.medir("parseo_pool", fuente=fuente):
+        resultado = await parse_pool.ejecutar(parser, snapshot.cuerpo, PARSER_BACKEND)
+    _ultimo_parseo[url] = (snapshot.hash, resultado)
+    return resultado
+
 # === CLASES Y UTILIDADES MEJORADAS ===
 
 class DateUtils:
@@ -69,6 +189,11 @@ class DateUtils:
         'October': 'octubre', 'November': 'noviembre', 'December': 'diciembre'
     }
     
+    MESES_NUM: Dict[str, int] = {mes: i for i, mes in enumerate(MESES_ES.values(), start=1)}
+    
+    # "Sábado 14 de febrero", "14 febrero", ...
+    PATRON_FECHA = re.compile(r'(\d{1,2})\s+(?:de\s+)?(' + '|'.join(MESES_NUM) + r')\b')
+    
     @classmethod
     def get_fecha_es(cls, fecha: datetime = None) -> str:
         """Obtiene la fecha en formato español"""
@@ -89,120 +214,229 @@ class DateUtils:
         """Obtiene la fecha de mañana en español"""
         manana = datetime.now() + timedelta(days=1)
         return cls.get_fecha_es(manana)
+    
+    @classmethod
+    def parse_fecha_es(cls, texto: str, referencia: date = None) -> Optional[date]:
+        """Convierte un texto como '14 de febrero' en fecha, infiriendo el año más cercano"""
+        coincidencia = cls.PATRON_FECHA.search(texto.lower())
+        if not coincidencia:
+            return None
+        
+        if referencia is None:
+            referencia = date.today()
+        
+        dia = int(coincidencia.group(1))
+        mes = cls.MESES_NUM[coincidencia.group(2)]
+        
+        # La parrilla no trae año: tomar el candidato más cercano a la referencia (cambio de año)
+        candidatos = []
+        for anio in (referencia.year - 1, referencia.year, referencia.year + 1):
+            try:
+                candidatos.append(date(anio, mes, dia))
+            except ValueError:
+                continue
+        
+        if not candidatos:
+            return None
+        return min(candidatos, key=lambda c: abs((c - referencia).days))
 
 class Partido:
-    """Modelo de datos para un partido"""
+    """
+    Modelo de datos para un partido.
+    
+    Compacto (__slots__, sin __dict__ por instancia) e inmutable por convención:
+    es hashable por su contenido, así que sirve en sets y como clave al comparar
+    o deduplicar parrillas. Las cadenas que se repiten entre partidos (liga,
+    canal, hora, fecha) se internan, y la liga canónica se calcula al usarla.
+    """
+    
+    __slots__ = ('equipos', 'liga', 'hora', 'canal', 'fecha')
     
     def __init__(self, equipos: str, liga: str, hora: str, canal: str, fecha: Optional[str] = None):
         self.equipos = equipos
-        self.liga = liga
-        self.hora = hora
-        self.canal = canal
-        self.fecha = fecha
-        self.emoji_liga = self._get_emoji_liga(liga)
+        self.liga = sys.intern(liga)
+        self.hora = sys.intern(hora)
+        self.canal = sys.intern(canal)
+        self.fecha = sys.intern(fecha) if fecha is not None else None
     
-    def _get_emoji_liga(self, liga: str) -> str:
-        """Obtiene emoji según la liga"""
-        liga_lower = liga.lower()
-        
-        for emoji, keywords in EMOJI_LIGAS.items():
-            for keyword in keywords:
-                if keyword in liga_lower:
-                    return emoji
-        
-        return '⚽'
+    def _campos(self) -> tuple:
+        return (self.equipos, self.liga, self.hora, self.canal, self.fecha)
+    
+    def __eq__(self, otro) -> bool:
+        if not isinstance(otro, Partido):
+            return NotImplemented
+        return self._campos() == otro._campos()
+    
+    def __hash__(self) -> int:
+        return hash(self._campos())
+    
+    def __repr__(self) -> str:
+        return f"Partido({self.equipos!r}, {self.liga!r}, {self.hora!r}, {self.canal!r}, {self.fecha!r})"
+    
+    def __reduce__(self):
+        # Al volver del pool de procesos se reconstruye con __init__ (y se internan las cadenas)
+        return (Partido, self._campos())
+    
+    @property
+    def liga_id(self) -> str:
+        """Id canónico de la liga (clasificación memorizada por texto de liga)"""
+        return clasificar_liga(self.liga).id
+    
+    @property
+    def emoji_liga(self) -> str:
+        return clasificar_liga(self.liga).emoji
+    
+    def completar(self, otro: 'Partido') -> 'Partido':
+        """El mismo partido con los datos que le falten tomados de otra fuente"""
+        canal = otro.canal if self.canal == "Por confirmar" else self.canal
+        hora = otro.hora if self.hora == "Por confirmar" else self.hora
+        if (canal, hora) == (self.canal, self.hora) and self.fecha is not None:
+            return self
+        return Partido(self.equipos, self.liga, hora, canal, self.fecha or otro.fecha)
     
     def to_markdown(self) -> str:
         """Convierte el partido a formato markdown con el estilo visual mejorado"""
         return f"{self.emoji_liga} *{self.equipos}*\n   🏆 {self.liga}\n   🕐 {self.hora}\n   📺 {self.canal}\n"
+    
+    def to_dict(self) -> Dict[str, Optional[str]]:
+        """Representación serializable (JSON) del partido"""
+        return {
+            'equipos': self.equipos,
+            'liga': self.liga,
+            'hora': self.hora,
+            'canal': self.canal,
+            'fecha': self.fecha,
+        }
+    
+    @classmethod
+    def from_dict(cls, datos: Dict[str, Optional[str]]) -> 'Partido':
+        """Reconstruye un partido desde to_dict()"""
+        return cls(datos['equipos'], datos['liga'], datos['hora'], datos['canal'], datos.get('fecha'))
 
 class FutbolRedScraper:
     """Scraper mejorado para FutbolRed"""
     
+    FUENTE = "futbolred"
+    
     def __init__(self):
         self.url = URL
         self.date_utils = DateUtils()
     
-    def obtener_partidos_fecha(self, fecha_es: str) -> List[Partido]:
-        """Obtiene partidos para una fecha específica"""
-        try:
-            logger.info(f"🔍 Obteniendo partidos para: {fecha_es}")
-            
-            # Realizar request con timeout y headers
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            
-            response = requests.get(self.url, timeout=15, headers=headers)
-            response.raise_for_status()
+    async def obtener_partidos_por_fecha(self, timeout: float = 15) -> Dict[date, List[Partido]]:
+        """
+        Descarga y procesa la parrilla una sola vez.
+        Retorna los partidos de todas las tablas de la página agrupados por fecha.
+        Lanza httpx.HTTPError si la página no se puede descargar.
+        """
+        logger.info("🔍 Obteniendo parrilla completa")
+        
+        if STREAMING_PARSE:
+            return await self.obtener_partidos_incremental(timeout)
+        return await descargar_y_parsear(self.url, FutbolRedScraper.parsear_parrilla, timeout=timeout,
+                                         fuente=self.FUENTE)
+    
+    async def obtener_partidos_incremental(self, timeout: float = 15,
+                                           hasta: date = None) -> Dict[date, List[Partido]]:
+        """
+        Descarga la parrilla en streaming y procesa cada tabla en cuanto se cierra,
+        sin esperar al HTML completo ni construir el DOM de toda la página.
+        Con 'hasta' deja de leer al llegar una tabla de una fecha posterior (las
+        tablas van en orden cronológico) y solo retorna las fechas hasta esa.
+        """
+        from servicios.parser_incremental import TablasIncrementales
+        
+        partidos_por_fecha: Dict[date, List[Partido]] = {}
+        incremental = TablasIncrementales()
+        procesadas = 0
+        
+        def consumir(fragmento: str) -> bool:
+            nonlocal procesadas
+            tablas = incremental.alimentar(fragmento)
+            FutbolRedScraper._extraer_tablas(tablas, partidos_por_fecha, procesadas)
+            procesadas += len(tablas)
+            return hasta is None or all(fecha <= hasta for fecha in partidos_por_fecha)
+        
+        with metricas.medir("descarga_incremental", fuente=self.FUENTE):
+            snapshot, _ = await get_http_cliente().get_incremental(self.url, snapshot_store, consumir, timeout)
+        
+        if snapshot is None:
+            metricas.incrementar("parrilla_lecturas_cortadas_total", fuente=self.FUENTE)
+            return {fecha: partidos for fecha, partidos in partidos_por_fecha.items() if fecha <= hasta}
+        if not incremental.caracteres:
+            # 304 o replay: el cuerpo guardado se procesa como siempre (o se reutiliza el último parseo)
+            return await parsear_snapshot(snapshot, FutbolRedScraper.parsear_parrilla, self.FUENTE)
+        
+        FutbolRedScraper._extraer_tablas(incremental.cerrar(), partidos_por_fecha, procesadas)
+        _ultimo_parseo[self.url] = (snapshot.hash, partidos_por_fecha)
+        logger.info(f"🎯 Parrilla procesada en streaming: {len(partidos_por_fecha)} fechas "
+                    f"({incremental.caracteres // 1024} KB)")
+        return partidos_por_fecha
+    
+    @staticmethod
+    def parsear_parrilla(html: str, backend: str = "auto") -> Dict[date, List[Partido]]:
+        """Extrae los partidos de todas las tablas de la página (se ejecuta en el pool de parseo)"""
+        with metricas.medir("parseo", fuente=FutbolRedScraper.FUENTE):
+            tablas = obtener_backend(backend).tablas(html)
+        partidos_por_fecha: Dict[date, List[Partido]] = {}
+        
+        logger.info(f"📊 Encontradas {len(tablas)} tablas en la página")
+        
+        with metricas.medir("extraccion", fuente=FutbolRedScraper.FUENTE):
+            FutbolRedScraper._extraer_tablas(tablas, partidos_por_fecha)
+        
+        logger.info(f"🎯 Parrilla procesada: {len(partidos_por_fecha)} fechas")
+        return partidos_por_fecha
+    
+    @staticmethod
+    def _extraer_tablas(tablas, partidos_por_fecha: Dict[date, List[Partido]], primera: int = 0):
+        for i, tabla in enumerate(tablas, primera):
+            # La primera fila de cada tabla contiene la fecha
+            fecha_texto = tabla.encabezado.lower()
+            fecha = DateUtils.parse_fecha_es(fecha_texto)
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            tablas = soup.find_all('table')
-            partidos = []
+            if fecha is None:
+                logger.debug(f"Tabla {i+1} sin fecha reconocible: {fecha_texto[:50]}...")
+                continue
             
-            logger.info(f"📊 Encontradas {len(tablas)} tablas en la página")
-            
-            for i, tabla in enumerate(tablas):
-                filas = tabla.find_all('tr')
-                if not filas:
-                    continue
-                
-                # Verificar si la tabla corresponde a la fecha buscada
-                primera_fila = filas[0]
-                fecha_texto = primera_fila.get_text(strip=True).lower()
-                
-                logger.debug(f"Tabla {i+1}: {fecha_texto[:50]}...")
-                
-                # Verificación más flexible de fecha
-                if self._fecha_coincide(fecha_es, fecha_texto):
-                    logger.info(f"✅ Fecha encontrada en tabla {i+1}: {fecha_texto}")
-                    
-                    # Procesar partidos de esta tabla
-                    partidos_tabla = self._procesar_tabla(filas[1:], fecha_es)
-                    partidos.extend(partidos_tabla)
-                    
-                    logger.info(f"⚽ Encontrados {len(partidos_tabla)} partidos en esta tabla")
+            partidos_tabla = FutbolRedScraper._procesar_tabla(tabla.filas, DateUtils.get_fecha_es(fecha))
+            partidos_por_fecha.setdefault(fecha, []).extend(partidos_tabla)
             
+            logger.info(f"⚽ Encontrados {len(partidos_tabla)} partidos en tabla {i+1} ({fecha_texto})")
+    
+    async def obtener_partidos_fecha(self, fecha_es: str) -> List[Partido]:
+        """Obtiene partidos para una fecha específica"""
+        import httpx
+        
+        fecha = self.date_utils.parse_fecha_es(fecha_es)
+        if fecha is None:
+            logger.error(f"❌ Fecha no reconocida: {fecha_es}")
+            return []
+        
+        try:
+            if STREAMING_PARSE:
+                # Solo se lee la página hasta que termina la fecha pedida
+                partidos = (await self.obtener_partidos_incremental(hasta=fecha)).get(fecha, [])
+            else:
+                partidos = (await self.obtener_partidos_por_fecha()).get(fecha, [])
             logger.info(f"🎯 Total de partidos encontrados para {fecha_es}: {len(partidos)}")
             return partidos
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"❌ Error de conexión: {e}")
             return []
         except Exception as e:
             logger.error(f"❌ Error inesperado obteniendo partidos: {e}")
             return []
     
-    def _fecha_coincide(self, fecha_buscada: str, fecha_texto: str) -> bool:
-        """Verifica si las fechas coinciden con mayor flexibilidad"""
-        fecha_buscada_lower = fecha_buscada.lower()
-        fecha_texto_lower = fecha_texto.lower()
-        
-        # Verificación directa
-        if fecha_buscada_lower in fecha_texto_lower:
-            return True
-        
-        # Verificación por partes (día y mes)
-        partes_buscada = fecha_buscada_lower.split(' de ')
-        if len(partes_buscada) == 2:
-            dia, mes = partes_buscada
-            if dia in fecha_texto_lower and mes in fecha_texto_lower:
-                return True
-        
-        return False
-    
-    def _procesar_tabla(self, filas: List, fecha: str) -> List[Partido]:
-        """Procesa las filas de una tabla para extraer partidos"""
+    @staticmethod
+    def _procesar_tabla(filas: List[List[str]], fecha: str) -> List[Partido]:
+        """Procesa las filas (texto de cada celda) de una tabla para extraer partidos"""
         partidos = []
         
-        for fila in filas:
-            columnas = fila.find_all('td')
+        for columnas in filas:
             if len(columnas) >= 4:
                 try:
-                    equipos = columnas[0].get_text(strip=True)
-                    liga = columnas[1].get_text(strip=True)
-                    hora = columnas[2].get_text(strip=True)
-                    canal = columnas[3].get_text(strip=True)
+                    equipos, liga, hora, canal = columnas[:4]
                     
                     # Validar que todos los campos tengan contenido
                     if all([equipos, liga, hora, canal]) and len(equipos) > 3:
@@ -216,69 +450,42 @@ class FutbolRedScraper:
         
         return partidos
     
-    def obtener_partidos_hoy(self) -> List[Partido]:
+    async def obtener_partidos_hoy(self) -> List[Partido]:
         """Obtiene partidos de hoy"""
         fecha_hoy = self.date_utils.get_hoy()
-        return self.obtener_partidos_fecha(fecha_hoy)
+        return await self.obtener_partidos_fecha(fecha_hoy)
     
-    def obtener_partidos_manana(self) -> List[Partido]:
+    async def obtener_partidos_manana(self) -> List[Partido]:
         """Obtiene partidos de mañana"""
         fecha_manana = self.date_utils.get_manana()
-        return self.obtener_partidos_fecha(fecha_manana)
+        return await self.obtener_partidos_fecha(fecha_manana)
 
 
 class PartidosDeHoyScrapper:
     URL = "https://partidos-de-hoy.co"
+    FUENTE = "partidos_de_hoy"
     
-    def obtener_partidos_hoy(self) -> List[Partido]:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            )
-        }
-        
-        response = requests.get(self.URL, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, "html.parser")
-        
+    async def obtener_partidos_hoy(self, timeout: float = 15) -> List[Partido]:
+        return await descargar_y_parsear(self.URL, PartidosDeHoyScrapper.parsear, timeout=timeout,
+                                         fuente=self.FUENTE)
+    
+    @staticmethod
+    def parsear(html: str, backend: str = "auto") -> List[Partido]:
+        """Extrae los partidos de los grupos de liga (se ejecuta en el pool de parseo)"""
+        with metricas.medir("parseo", fuente=PartidosDeHoyScrapper.FUENTE):
+            grupos = obtener_backend(backend).grupos_liga(html)
+        with metricas.medir("extraccion", fuente=PartidosDeHoyScrapper.FUENTE):
+            return PartidosDeHoyScrapper._extraer(grupos)
+    
+    @staticmethod
+    def _extraer(grupos) -> List[Partido]:
         partidos = []
         
-        league_groups = soup.select(".scf-league-group")
-        
-        # 👇 ESTE SELECTOR PUEDE AJUSTARSE
-        # cards = soup.select(".match")
-        
-        # for card in cards:
-        #     equipos = card.select_one(".teams")
-        #     hora = card.select_one(".time")
-        #     liga = card.select_one(".league")
-        #     canal = card.select_one(".channel")
-            
-        #     if not equipos or not hora:
-        #         continue
-            
-        #     partidos.append(
-        #         Partido(
-        #             equipos=equipos.get_text(strip=True),
-        #             liga=liga.get_text(strip=True) if liga else "Fútbol",
-        #             hora=hora.get_text(strip=True),
-        #             canal=canal.get_text(strip=True) if canal else "Por confirmar"
-        #     )
-        # )
-        
-        # return partidos
-        
-        for league in league_groups:
-            liga = league.find("h2")
-            liga_nombre = liga.get_text(strip=True) if liga else "Fútbol"
-
-            match_links = league.select(".scf-match-list li a.scf-match-item")
+        for league in grupos:
+            liga_nombre = league.liga or "Fútbol"
 
-            for match in match_links:
-                texto = match.get_text(" ", strip=True)
+            for match in league.partidos:
+                texto = match.texto
 
                 # Ejemplo texto:
                 # "No iniciado 5 Feb 2026, 20:00 Millonarios VS Deportivo Pereira"
@@ -294,18 +501,13 @@ class PartidosDeHoyScrapper:
                         break
 
                 # Equipos
-                home_team_el = match.select_one(".team-row.home .team-name")
-                away_team_el = match.select_one(".team-row.away .team-name")
-
-                home_team = home_team_el.get_text(strip=True) if home_team_el else "Por confirmar"
-                away_team = away_team_el.get_text(strip=True) if away_team_el else "Por confirmar"
+                home_team = match.local or "Por confirmar"
+                away_team = match.visitante or "Por confirmar"
 
                 equipos = f"{home_team} VS {away_team}"
 
                 # Canal (imagen alt)
-                canal_img = match.select_one(".scf-match-canal img")
-                canal = canal_img["alt"] if canal_img and canal_img.has_attr("alt") else "Por confirmar"
-
+                canal = match.canal or "Por confirmar"
 
                 partidos.append(
                     Partido(
@@ -318,116 +520,400 @@ class PartidosDeHoyScrapper:
 
         return partidos
 
+class ParrillaService:
+    """Acceso a los partidos a través de la cache compartida"""
+    
+    FUTBOLRED = FutbolRedScraper.FUENTE
+    PARTIDOS_DE_HOY = PartidosDeHoyScrapper.FUENTE
+    # Todas las fuentes combinadas y sin duplicados (no se cachea: combina las caches de cada fuente)
+    AGREGADO = "agregado"
+    
+    def __init__(self, cache: CacheParrilla = None, revalidar_en_segundo_plano: bool = False,
+                 archivo: ArchivoPartidos = None):
+        """
+        revalidar_en_segundo_plano: si es True, las entradas vencidas se sirven tal cual
+        y se refrescan desde refrescar_vencidas() (job periódico); si es False se
+        refrescan en la misma consulta.
+        archivo: dónde se guarda cada descarga y de dónde salen las fechas pasadas
+        (por defecto el de HISTORIAL_DB).
+        """
+        self.cache = cache or CacheParrilla(CACHE_TTL, CACHE_TTL_MAX, respaldo=cache_persistente)
+        self.archivo = archivo or archivo_partidos
+        self.revalidar_en_segundo_plano = revalidar_en_segundo_plano
+        self.salud = MonitorSalud(
+            umbral_fallos=CIRCUITO_UMBRAL, enfriamiento=CIRCUITO_ENFRIAMIENTO,
+            timeout_inicial=TIMEOUT_INICIAL, timeout_minimo=TIMEOUT_MIN, timeout_maximo=TIMEOUT_MAX,
+        )
+        
+        # El orden de registro es la prioridad al combinar: FutbolRed trae fecha y liga completas
+        # Sin timeout propio: cada fuente usa el timeout adaptativo de self.salud
+        self.agregador = Agregador(None, AGREGADOR_ESPERA, AGREGADOR_TOLERANCIA, Partido.completar)
+        self.agregador.registrar(self.FUTBOLRED, lambda fecha: self.obtener_partidos(self.FUTBOLRED, fecha))
+        # partidos-de-hoy.co solo publica la jornada actual
+        self.agregador.registrar(self.PARTIDOS_DE_HOY, lambda fecha: self.obtener_partidos(self.PARTIDOS_DE_HOY, fecha),
+                                 cubre=lambda fecha: fecha == date.today())
+        
+        # Descargas y combinaciones concurrentes de la misma clave comparten una sola consulta
+        self.vuelos = VueloUnico()
+        
+        self._indice: Optional[IndicePartidos] = None
+        self._version_indice = -1
+    
+    async def _descargar(self, fuente: str, timeout: float = 15) -> Dict[date, List[Partido]]:
+        if fuente == self.FUTBOLRED:
+            return await FutbolRedScraper().obtener_partidos_por_fecha(timeout)
+        if fuente == self.PARTIDOS_DE_HOY:
+            # partidos-de-hoy.co solo publica la jornada actual
+            return {date.today(): await PartidosDeHoyScrapper().obtener_partidos_hoy(timeout)}
+        raise ValueError(f"Fuente desconocida: {fuente}")
+    
+    async def refrescar(self, fuente: str) -> Dict[date, List[Partido]]:
+        """
+        Descarga la fuente y actualiza la cache.
+        Lanza CircuitoAbierto al instante si la fuente está marcada como caída.
+        Las llamadas concurrentes para la misma fuente comparten una sola descarga.
+        """
+        return await self.vuelos.ejecutar(fuente, lambda: self._refrescar(fuente))
+    
+    async def _refrescar(self, fuente: str) -> Dict[date, List[Partido]]:
+        partidos_por_fecha = await self.salud.ejecutar(fuente, lambda timeout: self._descargar(fuente, timeout))
+        self.cache.guardar(fuente, partidos_por_fecha)
+        logger.info(f"♻️ Cache actualizada: {fuente} ({len(partidos_por_fecha)} fechas)")
+        if self.archivo is not None:
+            # SQLite es síncrono: la escritura va en un hilo para no frenar el event loop
+            await asyncio.to_thread(self.archivo.registrar, fuente, partidos_por_fecha)
+        return partidos_por_fecha
+    
+    async def refrescar_vencidas(self):
+        """Refresca en paralelo las fuentes vencidas; pensado para un job periódico"""
+        # Las fuentes con el circuito abierto se reintentan cuando termine su enfriamiento
+        fuentes = [f for f in self.cache.fuentes_por_revalidar() if self.salud.disponible(f)]
+        resultados = await asyncio.gather(*(self.refrescar(f) for f in fuentes), return_exceptions=True)
+        for fuente, resultado in zip(fuentes, resultados):
+            if isinstance(resultado, Exception):
+                logger.warning(f"⚠️ No se pudo refrescar {fuente}, se sigue sirviendo la cache: {resultado}")
+    
+    async def obtener_partidos(self, fuente: str, fecha: date) -> List[Partido]:
+        """
+        Partidos de una fecha; solo descarga si la cache no tiene datos utilizables.
+        Las fechas pasadas salen del archivo (la fuente ya puede haber pasado de día).
+        """
+        if fecha < date.today() and self.archivo is not None:
+            # SQLite en un hilo: la consulta espera el lock si hay una escritura en curso
+            archivados = await asyncio.to_thread(self.archivados, fuente, fecha)
+            if archivados:
+                metricas.incrementar("parrilla_cache_consultas_total", fuente=fuente, resultado="archivo")
+                return archivados
+        
+        if fuente == self.AGREGADO:
+            return await self.vuelos.ejecutar((fuente, fecha), lambda: self.agregador.obtener(fecha))
+        
+        resultado = self.cache.obtener(fuente, fecha)
+        
+        if resultado is None:
+            metricas.incrementar("parrilla_cache_consultas_total", fuente=fuente, resultado="fallo")
+            return (await self.refrescar(fuente)).get(fecha, [])
+        
+        partidos, fresca = resultado
+        metricas.incrementar("parrilla_cache_consultas_total", fuente=fuente,
+                             resultado="fresca" if fresca else "vencida")
+        # Con el circuito abierto se sirve la cache sin esperar a la fuente
+        if not fresca and not self.revalidar_en_segundo_plano and self.salud.disponible(fuente):
+            try:
+                return (await self.refrescar(fuente)).get(fecha, [])
+            except Exception as e:
+                logger.warning(f"⚠️ Error refrescando {fuente}, usando datos en cache: {e}")
+        
+        return partidos
+    
+    def indice(self) -> IndicePartidos:
+        """
+        Índice de búsqueda sobre lo que hay en cache (todas las fuentes, sin duplicados).
+        No descarga nada; se reconstruye solo cuando cambia el contenido de la cache.
+        """
+        if self._indice is None or self._version_indice != self.cache.version:
+            version = self.cache.version
+            instantanea = self.cache.instantanea()
+            fechas = {fecha for partidos_por_fuente in instantanea.values() for fecha in partidos_por_fuente}
+            partidos_por_fecha = {}
+            for fecha in fechas:
+                if fecha < date.today():
+                    continue
+                partidos = self._combinar({fuente: instantanea[fuente].get(fecha) for fuente in instantanea})
+                if partidos:
+                    partidos_por_fecha[fecha] = partidos
+            self._indice = IndicePartidos(partidos_por_fecha)
+            self._version_indice = version
+            logger.info(f"🔎 Índice de búsqueda reconstruido: {len(self._indice)} partidos")
+        return self._indice
+    
+    def _combinar(self, por_fuente: Dict[str, Optional[List[Partido]]]) -> List[Partido]:
+        """Listas de varias fuentes en una sola sin duplicados, en el orden de prioridad del agregador"""
+        return self.agregador.combinar([por_fuente[f.nombre] for f in self.agregador.fuentes if por_fuente.get(f.nombre)])
+    
+    def archivados(self, fuente: str, fecha: date) -> List[Partido]:
+        """Partidos de una fecha según el archivo, sin descargar nada (AGREGADO: todas las fuentes combinadas)"""
+        if self.archivo is None:
+            return []
+        return self._combinar(self.archivo.por_fecha(fecha, None if fuente == self.AGREGADO else fuente))
+    
+    def historial_equipo(self, consulta: str, fechas: int = 20) -> Tuple[List[str], List[Tuple[date, Partido]]]:
+        """
+        (equipos que coinciden, pares (fecha, partido)) de las últimas 'fechas'
+        jornadas de esos equipos hasta hoy, según el archivo, de la más reciente
+        a la más antigua.
+        """
+        if self.archivo is None:
+            return [], []
+        equipos = self.archivo.equipos(consulta)
+        filas = self.archivo.de_equipos(equipos, hasta=date.today(), fechas=fechas)
+        return equipos, self._combinar_por_fecha(filas, recientes_primero=True)
+    
+    def archivados_liga(self, liga_id: str, desde: date, hasta: date) -> List[Tuple[date, Partido]]:
+        """Pares (fecha, partido) archivados de una liga canónica entre dos fechas (incluidas), sin descargar nada"""
+        if self.archivo is None:
+            return []
+        return self._combinar_por_fecha(self.archivo.por_liga(liga_id, desde, hasta))
+    
+    def _combinar_por_fecha(self, filas: List[Tuple[date, str, Partido]],
+                            recientes_primero: bool = False) -> List[Tuple[date, Partido]]:
+        """Filas (fecha, fuente, partido) del archivo como pares (fecha, partido), con las fuentes combinadas por fecha"""
+        por_fecha: Dict[date, Dict[str, List[Partido]]] = {}
+        for fecha, fuente, partido in filas:
+            por_fecha.setdefault(fecha, {}).setdefault(fuente, []).append(partido)
+        return [(fecha, partido) for fecha in sorted(por_fecha, reverse=recientes_primero)
+                for partido in self._combinar(por_fecha[fecha])]
+    
+    async def obtener_rango(self, fuente: str, desde: date, dias: int) -> Dict[date, List[Partido]]:
+        """Partidos de varios días consecutivos con una sola consulta a la fuente"""
+        rango = {}
+        for i in range(dias):
+            fecha = desde + timedelta(days=i)
+            rango[fecha] = await self.obtener_partidos(fuente, fecha)
+        return rango
+
 class DataFormatter:
     """Formateador de datos para mensajes del bot"""
     
+    # Subir al cambiar las plantillas: invalida los mensajes cacheados
+    VERSION_PLANTILLA = 1
+    
+    # Nombres de días en español para el resumen semanal
+    NOMBRES_DIAS = {
+        0: "Hoy",
+        1: "Mañana",
+        2: "Pasado mañana",
+        3: "Miércoles",
+        4: "Jueves",
+        5: "Viernes",
+        6: "Sábado"
+    }
+    
     @staticmethod
-    def format_partidos(partidos: List[Partido], fecha: str, titulo_personalizado: str = None) -> str:
-        """Formatea lista de partidos para envío por Telegram con el estilo visual mejorado"""
-        if titulo_personalizado:
-            encabezado = titulo_personalizado
-        else:
-            encabezado = f"📅 *Partidos del {fecha}*"
+    def bloques_partidos(partidos: List[Partido], fecha: str, titulo_personalizado: str = None) -> List[str]:
+        """Mensaje de partidos como bloques (encabezado, un bloque por partido, total)"""
+        encabezado = titulo_personalizado or f"📅 *Partidos del {fecha}*"
         
         if not partidos:
-            return f"{encabezado}\n\n❌ No se encontraron partidos para esta fecha.\n\n🔄 _Actualizado: {datetime.now().strftime('%H:%M')}h_"
+            return [f"{encabezado}\n\n❌ No se encontraron partidos para esta fecha.\n\n🔄 _Actualizado: {datetime.now().strftime('%H:%M')}h_"]
         
-        mensaje = f"{encabezado}\n\n"
+        bloques = [f"{encabezado}\n\n"]
+        bloques.extend(partido.to_markdown() + "\n" for partido in partidos)
+        bloques.append(f"📊 Total: {len(partidos)} partidos encontrados")
+        return bloques
+    
+    @staticmethod
+    def format_partidos(partidos: List[Partido], fecha: str, titulo_personalizado: str = None) -> str:
+        """Formatea lista de partidos para envío por Telegram con el estilo visual mejorado"""
+        return "".join(DataFormatter.bloques_partidos(partidos, fecha, titulo_personalizado))
+    
+    @staticmethod
+    def bloques_resumen_semanal(partidos_por_fecha: Dict[str, List[Partido]]) -> List[str]:
+        """Resumen semanal como bloques; el título de cada día va unido a su primer partido"""
+        if not partidos_por_fecha:
+            return ["📅 *Partidos de la Semana*\n\n❌ No se encontraron partidos para esta semana."]
         
-        # Formatear cada partido con el nuevo estilo
-        for partido in partidos:
-            mensaje += partido.to_markdown() + "\n"
+        bloques = ["📅 *Partidos de la Semana*\n\n"]
         
-        # Agregar total al final
-        mensaje += f"📊 Total: {len(partidos)} partidos encontrados"
+        for i, (fecha, partidos) in enumerate(partidos_por_fecha.items()):
+            if partidos:
+                # Usar nombre del día si está disponible, sino usar la fecha
+                nombre_dia = DataFormatter.NOMBRES_DIAS.get(i, fecha)
+                dia = [partido.to_markdown() + "\n" for partido in partidos]
+                dia[0] = f"📆 *{nombre_dia}*\n" + dia[0]
+                dia[-1] += f"📊 Total: {len(partidos)} partidos encontrados\n\n"
+                bloques.extend(dia)
         
-        return mensaje
+        bloques[-1] = bloques[-1].rstrip()  # Quitar salto de línea final extra
+        return bloques
     
     @staticmethod
     def format_resumen_semanal(partidos_por_fecha: Dict[str, List[Partido]]) -> str:
         """Formatea resumen semanal de partidos con el estilo visual mejorado"""
-        if not partidos_por_fecha:
-            return "📅 *Partidos de la Semana*\n\n❌ No se encontraron partidos para esta semana."
-        
-        mensaje = "📅 *Partidos de la Semana*\n\n"
-        
-        # Nombres de días en español
-        nombres_dias = {
-            0: "Hoy",
-            1: "Mañana", 
-            2: "Pasado mañana",
-            3: "Miércoles",
-            4: "Jueves",
-            5: "Viernes",
-            6: "Sábado"
-        }
+        return "".join(DataFormatter.bloques_resumen_semanal(partidos_por_fecha))
+    
+    @staticmethod
+    def bloques_cambios(cambios: Cambios, fecha: str) -> List[str]:
+        """Solo las diferencias de la parrilla (nuevos, retirados, hora y canal) como bloques; cada título va con su primera línea"""
+        bloques = [f"🔔 *Cambios en la parrilla ({fecha})*\n\n"]
         
-        for i, (fecha, partidos) in enumerate(partidos_por_fecha.items()):
-            if partidos:
-                # Usar nombre del día si está disponible, sino usar la fecha
-                nombre_dia = nombres_dias.get(i, fecha)
-                mensaje += f"📆 *{nombre_dia}*\n"
-                
-                # Agregar todos los partidos de este día con el formato completo
-                for partido in partidos:
-                    mensaje += partido.to_markdown() + "\n"
-                
-                # Agregar total de partidos del día
-                mensaje += f"� Total: {len(partidos)} partidos encontrados\n\n"
+        secciones = (
+            ("🆕 *Nuevos partidos*\n", [p.to_markdown() + "\n" for p in cambios.agregados], ""),
+            ("❌ *Ya no aparecen*\n", [f"{p.emoji_liga} *{p.equipos}* ({p.hora})\n" for p in cambios.eliminados], "\n"),
+            ("🕐 *Cambio de hora*\n", [f"{d.emoji_liga} *{d.equipos}*: {a.hora} → {d.hora}\n"
+                                       for a, d in cambios.reprogramados], "\n"),
+            ("📺 *Cambio de canal*\n", [f"{d.emoji_liga} *{d.equipos}*: {a.canal} → {d.canal}\n"
+                                        for a, d in cambios.cambios_canal], "\n"),
+        )
+        for titulo, lineas, cierre in secciones:
+            if lineas:
+                lineas[0] = titulo + lineas[0]
+                lineas[-1] += cierre
+                bloques.extend(lineas)
         
-        return mensaje.rstrip() # Quitar salto de línea final extra
+        bloques.append(f"🔄 _Actualizado: {datetime.now().strftime('%H:%M')}h_")
+        return bloques
+    
+    @staticmethod
+    def format_cambios(cambios: Cambios, fecha: str) -> str:
+        """Formatea solo las diferencias de la parrilla (nuevos, retirados, hora y canal)"""
+        return "".join(DataFormatter.bloques_cambios(cambios, fecha))
 
 
 
 
 # === FUNCIONES PRINCIPALES ===
 
-def obtener_partidos(tipo: str = "hoy") -> str:
+# Copia en disco de la cache de partidos y de mensajes (se abre en el primer acceso)
+cache_persistente = CachePersistente(WARM_CACHE_DB, Partido.from_dict) if WARM_CACHE_DB else None
+
+# Histórico de partidos por fecha, liga y equipo (se abre en el primer acceso)
+archivo_partidos = ArchivoPartidos(HISTORIAL_DB, Partido.from_dict) if HISTORIAL_DB else None
+
+# Servicio compartido (la cache vive mientras viva el proceso y, con WARM_CACHE_DB, entre reinicios)
+servicio = ParrillaService()
+
+def registrar_medidores(servicio: ParrillaService):
     """
-    Función principal para obtener partidos
-    tipo: 'hoy', 'manana', 'semana'
+    Métricas que ya cuentan otros objetos; se leen al exponer /metrics. Se
+    registran al arrancar el modo que sirve consultas (daemon, stats, bot
+    interactivo) sobre el servicio que de verdad las atiende.
     """
-    formatter = DataFormatter()
+    estados = {"cerrado": 0, "semiabierto": 1, "abierto": 2}
+    metricas.registrar_medidor(
+        "parrilla_fuente_circuito", lambda: [({"fuente": s["fuente"]}, estados[s["estado"]]) for s in servicio.salud.estado()],
+        "Estado del circuito por fuente (0 cerrado, 1 semiabierto, 2 abierto)")
+    metricas.registrar_medidor(
+        "parrilla_fuente_timeout_segundos", lambda: [({"fuente": s["fuente"]}, s["timeout"]) for s in servicio.salud.estado()],
+        "Timeout adaptativo actual por fuente")
+    metricas.registrar_medidor(
+        "parrilla_fuente_consultas_total",
+        lambda: [({"fuente": s["fuente"], "resultado": r}, s[c]) for s in servicio.salud.estado()
+                 for r, c in (("exito", "exitos"), ("fallo", "fallos"), ("rechazada", "rechazadas"))],
+        "Consultas a cada fuente por resultado", tipo="counter")
+    metricas.registrar_medidor(
+        "parrilla_cache_mensajes_total",
+        lambda: [({"resultado": "acierto"}, cache_mensajes.aciertos), ({"resultado": "renderizado"}, cache_mensajes.renderizados),
+                 ({"resultado": "respaldo"}, cache_mensajes.desde_respaldo)],
+        "Mensajes servidos desde la cache de mensajes (respaldo: recuperados del disco) o renderizados", tipo="counter")
+    if cache_persistente is not None:
+        metricas.registrar_medidor(
+            "parrilla_cache_persistente_checkpoints_total", lambda: cache_persistente.checkpoints,
+            "Escrituras de la cache persistente", tipo="counter")
+    if archivo_partidos is not None:
+        metricas.registrar_medidor(
+            "parrilla_archivo_registros_total", lambda: archivo_partidos.registros,
+            "Descargas con cambios guardadas en el archivo de partidos", tipo="counter")
+    metricas.registrar_medidor(
+        "parrilla_consultas_agrupadas_total",
+        lambda: [({"resultado": "lanzada"}, servicio.vuelos.consultas), ({"resultado": "agrupada"}, servicio.vuelos.agrupadas)],
+        "Consultas lanzadas o que reutilizaron una en curso (single-flight)", tipo="counter")
+    metricas.registrar_medidor("parrilla_consultas_en_vuelo", servicio.vuelos.en_vuelo, "Consultas en curso")
+
+_registro: Optional[RegistroSuscripciones] = None
+
+def get_registro() -> RegistroSuscripciones:
+    """Registro de suscriptores compartido (se abre al primer uso)"""
+    global _registro
+    if _registro is None:
+        _registro = RegistroSuscripciones(SUSCRIPCIONES_DB)
+    return _registro
+
+# Fuente y fecha de cada tipo de consulta de un día
+FUENTES_POR_TIPO = {
+    "hoy": (ParrillaService.AGREGADO, 0),
+    "manana": (ParrillaService.AGREGADO, 1),
+    # Del archivo: la fuente ya puede haber pasado de día
+    "ayer": (ParrillaService.AGREGADO, -1),
+}
 
-    # scraper = FutbolRedScraper()
+# Mensajes ya renderizados y divididos, compartidos por todos los chats
+cache_mensajes = CacheMensajes(respaldo=cache_persistente)
+
+def guardar_cache(servicio_activo: ParrillaService = None) -> bool:
+    """Checkpoint de la cache de partidos y de mensajes en WARM_CACHE_DB"""
+    if cache_persistente is None:
+        return False
+    return cache_persistente.checkpoint((servicio_activo or servicio).cache, cache_mensajes)
+
+async def bucle_checkpoint(servicio_activo: ParrillaService = None):
+    """Checkpoint periódico de la cache persistente (daemon y bot sin JobQueue)"""
+    while True:
+        await asyncio.sleep(WARM_CACHE_CHECKPOINT)
+        guardar_cache(servicio_activo)
+
+async def obtener_mensaje(tipo: str = "hoy") -> MensajeRenderizado:
+    """
+    Mensaje de partidos listo para enviar (texto y partes).
+    Se renderiza una sola vez mientras la parrilla de origen no cambie.
+    tipo: 'hoy', 'manana', 'ayer', 'semana'
+    """
+    formatter = DataFormatter()
     
     try:
-        if tipo == "hoy":
-            scraper = PartidosDeHoyScrapper()
-            partidos = scraper.obtener_partidos_hoy()
-            fecha = DateUtils.get_hoy()
-            titulo = f"📺 *Partidos de Hoy ({fecha})*"
-            return formatter.format_partidos(partidos, fecha, titulo)
-            
-        elif tipo == "manana":
-            fecha = DateUtils.get_manana()
-            partidos = scraper.obtener_partidos_manana()
-            titulo = f"📺 *Partidos de Mañana ({fecha})*"
-            return formatter.format_partidos(partidos, fecha, titulo)
+        if tipo in FUENTES_POR_TIPO:
+            fuente, dias = FUENTES_POR_TIPO[tipo]
+            fecha_obj = date.today() + timedelta(days=dias)
+            partidos = await servicio.obtener_partidos(fuente, fecha_obj)
+            fecha = DateUtils.get_fecha_es(fecha_obj)
+            nombre = {"hoy": "Hoy", "manana": "Mañana", "ayer": "Ayer"}[tipo]
+            titulo = f"📺 *Partidos de {nombre} ({fecha})*"
+            return cache_mensajes.obtener(
+                (fuente, fecha_obj, tipo, formatter.VERSION_PLANTILLA), partidos,
+                lambda: formatter.bloques_partidos(partidos, fecha, titulo))
             
         elif tipo == "semana":
+            # Una sola descarga para los 7 días
+            partidos_rango = await servicio.obtener_rango(ParrillaService.AGREGADO, date.today(), 7)
             partidos_semana = {}
-            for i in range(7):
-                fecha_obj = datetime.now() + timedelta(days=i)
-                fecha_str = DateUtils.get_fecha_es(fecha_obj)
-                partidos = scraper.obtener_partidos_fecha(fecha_str)
+            for fecha_obj, partidos in partidos_rango.items():
                 if partidos:
-                    partidos_semana[fecha_str] = partidos
+                    partidos_semana[DateUtils.get_fecha_es(fecha_obj)] = partidos
             
-            return formatter.format_resumen_semanal(partidos_semana)
+            return cache_mensajes.obtener(
+                (ParrillaService.AGREGADO, date.today(), tipo, formatter.VERSION_PLANTILLA), partidos_semana,
+                lambda: formatter.bloques_resumen_semanal(partidos_semana))
         
         else:
-            return "❌ Tipo de consulta no válido. Usa: 'hoy', 'manana' o 'semana'"
+            return MensajeRenderizado.desde_bloques(["❌ Tipo de consulta no válido. Usa: 'hoy', 'manana', 'ayer' o 'semana'"])
             
     except Exception as e:
         logger.error(f"❌ Error en obtener_partidos: {e}")
-        return f"❌ *Error obteniendo partidos*\n\nOcurrió un error al consultar los partidos. Intenta nuevamente en unos minutos.\n\n_Error: {str(e)[:100]}_"
+        return MensajeRenderizado.desde_bloques([f"❌ *Error obteniendo partidos*\n\nOcurrió un error al consultar los partidos. Intenta nuevamente en unos minutos.\n\n_Error: {str(e)[:100]}_"])
 
-async def enviar_mensaje(tipo: str = "hoy", chat_id: str = None):
+async def obtener_partidos(tipo: str = "hoy") -> str:
+    """
+    Función principal para obtener partidos
+    tipo: 'hoy', 'manana', 'ayer', 'semana'
+    """
+    return (await obtener_mensaje(tipo)).texto
+
+async def enviar_mensaje(tipo: str = "hoy", chat_id: str = None, bot: "Bot" = None):
     """
     Envía mensaje por Telegram
-    tipo: 'hoy', 'manana', 'semana'
+    tipo: 'hoy', 'manana', 'ayer', 'semana'
     chat_id: ID del chat (opcional, usa CHAT_ID por defecto)
+    bot: instancia a reutilizar (opcional, se crea una nueva por defecto)
     """
     if not BOT_TOKEN:
         logger.error("❌ BOT_TOKEN no está configurado")
@@ -443,33 +929,200 @@ async def enviar_mensaje(tipo: str = "hoy", chat_id: str = None):
     try:
         logger.info(f"🚀 Iniciando envío de partidos ({tipo}) a chat {chat_id}")
         
-        bot = Bot(token=BOT_TOKEN)
-        texto = obtener_partidos(tipo)
-        
-        # Verificar longitud del mensaje (Telegram tiene límite de 4096 caracteres)
-        if len(texto) > 4000:
-            # Dividir mensaje si es muy largo
-            partes = [texto[i:i+4000] for i in range(0, len(texto), 4000)]
-            for i, parte in enumerate(partes):
-                await bot.send_message(
-                    chat_id=chat_id, 
-                    text=f"{parte}\n\n📄 _Parte {i+1}/{len(partes)}_", 
-                    parse_mode='Markdown'
-                )
-                if i < len(partes) - 1:  # Pausa entre mensajes
-                    await asyncio.sleep(1)
-        else:
+        bot = bot or crear_bot()
+        mensaje = await obtener_mensaje(tipo)
+        await enviar_partes(bot, chat_id, mensaje.partes)
+        
+        logger.info(f"✅ Mensaje enviado exitosamente")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Error enviando mensaje: {e}")
+        return False
+
+def crear_bot() -> "Bot":
+    """Bot de Telegram con BOT_TOKEN; python-telegram-bot se carga aquí la primera vez"""
+    from telegram import Bot
+    return Bot(token=BOT_TOKEN)
+
+def dividir_texto(texto: str) -> List[str]:
+    """Divide un texto que supera el límite de Telegram en partes numeradas, sin cortar líneas"""
+    return dividir_en_partes(texto.splitlines(keepends=True))
+
+async def enviar_partes(bot: "Bot", chat_id: str, partes: List[str]):
+    """Envía partes ya divididas en Markdown, con pausa entre ellas"""
+    for i, parte in enumerate(partes):
+        with metricas.medir("envio", modo="directo"):
             await bot.send_message(
                 chat_id=chat_id, 
-                text=texto, 
+                text=parte, 
                 parse_mode='Markdown'
             )
+        metricas.incrementar("parrilla_mensajes_enviados_total", modo="directo")
+        if i < len(partes) - 1:  # Pausa entre mensajes
+            await asyncio.sleep(PAUSA_ENTRE_PARTES)
+
+async def enviar_texto(bot: "Bot", chat_id: str, texto: str):
+    """Envía un texto en Markdown, dividiéndolo si supera el límite de Telegram"""
+    await enviar_partes(bot, chat_id, dividir_texto(texto))
+
+def chats_de_difusion() -> Iterator[str]:
+    """CHAT_ID, CHAT_IDS y todos los suscriptores activos, sin repetir"""
+    fijos = list(dict.fromkeys(CHAT_IDS + ([CHAT_ID] if CHAT_ID else [])))
+    yield from fijos
+    vistos = set(fijos)
+    for chat_id in get_registro().iterar_chat_ids():
+        if chat_id not in vistos:
+            yield chat_id
+
+async def difundir_texto(texto: str, chat_ids: Iterable[str], bot: "Bot" = None) -> ResultadoDifusion:
+    """Reparte un texto ya renderizado entre muchos chats respetando los límites de Telegram"""
+    return await difundir_partes(dividir_texto(texto), chat_ids, bot)
+
+async def difundir_partes(partes: List[str], chat_ids: Iterable[str], bot: "Bot" = None) -> ResultadoDifusion:
+    """Reparte un mensaje ya dividido en partes entre muchos chats"""
+    async def _difundir(bot_activo: "Bot"):
+        difusor = Difusor(bot_activo, BROADCAST_RATE, BROADCAST_CONCURRENCY, BROADCAST_RETRIES)
+        resultado = await difusor.difundir(chat_ids, partes)
+        if resultado.bloqueados:
+            # Chats que bloquearon al bot: no volver a intentarlo
+            get_registro().desactivar_varios(resultado.bloqueados)
+        return resultado
+    
+    if bot is not None:
+        return await _difundir(bot)
+    async with crear_bot() as bot_nuevo:
+        return await _difundir(bot_nuevo)
+
+async def difundir(tipo: str = "hoy", chat_ids: Iterable[str] = None, bot: "Bot" = None):
+    """
+    Envía los partidos a muchos chats: el mensaje se renderiza una sola vez y se
+    reparte en paralelo respetando los límites de Telegram.
+    chat_ids: por defecto CHAT_ID, CHAT_IDS y los suscriptores activos
+    """
+    if not BOT_TOKEN:
+        logger.error("❌ BOT_TOKEN no está configurado")
+        return None
+    
+    mensaje = await obtener_mensaje(tipo)
+    logger.info(f"📣 Difundiendo partidos ({tipo})")
+    return await difundir_partes(mensaje.partes, chats_de_difusion() if chat_ids is None else chat_ids, bot)
+
+async def entregar_suscripciones(bot: "Bot", ahora: datetime = None):
+    """
+    Envía los partidos de hoy a los suscriptores cuya hora de envío (en su zona) es ahora.
+    Se renderiza un mensaje para los chats sin preferencia de liga y uno por liga elegida.
+    """
+    from zoneinfo import ZoneInfo
+    
+    registro = get_registro()
+    partidos_hoy = None
+    
+    for zona in registro.zonas_horarias():
+        try:
+            momento = (ahora or datetime.now(ZoneInfo(zona))).astimezone(ZoneInfo(zona))
+        except Exception:
+            logger.warning(f"⚠️ Zona horaria desconocida en suscripciones: {zona}")
+            continue
+        hora = momento.strftime('%H:%M')
+        ligas = registro.ligas_con_hora(zona, hora)
+        chats_generales = registro.iterar_chat_ids(hora_envio=hora, zona_horaria=zona, sin_ligas=True)
         
-        logger.info(f"✅ Mensaje enviado exitosamente")
+        primero = next(chats_generales, None)
+        if primero is None and not ligas:
+            continue
+        
+        if partidos_hoy is None:
+            fuente, dias = FUENTES_POR_TIPO["hoy"]
+            partidos_hoy = await servicio.obtener_partidos(fuente, date.today() + timedelta(days=dias))
+        
+        if primero is not None:
+            logger.info(f"📬 Entregando partidos de hoy a suscriptores ({zona} {hora})")
+            mensaje = await obtener_mensaje("hoy")
+            await difundir_partes(mensaje.partes, itertools.chain([primero], chats_generales), bot)
+        
+        fecha = DateUtils.get_hoy()
+        for liga in ligas:
+            partidos_liga = [p for p in partidos_hoy if p.liga_id == liga]
+            canonica = clasificador.por_id(liga)
+            nombre = canonica.nombre if canonica else liga
+            titulo = f"📺 *{nombre} - Hoy ({fecha})*"
+            mensaje = cache_mensajes.obtener(
+                (fuente, date.today() + timedelta(days=dias), f"liga:{liga}", DataFormatter.VERSION_PLANTILLA),
+                partidos_liga, lambda: DataFormatter.bloques_partidos(partidos_liga, fecha, titulo))
+            chats_liga = registro.iterar_chat_ids(hora_envio=hora, zona_horaria=zona, liga=liga)
+            await difundir_partes(mensaje.partes, chats_liga, bot)
+
+async def bucle_suscripciones(bot: "Bot"):
+    """Revisa cada minuto si hay suscriptores con envío programado"""
+    while True:
+        ahora = datetime.now()
+        await asyncio.sleep(60 - ahora.second - ahora.microsecond / 1_000_000)
+        try:
+            await entregar_suscripciones(bot)
+        except Exception as e:
+            logger.error(f"❌ Error entregando suscripciones: {e}")
+
+async def obtener_cambios(tipo: str = "hoy", motor: MotorCambios = None) -> Optional[MensajeRenderizado]:
+    """
+    Compara la parrilla actual con la última registrada.
+    Retorna el mensaje con los cambios (dividido entre bloques) o None si no hay
+    nada que notificar.
+    tipo: 'hoy', 'manana', 'semana'
+    """
+    if motor is None:
+        motor = MotorCambios(Partido.from_dict, CAMBIOS_FILE)
+    
+    if tipo == "semana":
+        consultas = [(ParrillaService.AGREGADO, date.today() + timedelta(days=i)) for i in range(7)]
+    elif tipo in FUENTES_POR_TIPO:
+        fuente, dias = FUENTES_POR_TIPO[tipo]
+        consultas = [(fuente, date.today() + timedelta(days=dias))]
+    else:
+        raise ValueError(f"Tipo de consulta no válido: {tipo}")
+    
+    bloques = []
+    for fuente, fecha in consultas:
+        # Esperar a todas las fuentes: una fuente lenta o caída no debe parecer partidos retirados
+        partidos = await servicio.agregador.obtener(fecha, completo=True)
+        cambios = motor.comparar(fuente, fecha, partidos)
+        
+        if cambios.inicial:
+            logger.info(f"📌 Línea base registrada para {fuente} {fecha}: {len(partidos)} partidos")
+        elif not cambios.vacio:
+            logger.info(f"🔔 {cambios.total} cambios en {fuente} {fecha}")
+            if bloques:
+                bloques[-1] += "\n\n"
+            bloques.extend(DataFormatter.bloques_cambios(cambios, DateUtils.get_fecha_es(fecha)))
+    
+    return MensajeRenderizado.desde_bloques(bloques) if bloques else None
+
+async def enviar_cambios(tipo: str = "hoy", chat_id: str = None, bot: "Bot" = None):
+    """
+    Envía por Telegram solo los cambios de la parrilla desde la última ejecución.
+    Si no hay cambios no se envía nada.
+    """
+    if not BOT_TOKEN:
+        logger.error("❌ BOT_TOKEN no está configurado")
+        return False
+    
+    chat_id = chat_id or CHAT_ID
+    if not chat_id:
+        logger.error("❌ CHAT_ID no está configurado")
+        return False
+    
+    try:
+        mensaje = await obtener_cambios(tipo)
+        if mensaje is None:
+            logger.info(f"✅ Sin cambios en la parrilla ({tipo}), no se envía mensaje")
+            return True
+        
+        await enviar_partes(bot or crear_bot(), chat_id, mensaje.partes)
+        logger.info(f"✅ Cambios enviados exitosamente")
         return True
         
     except Exception as e:
-        logger.error(f"❌ Error enviando mensaje: {e}")
+        logger.error(f"❌ Error enviando cambios: {e}")
         return False
 
 async def enviar_multiple(tipos: List[str] = None):
@@ -482,6 +1135,76 @@ async def enviar_multiple(tipos: List[str] = None):
         await enviar_mensaje(tipo)
         await asyncio.sleep(2)  # Pausa entre envíos
 
+async def ejecutar_daemon(programacion: str = None):
+    """
+    Modo residente: ejecuta las tareas de DAEMON_SCHEDULE reutilizando un solo Bot,
+    el pool HTTP, el pool de parseo y la cache entre ejecuciones.
+    Acciones: hoy, manana, semana, todo, cambios:<tipo>, difundir:<tipo>
+    """
+    if not BOT_TOKEN:
+        logger.error("❌ BOT_TOKEN no está configurado")
+        return False
+    
+    tareas = parsear_programacion(programacion if programacion is not None else DAEMON_SCHEDULE)
+    zona = None
+    if DAEMON_TZ:
+        from zoneinfo import ZoneInfo
+        zona = ZoneInfo(DAEMON_TZ)
+    
+    motor = MotorCambios(Partido.from_dict, CAMBIOS_FILE)
+    
+    async with crear_bot() as bot:
+        async def ejecutar_tarea(tarea: Tarea):
+            logger.info(f"📤 Ejecutando tarea programada: {tarea.accion}")
+            if tarea.accion in ("hoy", "manana", "semana"):
+                await enviar_mensaje(tarea.accion, bot=bot)
+            elif tarea.accion == "todo":
+                for tipo in ("hoy", "manana"):
+                    await enviar_mensaje(tipo, bot=bot)
+            elif tarea.accion.startswith("difundir"):
+                await difundir(tarea.accion.partition(":")[2] or "hoy", bot=bot)
+            elif tarea.accion.startswith("cambios"):
+                tipo = tarea.accion.partition(":")[2] or "hoy"
+                mensaje = await obtener_cambios(tipo, motor)
+                if mensaje is not None:
+                    await enviar_partes(bot, CHAT_ID, mensaje.partes)
+            else:
+                logger.error(f"❌ Acción desconocida en la programación: {tarea.accion}")
+        
+        bucles = []
+        if tareas:
+            programador = Programador(tareas, ejecutar_tarea, zona)
+            bucles.append(programador.ejecutar_siempre())
+        if DAEMON_SUSCRIPCIONES:
+            bucles.append(bucle_suscripciones(bot))
+        if not bucles:
+            logger.error("❌ El daemon no tiene tareas ni suscripciones que atender")
+            return False
+        
+        logger.info(f"🕰️ Daemon iniciado con {len(tareas)} tareas: {tareas} (suscripciones: {DAEMON_SUSCRIPCIONES})")
+        registrar_medidores(servicio)
+        servidor_metricas = await servir_metricas(METRICAS_PUERTO, METRICAS_HOST) if METRICAS_PUERTO else None
+        if cache_persistente is not None:
+            bucles.append(bucle_checkpoint())
+        try:
+            await asyncio.gather(*bucles)
+        finally:
+            if servidor_metricas is not None:
+                servidor_metricas.close()
+    
+    return True
+
+async def ejecutar_y_cerrar(corrutina):
+    """Ejecuta una corrutina y libera las conexiones HTTP y el pool de parseo al terminar (modo cron)"""
+    try:
+        return await corrutina
+    finally:
+        # La próxima ejecución arranca con lo que se descargó en esta
+        guardar_cache()
+        servicio.agregador.cancelar_pendientes()
+        await cerrar_http_cliente()
+        parse_pool.cerrar()
+
 # === FUNCIÓN PARA PRUEBAS ===
 def mostrar_partidos_consola(tipo: str = "hoy"):
     """Muestra partidos en consola para pruebas"""
@@ -489,17 +1212,116 @@ def mostrar_partidos_consola(tipo: str = "hoy"):
     print(f"🔍 PROBANDO OBTENCIÓN DE PARTIDOS ({tipo.upper()})")
     print(f"{'='*50}")
     
-    texto = obtener_partidos(tipo)
+    texto = asyncio.run(ejecutar_y_cerrar(obtener_partidos(tipo)))
     print(texto)
     
     print(f"\n{'='*50}")
     print(f"✅ PRUEBA COMPLETADA")
     print(f"{'='*50}\n")
 
+def mostrar_estadisticas(tipo: str = "hoy", repeticiones: int = 2, prometheus: bool = False):
+    """
+    Obtiene y renderiza los partidos sin enviar nada y muestra cuánto tardó cada
+    etapa (descarga, parseo, extracción, formato). La primera repetición va a la
+    red; las siguientes muestran el camino con la cache caliente.
+    """
+    registrar_medidores(servicio)
+    
+    async def medir():
+        for _ in range(repeticiones):
+            with metricas.medir("total", tipo=tipo):
+                await obtener_mensaje(tipo)
+    
+    asyncio.run(ejecutar_y_cerrar(medir()))
+    
+    if prometheus:
+        print(metricas.exponer())
+        return
+    
+    print(f"\n{'='*78}")
+    print(f"📈 ESTADÍSTICAS ({tipo.upper()}, {repeticiones} repeticiones, parseo {PARSE_POOL_MODE}/{PARSER_BACKEND})")
+    print(f"{'='*78}")
+    print(f"{'etapa':<12} {'etiquetas':<28} {'n':>4} {'media ms':>10} {'p95 ms':>9} {'max ms':>9}")
+    for fila in metricas.etapas():
+        print(f"{fila['etapa']:<12} {fila['etiquetas']:<28} {fila['n']:>4} "
+              f"{fila['media'] * 1000:>10.1f} {fila['p95'] * 1000:>9.1f} {fila['max'] * 1000:>9.1f}")
+    print()
+    for nombre, serie in sorted(metricas.contadores().items()):
+        for etiquetas, valor in sorted(serie.items()):
+            print(f"{nombre}{{{etiquetas}}} = {valor:g}")
+    print(f"parrilla_cache_mensajes: {cache_mensajes.aciertos} aciertos ({cache_mensajes.desde_respaldo} del disco), "
+          f"{cache_mensajes.renderizados} renderizados")
+    print(f"{'='*78}\n")
+
+def mostrar_arranque(argumentos: List[str]):
+    """
+    Informe estilo -X importtime: cuánto tarda en arrancar el proceso y qué
+    importaciones pesan más. Sin argumentos mide solo 'import bot_parrilla';
+    con argumentos ejecuta ese comando (p. ej. 'test hoy', que no envía nada).
+    """
+    from servicios.arranque import medir_arranque
+    
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    if argumentos:
+        informe = medir_arranque([os.path.abspath(__file__), *argumentos], directorio)
+    else:
+        informe = medir_arranque(["-c", "import bot_parrilla"], directorio, repeticiones=3)
+    interprete = medir_arranque(["-c", "pass"], directorio, repeticiones=3)
+    
+    print(f"\n{'='*78}")
+    print(f"🚀 ARRANQUE: {' '.join(informe.comando)}")
+    print(f"{'='*78}")
+    print(f"Proceso completo:        {informe.duracion * 1000:8.1f} ms (código de salida {informe.codigo})")
+    print(f"Intérprete vacío:        {interprete.duracion * 1000:8.1f} ms")
+    print(f"Suma de importaciones:   {informe.total_importaciones * 1000:8.1f} ms "
+          f"({len(informe.importaciones)} módulos)")
+    print(f"\n{'importación':<44} {'acumulado ms':>13} {'propio ms':>10}")
+    for importacion in informe.mas_costosas():
+        nombre = "  " * importacion.nivel + importacion.modulo
+        print(f"{nombre:<44} {importacion.acumulado * 1000:>13.1f} {importacion.propio * 1000:>10.1f}")
+    print(f"\n{'paquete':<44} {'propio ms':>13} {'módulos':>10}")
+    for paquete, propio, modulos in informe.por_paquete():
+        print(f"{paquete:<44} {propio * 1000:>13.1f} {modulos:>10}")
+    print(f"{'='*78}\n")
+
+def mostrar_historial(consulta: str = ""):
+    """
+    Consultas al archivo de partidos sin descargar nada: sin argumentos, un
+    resumen (fechas, fuentes, ligas y canales con más partidos); con un equipo,
+    sus últimas jornadas archivadas.
+    """
+    if archivo_partidos is None:
+        print("❌ HISTORIAL_DB está vacío: el archivo de partidos está desactivado")
+        return
+    
+    print(f"\n{'='*78}")
+    if consulta:
+        equipos, partidos = servicio.historial_equipo(consulta)
+        print(f"📜 HISTORIAL: {', '.join(equipos) or consulta}")
+        print(f"{'='*78}")
+        for fecha, partido in partidos:
+            print(f"{fecha.isoformat()}  {partido.hora:<14} {partido.equipos} ({partido.liga}) · {partido.canal}")
+        if not partidos:
+            print(f"Sin partidos archivados de \"{consulta}\"")
+    else:
+        resumen = archivo_partidos.resumen()
+        print(f"🗄️ ARCHIVO DE PARTIDOS ({HISTORIAL_DB})")
+        print(f"{'='*78}")
+        print(f"Partidos: {resumen['partidos']} en {resumen['dias']} días "
+              f"({resumen['desde'] or '-'} a {resumen['hasta'] or '-'}), "
+              f"{resumen['reprogramados']} con cambios de hora o canal")
+        for titulo, filas in (("fuente", resumen['fuentes']), ("liga", resumen['ligas']), ("canal", resumen['canales'])):
+            print(f"\n{titulo:<60} {'partidos':>10}")
+            for nombre, total in filas:
+                print(f"{nombre[:60]:<60} {total:>10}")
+    print(f"{'='*78}\n")
+
 # === PUNTO DE ENTRADA PRINCIPAL ===
 if __name__ == '__main__':
     import sys
     
+    setup_logging()
+    
     # Configurar argumentos de línea de comandos
     if len(sys.argv) > 1:
         comando = sys.argv[1].lower()
@@ -510,16 +1332,47 @@ if __name__ == '__main__':
             mostrar_partidos_consola(tipo_test)
             
         elif comando == "hoy":
-            asyncio.run(enviar_mensaje("hoy"))
+            asyncio.run(ejecutar_y_cerrar(enviar_mensaje("hoy")))
             
         elif comando == "manana":
-            asyncio.run(enviar_mensaje("manana"))
+            asyncio.run(ejecutar_y_cerrar(enviar_mensaje("manana")))
             
         elif comando == "semana":
-            asyncio.run(enviar_mensaje("semana"))
+            asyncio.run(ejecutar_y_cerrar(enviar_mensaje("semana")))
             
         elif comando == "todo":
-            asyncio.run(enviar_multiple(["hoy", "manana"]))
+            asyncio.run(ejecutar_y_cerrar(enviar_multiple(["hoy", "manana"])))
+            
+        elif comando == "daemon":
+            # Proceso residente con programación tipo cron (DAEMON_SCHEDULE)
+            try:
+                asyncio.run(ejecutar_y_cerrar(ejecutar_daemon()))
+            except KeyboardInterrupt:
+                logger.info("👋 Daemon detenido por el usuario")
+            
+        elif comando == "difundir":
+            # Envío a todos los chats de CHAT_IDS
+            tipo_difusion = sys.argv[2] if len(sys.argv) > 2 else "hoy"
+            asyncio.run(ejecutar_y_cerrar(difundir(tipo_difusion)))
+            
+        elif comando == "cambios":
+            # Solo notifica partidos nuevos, retirados, reprogramados o con cambio de canal
+            tipo_cambios = sys.argv[2] if len(sys.argv) > 2 else "hoy"
+            asyncio.run(ejecutar_y_cerrar(enviar_cambios(tipo_cambios)))
+            
+        elif comando == "stats":
+            # Tiempo de cada etapa sin enviar nada (--prometheus: formato de /metrics)
+            argumentos = [a for a in sys.argv[2:] if not a.startswith("--")]
+            mostrar_estadisticas(argumentos[0] if argumentos else "hoy",
+                                 prometheus="--prometheus" in sys.argv)
+            
+        elif comando == "arranque":
+            # Coste de arranque e importaciones (-X importtime) del comando indicado
+            mostrar_arranque(sys.argv[2:])
+            
+        elif comando == "historial":
+            # Resumen del archivo de partidos o historial de un equipo (no descarga nada)
+            mostrar_historial(" ".join(sys.argv[2:]))
             
         else:
             print("❌ Comando no reconocido")
@@ -528,8 +1381,14 @@ if __name__ == '__main__':
             print("  python bot_parrilla.py manana")
             print("  python bot_parrilla.py semana")
             print("  python bot_parrilla.py todo")
-            print("  python bot_parrilla.py test [hoy|manana|semana]")
+            print("  python bot_parrilla.py cambios [hoy|manana|semana]")
+            print("  python bot_parrilla.py difundir [hoy|manana|semana]")
+            print("  python bot_parrilla.py daemon")
+            print("  python bot_parrilla.py test [hoy|manana|ayer|semana]")
+            print("  python bot_parrilla.py stats [hoy|manana|semana] [--prometheus]")
+            print("  python bot_parrilla.py arranque [comando ...]")
+            print("  python bot_parrilla.py historial [equipo]")
     else:
         # Comportamiento por defecto - enviar partidos de hoy
         logger.info("🚀 Ejecutando modo por defecto: partidos de hoy")
-        asyncio.run(enviar_mensaje("hoy"))
\ No newline at end of file
+        asyncio.run(ejecutar_y_cerrar(enviar_mensaje("hoy")))
\ No newline at end of file
@@ -1,21 +1,75 @@
-EMOJI_LIGAS = {
-    "🇨🇴": ["liga betplay", "primera a", "primera b"],
-    "🇦🇷": ["liga profesional", "superliga argentina", "copa argentina"],
-    "🇲🇽": ["liga mx", "liga mexicana", "copa mx"],
-    "🇺🇸": ["mls", "major league soccer", "us open cup"],
-    "🇳🇱": ["eredivisie", "knvb beker"],
-    "🇵🇹": ["primeira liga", "taça de portugal", "taça da liga"],
-    "🇹🇷": ["süper lig", "turkish cup"],
-    "🇷🇺": ["russian premier league", "russian cup"],
-    "🇧🇪": ["jupiler pro league", "belgian cup"],
-    "🇩🇪": ["bundesliga"],
-    "🇫🇷": ["ligue 1"],
-    "🇬🇧": ["premier league", "championship", "fa cup", "carabao cup"],
-    "🇪🇸": ["la liga", "copa del rey", "supercopa de españa"],
-    "🇧🇷": ["campeonato brasileño serie a", "serie b", "copa do brasil"],
-    "🇮🇹": ["serie a", "coppa italia"],
-    "🏆": ["champions league", "uefa champions league", "libertadores", "copa libertadores", "copa america", "eurocopa"],
-    "🥈": ["europa league", "uefa europa league"],
-    "🥉": ["sudamericana", "copa sudamericana", "conference league", "uefa conference league"],
-    "🌍": ["mundial", "world cup", "copa mundial", "eurocopa", "european championship", "copa america", "africa cup of nations", "asia cup", "eliminatorias"]
-}
\ No newline at end of file
+# Liga canónica -> (emoji, nombre, palabras clave)
+# El orden define la prioridad cuando varias palabras clave aparecen en el mismo texto.
+LIGAS = {
+    # Colombia
+    "liga-betplay": ("🇨🇴", "Liga BetPlay", ["liga betplay", "primera a"]),
+    "primera-b": ("🇨🇴", "Primera B", ["primera b", "torneo betplay"]),
+    # Argentina
+    "liga-profesional": ("🇦🇷", "Liga Profesional Argentina", ["liga profesional", "superliga argentina"]),
+    "copa-argentina": ("🇦🇷", "Copa Argentina", ["copa argentina"]),
+    # México
+    "liga-mx": ("🇲🇽", "Liga MX", ["liga mx", "liga mexicana"]),
+    "copa-mx": ("🇲🇽", "Copa MX", ["copa mx"]),
+    # Estados Unidos
+    "mls": ("🇺🇸", "MLS", ["mls", "major league soccer"]),
+    "us-open-cup": ("🇺🇸", "US Open Cup", ["us open cup"]),
+    # Países Bajos
+    "eredivisie": ("🇳🇱", "Eredivisie", ["eredivisie"]),
+    "knvb-beker": ("🇳🇱", "KNVB Beker", ["knvb beker"]),
+    # Portugal
+    "primeira-liga": ("🇵🇹", "Primeira Liga", ["primeira liga"]),
+    "taca-de-portugal": ("🇵🇹", "Taça de Portugal", ["taça de portugal"]),
+    "taca-da-liga": ("🇵🇹", "Taça da Liga", ["taça da liga"]),
+    # Turquía
+    "super-lig": ("🇹🇷", "Süper Lig", ["süper lig"]),
+    "turkish-cup": ("🇹🇷", "Copa de Turquía", ["turkish cup"]),
+    # Rusia
+    "russian-premier-league": ("🇷🇺", "Liga Premier de Rusia", ["russian premier league"]),
+    "russian-cup": ("🇷🇺", "Copa de Rusia", ["russian cup"]),
+    # Bélgica
+    "jupiler-pro-league": ("🇧🇪", "Jupiler Pro League", ["jupiler pro league"]),
+    "belgian-cup": ("🇧🇪", "Copa de Bélgica", ["belgian cup"]),
+    # Alemania
+    "bundesliga": ("🇩🇪", "Bundesliga", ["bundesliga"]),
+    # Francia
+    "ligue-1": ("🇫🇷", "Ligue 1", ["ligue 1"]),
+    # Inglaterra
+    "premier-league": ("🇬🇧", "Premier League", ["premier league"]),
+    "championship": ("🇬🇧", "Championship", ["championship"]),
+    "fa-cup": ("🇬🇧", "FA Cup", ["fa cup"]),
+    "carabao-cup": ("🇬🇧", "Carabao Cup", ["carabao cup"]),
+    # España
+    "la-liga": ("🇪🇸", "La Liga", ["la liga", "laliga"]),
+    "copa-del-rey": ("🇪🇸", "Copa del Rey", ["copa del rey"]),
+    "supercopa-de-espana": ("🇪🇸", "Supercopa de España", ["supercopa de españa"]),
+    # Brasil
+    "brasileirao": ("🇧🇷", "Brasileirão", ["campeonato brasileño serie a", "brasileirao"]),
+    "serie-b": ("🇧🇷", "Serie B", ["serie b"]),
+    "copa-do-brasil": ("🇧🇷", "Copa do Brasil", ["copa do brasil"]),
+    # Italia
+    "serie-a": ("🇮🇹", "Serie A", ["serie a"]),
+    "coppa-italia": ("🇮🇹", "Coppa Italia", ["coppa italia"]),
+    # Torneos internacionales
+    "champions-league": ("🏆", "Champions League", ["champions league", "uefa champions league"]),
+    "libertadores": ("🏆", "Copa Libertadores", ["libertadores", "copa libertadores"]),
+    "copa-america": ("🏆", "Copa América", ["copa america"]),
+    "eurocopa": ("🏆", "Eurocopa", ["eurocopa", "european championship"]),
+    "europa-league": ("🥈", "Europa League", ["europa league", "uefa europa league"]),
+    "sudamericana": ("🥉", "Copa Sudamericana", ["sudamericana", "copa sudamericana"]),
+    "conference-league": ("🥉", "Conference League", ["conference league", "uefa conference league"]),
+    "mundial": ("🌍", "Mundial", ["mundial", "world cup", "copa mundial"]),
+    "africa-cup-of-nations": ("🌍", "Copa Africana de Naciones", ["africa cup of nations"]),
+    "asia-cup": ("🌍", "Copa Asiática", ["asia cup"]),
+    "eliminatorias": ("🌍", "Eliminatorias", ["eliminatorias"]),
+    "amistosos": ("🤝", "Amistosos", ["amistoso", "amistosos"]),
+    # Genéricas: solo si no coincidió ninguna liga concreta
+    "colombia": ("🇨🇴", "Fútbol colombiano", ["betplay", "colombia"]),
+    "argentina": ("🇦🇷", "Fútbol argentino", ["argentina"]),
+    "brasil": ("🇧🇷", "Fútbol brasileño", ["brasil", "brazil"]),
+    "espana": ("🇪🇸", "Fútbol español", ["españa"]),
+    "italia": ("🇮🇹", "Fútbol italiano", ["italia"]),
+    "francia": ("🇫🇷", "Fútbol francés", ["francia", "ligue"]),
+    "alemania": ("🇩🇪", "Fútbol alemán", ["alemania"]),
+    "inglaterra": ("🇬🇧", "Fútbol inglés", ["premier", "inglaterra"]),
+    "uefa": ("🏆", "UEFA", ["uefa", "champions"]),
+}
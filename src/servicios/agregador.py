@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import re
+import time
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from servicios.texto import normalizar
+
+logger = logging.getLogger('ParrillaCronBot')
+
+# Palabras que no distinguen a un equipo entre fuentes ("Millonarios FC" = "Millonarios")
+PALABRAS_IGNORADAS = frozenset({'fc', 'cf', 'sc', 'cd', 'ac', 'club', 'de', 'del', 'la', 'el', 'los'})
+
+# Nombres que publican las fuentes cuando aún no se conocen los equipos: nunca identifican un partido
+EQUIPOS_POR_CONFIRMAR = frozenset({
+    frozenset({'por', 'confirmar'}), frozenset({'por', 'definir'}), frozenset({'a', 'confirmar'}),
+    frozenset({'a', 'definir'}), frozenset({'tbd'}), frozenset({'tbc'}),
+})
+
+SEPARADOR_EQUIPOS = re.compile(r'\s+(?:vs\.?|v|-|–)\s+', re.IGNORECASE)
+PATRON_HORA = re.compile(r'(\d{1,2}):(\d{2})\s*([ap])?\.?\s*m?\.?', re.IGNORECASE)
+
+
+def normalizar_equipo(nombre: str) -> FrozenSet[str]:
+    """Palabras significativas del nombre de un equipo, sin tildes ni puntuación"""
+    palabras = re.sub(r'[\W_]+', ' ', normalizar(nombre)).split()
+    return frozenset(p for p in palabras if p not in PALABRAS_IGNORADAS) or frozenset(palabras)
+
+
+def minutos_del_dia(hora: str) -> Optional[int]:
+    """'20:00', '8:00 p.m.' -> minutos desde medianoche; None si no hay hora"""
+    coincidencia = PATRON_HORA.search(hora or '')
+    if not coincidencia:
+        return None
+    horas, minutos, meridiano = int(coincidencia.group(1)), int(coincidencia.group(2)), coincidencia.group(3)
+    if meridiano:
+        horas = horas % 12 + (12 if meridiano.lower() == 'p' else 0)
+    return horas * 60 + minutos
+
+
+class _Huella:
+    """Forma normalizada de un partido para compararlo con los de otras fuentes"""
+
+    def __init__(self, partido):
+        equipos = SEPARADOR_EQUIPOS.split(partido.equipos, maxsplit=1)
+        self.equipos: Tuple[FrozenSet[str], ...] = tuple(normalizar_equipo(e) for e in equipos)
+        self.minutos = minutos_del_dia(partido.hora)
+        # Con un equipo por confirmar no hay forma de saber si es el mismo partido
+        self.identificable = all(e and e not in EQUIPOS_POR_CONFIRMAR for e in self.equipos)
+
+    @staticmethod
+    def _mismo_equipo(a: FrozenSet[str], b: FrozenSet[str], misma_hora: bool) -> bool:
+        # "Nacional" coincide con "Atlético Nacional" solo si la hora es la misma:
+        # "Millonarios" y "Millonarios Femenino" (o "Sub-20") son otro partido
+        return a == b or (misma_hora and (a < b or b < a))
+
+    def coincide(self, otra: '_Huella', tolerancia: int) -> bool:
+        if not (self.identificable and otra.identificable):
+            return False
+        conocidas = self.minutos is not None and otra.minutos is not None
+        if conocidas and abs(self.minutos - otra.minutos) > tolerancia:
+            return False
+        if len(self.equipos) != 2 or len(otra.equipos) != 2:
+            return self.equipos == otra.equipos
+        misma_hora = conocidas and self.minutos == otra.minutos
+        (l1, v1), (l2, v2) = self.equipos, otra.equipos
+        return ((self._mismo_equipo(l1, l2, misma_hora) and self._mismo_equipo(v1, v2, misma_hora)) or
+                (self._mismo_equipo(l1, v2, misma_hora) and self._mismo_equipo(v1, l2, misma_hora)))
+
+
+class FuenteAgregada:
+    """Fuente registrada en el agregador"""
+
+    def __init__(self, nombre: str, obtener: Callable[[date], Awaitable[List[Any]]],
+                 cubre: Callable[[date], bool] = None, timeout: float = None):
+        self.nombre = nombre
+        self.obtener = obtener
+        self.cubre = cubre or (lambda fecha: True)
+        self.timeout = timeout
+
+
+class Agregador:
+    """
+    Consulta todas las fuentes que cubren una fecha en paralelo y combina sus partidos.
+
+    Cada fuente tiene su propio timeout (None: lo impone la propia fuente). En
+    cuanto responde la primera fuente sana se espera como mucho 'espera_adicional'
+    segundos a las demás: las que siguen pendientes continúan en segundo plano
+    (y calientan su cache para la próxima consulta) sin retrasar la respuesta.
+    Con completo=True se espera a todas.
+
+    El mismo partido publicado por varias fuentes se deduplica comparando los
+    nombres normalizados de los equipos y la hora con 'tolerancia_minutos'
+    (un nombre contenido en otro solo vale con la misma hora, y los equipos
+    por confirmar nunca coinciden). Dentro de una misma fuente no se deduplica.
+    El orden de registro define la prioridad: los datos de la primera fuente
+    se conservan y completar(principal, otro) rellena lo que le falte.
+    """
+
+    def __init__(self, timeout: Optional[float] = 8.0, espera_adicional: float = 1.5, tolerancia_minutos: int = 30,
+                 completar: Callable[[Any, Any], Any] = None):
+        self.timeout = timeout
+        self.espera_adicional = espera_adicional
+        self.tolerancia_minutos = tolerancia_minutos
+        self.completar = completar or (lambda principal, otro: principal)
+        self.fuentes: List[FuenteAgregada] = []
+        self._pendientes: Set[asyncio.Task] = set()
+
+    def registrar(self, nombre: str, obtener: Callable[[date], Awaitable[List[Any]]],
+                  cubre: Callable[[date], bool] = None, timeout: float = None):
+        self.fuentes.append(FuenteAgregada(nombre, obtener, cubre, timeout))
+
+    async def _consultar(self, fuente: FuenteAgregada, fecha: date) -> List[Any]:
+        inicio = time.monotonic()
+        timeout = fuente.timeout or self.timeout
+        consulta = fuente.obtener(fecha)
+        partidos = await (asyncio.wait_for(consulta, timeout) if timeout else consulta)
+        logger.debug(f"🔗 {fuente.nombre}: {len(partidos)} partidos en {time.monotonic() - inicio:.2f}s")
+        return partidos
+
+    def _en_segundo_plano(self, tarea: asyncio.Task, nombre: str):
+        def terminar(t: asyncio.Task):
+            self._pendientes.discard(t)
+            if not t.cancelled() and t.exception() is not None:
+                logger.warning(f"⚠️ Fuente {nombre} falló en segundo plano: {t.exception()!r}")
+        self._pendientes.add(tarea)
+        tarea.add_done_callback(terminar)
+
+    async def obtener(self, fecha: date, completo: bool = False) -> List[Any]:
+        """
+        Partidos combinados de todas las fuentes que cubren la fecha.
+        Lanza la excepción de la primera fuente si ninguna respondió; con
+        completo=True la lanza si falló cualquiera (para no dar por retirados
+        los partidos de una fuente caída).
+        """
+        fuentes = [f for f in self.fuentes if f.cubre(fecha)]
+        if not fuentes:
+            return []
+
+        tareas: Dict[asyncio.Task, FuenteAgregada] = {
+            asyncio.ensure_future(self._consultar(f, fecha)): f for f in fuentes
+        }
+        resultados: Dict[str, List[Any]] = {}
+        errores: List[Tuple[str, BaseException]] = []
+
+        def recoger(hechas):
+            for tarea in hechas:
+                fuente = tareas[tarea]
+                if tarea.exception() is None:
+                    resultados[fuente.nombre] = tarea.result()
+                else:
+                    error = tarea.exception()
+                    if isinstance(error, asyncio.TimeoutError):
+                        logger.warning(f"⏱️ Fuente {fuente.nombre} sin respuesta a tiempo")
+                    else:
+                        logger.warning(f"⚠️ Fuente {fuente.nombre} falló: {error!r}")
+                    errores.append((fuente.nombre, error))
+
+        pendientes = set(tareas)
+        try:
+            if completo:
+                hechas, pendientes = await asyncio.wait(pendientes)
+                recoger(hechas)
+            else:
+                # Hasta la primera fuente sana (o hasta que fallen todas)
+                while pendientes and not resultados:
+                    hechas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                    recoger(hechas)
+                if pendientes and resultados:
+                    hechas, pendientes = await asyncio.wait(pendientes, timeout=self.espera_adicional)
+                    recoger(hechas)
+        except asyncio.CancelledError:
+            for tarea in pendientes:
+                tarea.cancel()
+            raise
+
+        for tarea in pendientes:
+            logger.info(f"🐢 Fuente {tareas[tarea].nombre} lenta, se responde sin ella")
+            self._en_segundo_plano(tarea, tareas[tarea].nombre)
+
+        if not resultados or (completo and errores):
+            raise errores[0][1]
+
+        # Combinar en orden de prioridad (con una sola fuente solo se ordena)
+        return self.combinar([resultados[f.nombre] for f in fuentes if f.nombre in resultados])
+
+    def combinar(self, listas: List[List[Any]]) -> List[Any]:
+        """
+        Une listas de partidos (de mayor a menor prioridad, una por fuente) sin
+        repetir partidos y ordenadas por hora. Un partido solo se compara con los
+        de fuentes anteriores, y cada uno de ellos absorbe como mucho uno de cada
+        fuente: dos partidos de la misma fuente nunca se funden.
+        """
+        combinados: List[Any] = []
+        huellas: List[_Huella] = []
+        duplicados = 0
+
+        for lista in listas:
+            anteriores = len(combinados)
+            absorbidos: Set[int] = set()
+            for partido in lista:
+                huella = _Huella(partido)
+                for i in range(anteriores):
+                    if i not in absorbidos and huellas[i].coincide(huella, self.tolerancia_minutos):
+                        combinados[i] = self.completar(combinados[i], partido)
+                        absorbidos.add(i)
+                        duplicados += 1
+                        break
+                else:
+                    combinados.append(partido)
+                    huellas.append(huella)
+
+        logger.debug(f"🔀 {len(combinados)} partidos combinados de {len(listas)} fuentes ({duplicados} duplicados)")
+
+        # Orden por hora; los partidos sin hora reconocible al final
+        orden = {id(p): h.minutos for p, h in zip(combinados, huellas)}
+        return sorted(combinados, key=lambda p: (orden[id(p)] is None, orden[id(p)] or 0))
+
+    def cancelar_pendientes(self):
+        """Cancela las consultas que siguen en segundo plano (al cerrar)"""
+        for tarea in list(self._pendientes):
+            tarea.cancel()
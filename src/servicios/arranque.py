@@ -0,0 +1,85 @@
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+
+class Importacion:
+    """Una línea de python -X importtime (tiempos en segundos)"""
+
+    def __init__(self, modulo: str, propio: float, acumulado: float, nivel: int):
+        self.modulo = modulo
+        self.propio = propio
+        self.acumulado = acumulado
+        self.nivel = nivel
+
+    @property
+    def paquete(self) -> str:
+        return self.modulo.split('.')[0]
+
+
+class InformeArranque:
+    """Resultado de ejecutar un comando con -X importtime"""
+
+    def __init__(self, comando: List[str], duracion: float, importaciones: List[Importacion], codigo: int):
+        self.comando = comando
+        self.duracion = duracion
+        self.importaciones = importaciones
+        self.codigo = codigo
+
+    @property
+    def total_importaciones(self) -> float:
+        return sum(i.propio for i in self.importaciones)
+
+    def mas_costosas(self, nivel_maximo: int = 1, limite: int = 15) -> List[Importacion]:
+        """Importaciones directas (y las de primer nivel) por tiempo acumulado"""
+        candidatas = [i for i in self.importaciones if i.nivel <= nivel_maximo]
+        return sorted(candidatas, key=lambda i: i.acumulado, reverse=True)[:limite]
+
+    def por_paquete(self, limite: int = 15) -> List[Tuple[str, float, int]]:
+        """(paquete, tiempo propio de todos sus módulos, número de módulos)"""
+        paquetes: Dict[str, List[float]] = {}
+        for importacion in self.importaciones:
+            paquetes.setdefault(importacion.paquete, []).append(importacion.propio)
+        filas = [(paquete, sum(tiempos), len(tiempos)) for paquete, tiempos in paquetes.items()]
+        return sorted(filas, key=lambda f: f[1], reverse=True)[:limite]
+
+
+def parsear_importtime(salida: str) -> List[Importacion]:
+    """
+    Líneas 'import time: <propio us> | <acumulado us> | <módulo>' de stderr; la
+    sangría del nombre (dos espacios por nivel) indica quién importó a quién.
+    """
+    importaciones = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        partes = linea[len('import time:'):].split('|')
+        if len(partes) != 3:
+            continue
+        try:
+            propio, acumulado = int(partes[0]), int(partes[1])
+        except ValueError:
+            continue  # cabecera: self [us] | cumulative | imported package
+        nombre = partes[2].rstrip()
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        importaciones.append(Importacion(nombre.strip(), propio / 1e6, acumulado / 1e6, nivel))
+    return importaciones
+
+
+def medir_arranque(argumentos: List[str], directorio: str = None, repeticiones: int = 1) -> InformeArranque:
+    """
+    Ejecuta 'python -X importtime <argumentos>' en un proceso nuevo y retorna el
+    informe de la ejecución más rápida de 'repeticiones' (la primera suele pagar
+    además la compilación a .pyc).
+    """
+    comando = [sys.executable, '-X', 'importtime', *argumentos]
+    mejor = None
+    for _ in range(max(1, repeticiones)):
+        inicio = time.perf_counter()
+        proceso = subprocess.run(comando, cwd=directorio, capture_output=True, text=True,
+                                 encoding='utf-8', errors='replace')
+        duracion = time.perf_counter() - inicio
+        if mejor is None or duracion < mejor.duracion:
+            mejor = InformeArranque(argumentos, duracion, parsear_importtime(proceso.stderr), proceso.returncode)
+    return mejor
@@ -0,0 +1,124 @@
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class EntradaCache:
+    """Partidos procesados de una fuente, agrupados por fecha"""
+    
+    def __init__(self, partidos_por_fecha: Dict[date, List[Any]], guardado_en: float = None):
+        self.partidos_por_fecha = partidos_por_fecha
+        self.guardado_en = guardado_en if guardado_en is not None else time.time()
+    
+    @property
+    def edad(self) -> float:
+        """Segundos desde que se guardó la entrada"""
+        return time.time() - self.guardado_en
+
+
+class CacheParrilla:
+    """
+    Cache en memoria de partidos ya procesados (no de mensajes renderizados).
+    
+    Cada fuente guarda la última parrilla descargada; las consultas se hacen por
+    (fuente, fecha). Una entrada es fresca hasta ttl_fresco, se puede servir vencida
+    (stale-while-revalidate) hasta ttl_maximo y después se descarta.
+    
+    Con 'respaldo' (CachePersistente) las parrillas guardadas en disco se cargan
+    en el primer acceso, con la hora de su descarga original.
+    """
+    
+    def __init__(self, ttl_fresco: float = 300, ttl_maximo: float = 3600, respaldo=None):
+        self.ttl_fresco = ttl_fresco
+        self.ttl_maximo = ttl_maximo
+        self.respaldo = respaldo
+        self._pendiente_de_carga = respaldo is not None
+        self._entradas: Dict[str, EntradaCache] = {}
+        self._por_revalidar: Set[str] = set()
+        self._lock = threading.Lock()
+        # Aumenta con cada cambio de contenido (para reconstruir índices derivados)
+        self.version = 0
+    
+    def _cargar_respaldo(self):
+        """Se llama con el lock tomado; solo lee el disco la primera vez"""
+        if not self._pendiente_de_carga:
+            return
+        self._pendiente_de_carga = False
+        for fuente, (partidos_por_fecha, guardado_en) in self.respaldo.cargar_parrillas().items():
+            # Lo guardado en esta ejecución antes del primer acceso es más reciente
+            if fuente not in self._entradas and time.time() - guardado_en < self.ttl_maximo:
+                self._entradas[fuente] = EntradaCache(partidos_por_fecha, guardado_en)
+                self.version += 1
+    
+    def obtener(self, fuente: str, fecha: date) -> Optional[Tuple[List[Any], bool]]:
+        """
+        Retorna (partidos, fresca) para la fecha o None si no hay datos utilizables.
+        Una entrada vencida queda marcada para revalidación en segundo plano.
+        """
+        with self._lock:
+            self._cargar_respaldo()
+            entrada = self._entradas.get(fuente)
+            if entrada is None:
+                return None
+            
+            edad = entrada.edad
+            if edad >= self.ttl_maximo:
+                del self._entradas[fuente]
+                self.version += 1
+                return None
+            
+            fresca = edad < self.ttl_fresco
+            if not fresca:
+                self._por_revalidar.add(fuente)
+            
+            # La parrilla cubre todas las fechas publicadas: una fecha ausente no tiene partidos
+            return entrada.partidos_por_fecha.get(fecha, []), fresca
+    
+    def guardar(self, fuente: str, partidos_por_fecha: Dict[date, List[Any]]):
+        """Reemplaza la parrilla cacheada de una fuente"""
+        with self._lock:
+            self._entradas[fuente] = EntradaCache(partidos_por_fecha)
+            self._por_revalidar.discard(fuente)
+            self.version += 1
+    
+    def instantanea(self) -> Dict[str, Dict[date, List[Any]]]:
+        """Parrillas utilizables de todas las fuentes, sin descargar nada"""
+        with self._lock:
+            self._cargar_respaldo()
+            return {
+                fuente: entrada.partidos_por_fecha
+                for fuente, entrada in self._entradas.items()
+                if entrada.edad < self.ttl_maximo
+            }
+    
+    def fuentes_por_revalidar(self) -> Set[str]:
+        """Fuentes vencidas o marcadas como vencidas al ser consultadas"""
+        with self._lock:
+            self._cargar_respaldo()
+            vencidas = {
+                fuente for fuente, entrada in self._entradas.items()
+                if entrada.edad >= self.ttl_fresco
+            }
+            return vencidas | self._por_revalidar
+    
+    def exportar(self) -> Dict[str, Tuple[Dict[date, List[Any]], float]]:
+        """{fuente: (partidos por fecha, guardado_en)} de las entradas utilizables (para el respaldo)"""
+        with self._lock:
+            self._cargar_respaldo()
+            return {
+                fuente: (entrada.partidos_por_fecha, entrada.guardado_en)
+                for fuente, entrada in self._entradas.items()
+                if entrada.edad < self.ttl_maximo
+            }
+    
+    def invalidar(self, fuente: str = None):
+        """Elimina una fuente de la cache (o todas si no se indica)"""
+        with self._lock:
+            if fuente is None:
+                self._entradas.clear()
+                self._por_revalidar.clear()
+            else:
+                self._entradas.pop(fuente, None)
+                self._por_revalidar.discard(fuente)
+            self.version += 1
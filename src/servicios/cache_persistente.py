@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from servicios.mensajes import MensajeRenderizado, huella_estable
+from servicios.metricas import metricas
+
+logger = logging.getLogger('ParrillaCronBot')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS parrillas (
+    fuente      TEXT PRIMARY KEY,
+    guardado_en REAL NOT NULL,           -- time.time() de la descarga: la frescura sobrevive al reinicio
+    partidos    TEXT NOT NULL            -- JSON {fecha ISO: [partido.to_dict(), ...]}
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS mensajes (
+    clave       TEXT PRIMARY KEY,        -- repr() de la clave de CacheMensajes
+    huella      TEXT NOT NULL,           -- huella_estable() de los partidos de origen
+    texto       TEXT NOT NULL,
+    partes      TEXT NOT NULL,           -- JSON [parte, ...]
+    guardado_en REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class CachePersistente:
+    """
+    Copia en SQLite de la cache de partidos y de los mensajes renderizados, para
+    que un reinicio del bot arranque con la cache caliente.
+
+    Abrir no lee nada: la base se abre con la primera consulta de la cache en
+    memoria, que carga las parrillas con su hora de descarga original (una
+    parrilla vieja llega vencida y se revalida en segundo plano). Los mensajes se
+    buscan de uno en uno cuando una clave falta en memoria y solo se usan si la
+    huella de sus partidos coincide. checkpoint() escribe lo que cambió desde el
+    último.
+    """
+
+    def __init__(self, ruta: str, desde_dict: Callable[[Dict], Any], retencion_mensajes: float = 86400):
+        self.ruta = ruta
+        self.desde_dict = desde_dict
+        self.retencion_mensajes = retencion_mensajes
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._en_disco: Dict[str, float] = {}   # guardado_en de cada parrilla escrita o cargada
+        self.cargas = 0
+        self.checkpoints = 0
+
+    def _abrir(self) -> sqlite3.Connection:
+        if self._conexion is None:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript(ESQUEMA)
+        return self._conexion
+
+    # === Lectura ===
+
+    def cargar_parrillas(self) -> Dict[str, Tuple[Dict[date, List[Any]], float]]:
+        """{fuente: (partidos por fecha, guardado_en)}; vacío si la base no se puede leer"""
+        try:
+            with self._lock, metricas.medir('carga_cache'):
+                filas = self._abrir().execute("SELECT fuente, guardado_en, partidos FROM parrillas").fetchall()
+                resultado = {}
+                for fuente, guardado_en, partidos in filas:
+                    resultado[fuente] = ({
+                        date.fromisoformat(fecha): [self.desde_dict(p) for p in lista]
+                        for fecha, lista in json.loads(partidos).items()
+                    }, guardado_en)
+        except (sqlite3.Error, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"⚠️ Cache persistente ilegible ({self.ruta}), se arranca en frío: {e}")
+            return {}
+        self.cargas += 1
+        self._en_disco = {fuente: guardado_en for fuente, (_, guardado_en) in resultado.items()}
+        if resultado:
+            edades = ', '.join(f"{f} hace {time.time() - g:.0f}s" for f, (_, g) in resultado.items())
+            logger.info(f"🔥 Cache caliente cargada de {self.ruta}: {edades}")
+        return resultado
+
+    def cargar_mensaje(self, clave: Hashable) -> Optional[Tuple[str, MensajeRenderizado]]:
+        """(huella estable, mensaje) guardados para la clave, o None"""
+        try:
+            with self._lock:
+                fila = self._abrir().execute(
+                    "SELECT huella, texto, partes FROM mensajes WHERE clave = ?", (repr(clave),)).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"Mensaje persistente no disponible: {e}")
+            return None
+        if fila is None:
+            return None
+        return fila[0], MensajeRenderizado(fila[1], json.loads(fila[2]))
+
+    # === Escritura ===
+
+    def checkpoint(self, cache, mensajes=None) -> bool:
+        """
+        Guarda las parrillas de 'cache' (CacheParrilla) si cambiaron y los mensajes
+        de 'mensajes' (CacheMensajes) aún no guardados. Retorna True si escribió algo.
+        """
+        parrillas = cache.exportar()
+        if {fuente: guardado_en for fuente, (_, guardado_en) in parrillas.items()} == self._en_disco:
+            parrillas = None
+        pendientes = mensajes.pendientes_de_respaldo() if mensajes is not None else []
+        if parrillas is None and not pendientes:
+            return False
+
+        ahora = time.time()
+        filas_mensajes = [
+            (repr(clave), huella_estable(entrada.origen), entrada.mensaje.texto,
+             json.dumps(entrada.mensaje.partes, ensure_ascii=False), ahora)
+            for clave, entrada in pendientes
+        ]
+        try:
+            with self._lock, metricas.medir('checkpoint'):
+                conexion = self._abrir()
+                with conexion:
+                    if parrillas is not None:
+                        # Reemplazo completo: lo que ya no está en memoria tampoco debe volver
+                        conexion.execute("DELETE FROM parrillas")
+                        conexion.executemany(
+                            "INSERT INTO parrillas (fuente, guardado_en, partidos) VALUES (?, ?, ?)",
+                            ((fuente, guardado_en, self._serializar(partidos_por_fecha))
+                             for fuente, (partidos_por_fecha, guardado_en) in parrillas.items()),
+                        )
+                    conexion.executemany(
+                        "INSERT OR REPLACE INTO mensajes (clave, huella, texto, partes, guardado_en) "
+                        "VALUES (?, ?, ?, ?, ?)", filas_mensajes)
+                    conexion.execute("DELETE FROM mensajes WHERE guardado_en < ?", (ahora - self.retencion_mensajes,))
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ No se pudo guardar la cache persistente: {e}")
+            return False
+
+        if parrillas is not None:
+            self._en_disco = {fuente: guardado_en for fuente, (_, guardado_en) in parrillas.items()}
+        for _, entrada in pendientes:
+            entrada.persistida = True
+        self.checkpoints += 1
+        logger.info(f"💾 Checkpoint de la cache: {len(parrillas or {})} parrillas, {len(filas_mensajes)} mensajes")
+        return True
+
+    @staticmethod
+    def _serializar(partidos_por_fecha: Dict[date, List[Any]]) -> str:
+        return json.dumps({fecha.isoformat(): [p.to_dict() for p in partidos]
+                           for fecha, partidos in partidos_por_fecha.items()}, ensure_ascii=False)
+
+    def cerrar(self):
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
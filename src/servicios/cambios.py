@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Tuple
+
+from servicios.texto import normalizar
+
+logger = logging.getLogger('ParrillaCronBot')
+
+
+def clave_partido(partido, fecha: date) -> Tuple[str, str, str]:
+    """Identidad estable de un partido: equipos + liga + fecha"""
+    return normalizar(partido.equipos), normalizar(partido.liga), fecha.isoformat()
+
+
+class Cambios:
+    """Diferencias entre dos versiones de la parrilla de una fecha"""
+
+    def __init__(self, fecha: date, inicial: bool = False):
+        self.fecha = fecha
+        self.inicial = inicial  # no había snapshot previo: todo es línea base
+        self.agregados: List[Any] = []
+        self.eliminados: List[Any] = []
+        self.reprogramados: List[Tuple[Any, Any]] = []  # (antes, después)
+        self.cambios_canal: List[Tuple[Any, Any]] = []  # (antes, después)
+
+    @property
+    def vacio(self) -> bool:
+        return not (self.agregados or self.eliminados or self.reprogramados or self.cambios_canal)
+
+    @property
+    def total(self) -> int:
+        return len(self.agregados) + len(self.eliminados) + len(self.reprogramados) + len(self.cambios_canal)
+
+
+def detectar_cambios(anteriores: List[Any], nuevos: List[Any], fecha: date) -> Cambios:
+    """Compara dos listas de partidos de la misma fecha por su identidad estable"""
+    cambios = Cambios(fecha)
+    previos = {clave_partido(p, fecha): p for p in anteriores}
+    actuales = {clave_partido(p, fecha): p for p in nuevos}
+
+    for clave, partido in actuales.items():
+        previo = previos.get(clave)
+        if previo is None:
+            cambios.agregados.append(partido)
+            continue
+        if normalizar(previo.hora) != normalizar(partido.hora):
+            cambios.reprogramados.append((previo, partido))
+        if normalizar(previo.canal) != normalizar(partido.canal):
+            cambios.cambios_canal.append((previo, partido))
+
+    cambios.eliminados = [p for clave, p in previos.items() if clave not in actuales]
+    return cambios
+
+
+class MotorCambios:
+    """
+    Compara cada parrilla nueva con el snapshot anterior guardado en disco (JSON).
+
+    El estado se guarda por (fuente, fecha) como lista de diccionarios
+    (partido.to_dict()); desde_dict reconstruye los objetos al cargar.
+    Las fechas con más de dias_retencion días de antigüedad se descartan.
+    """
+
+    def __init__(self, desde_dict: Callable[[Dict], Any], ruta: str = 'data/cambios.json',
+                 dias_retencion: int = 7):
+        self.ruta = ruta
+        self.desde_dict = desde_dict
+        self.dias_retencion = dias_retencion
+        self._estado: Dict[str, List[Dict]] = self._cargar()
+
+    def _cargar(self) -> Dict[str, List[Dict]]:
+        try:
+            with open(self.ruta, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Estado de cambios ilegible, se inicia vacío: {e}")
+            return {}
+
+    def _guardar(self):
+        limite = (date.today() - timedelta(days=self.dias_retencion)).isoformat()
+        self._estado = {k: v for k, v in self._estado.items() if k.split('|', 1)[1] >= limite}
+
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = self.ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(self._estado, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+
+    def comparar(self, fuente: str, fecha: date, partidos: List[Any]) -> Cambios:
+        """Detecta los cambios frente al snapshot anterior y guarda el nuevo como referencia"""
+        llave = f"{fuente}|{fecha.isoformat()}"
+        previos = self._estado.get(llave)
+
+        if previos and not partidos:
+            # Una parrilla vacía suele ser un fallo de la fuente, no una cancelación masiva
+            logger.warning(f"⚠️ Parrilla vacía para {llave}, se conserva el snapshot anterior")
+            return Cambios(fecha)
+
+        if previos is None:
+            cambios = Cambios(fecha, inicial=True)
+        else:
+            cambios = detectar_cambios([self.desde_dict(d) for d in previos], partidos, fecha)
+
+        self._estado[llave] = [p.to_dict() for p in partidos]
+        try:
+            self._guardar()
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo guardar el estado de cambios: {e}")
+
+        return cambios
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Iterable, List
+
+from servicios.metricas import metricas
+
+logger = logging.getLogger('ParrillaCronBot')
+
+
+class TokenBucket:
+    """
+    Limitador de tasa asíncrono: 'tasa' tokens por segundo con ráfagas de hasta
+    'capacidad'. penalizar() congela el bucket (p. ej. ante un RetryAfter global).
+    """
+
+    def __init__(self, tasa: float, capacidad: float = None):
+        self.tasa = tasa
+        self.capacidad = capacidad if capacidad is not None else tasa
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._pausa_hasta = 0.0
+        self._lock = asyncio.Lock()
+
+    def _recargar(self, ahora: float):
+        self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    async def adquirir(self):
+        """Espera hasta que haya un token disponible y lo consume"""
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                if ahora < self._pausa_hasta:
+                    await asyncio.sleep(self._pausa_hasta - ahora)
+                    continue
+                self._recargar(ahora)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.tasa)
+
+    def penalizar(self, segundos: float):
+        """Detiene la entrega de tokens durante 'segundos'"""
+        self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+        self._tokens = 0
+
+
+class ResultadoDifusion:
+    """Resumen de una difusión"""
+
+    def __init__(self):
+        self.enviados = 0
+        self.fallidos: List[str] = []
+        self.bloqueados: List[str] = []  # el chat bloqueó al bot o ya no existe
+        self.reintentos = 0
+        self.duracion = 0.0
+
+    def __repr__(self) -> str:
+        return (f"ResultadoDifusion(enviados={self.enviados}, fallidos={len(self.fallidos)}, "
+                f"bloqueados={len(self.bloqueados)}, reintentos={self.reintentos}, duracion={self.duracion:.1f}s)")
+
+
+def _segundos(retry_after) -> float:
+    # PTB entrega int o timedelta según la configuración
+    return retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+
+
+class Difusor:
+    """
+    Envía el mismo mensaje (ya renderizado y dividido en partes) a muchos chats.
+
+    Los envíos se reparten entre 'concurrencia' workers y pasan por un token
+    bucket global (Telegram admite ~30 mensajes/s por bot). Las partes de un
+    mismo chat se separan 'intervalo_por_chat' segundos (~1 mensaje/s por chat).
+    RetryAfter pausa el bucket global y los errores de red se reintentan con
+    backoff exponencial; cada uno admite hasta 'reintentos' reintentos por
+    parte, así un chat que siempre recibe RetryAfter no detiene la difusión.
+    """
+
+    def __init__(self, bot, tasa_global: float = 25, concurrencia: int = 20, reintentos: int = 3,
+                 intervalo_por_chat: float = 1.0, parse_mode: str = 'Markdown'):
+        self.bot = bot
+        self.bucket = TokenBucket(tasa_global)
+        self.concurrencia = max(1, concurrencia)
+        self.reintentos = reintentos
+        self.intervalo_por_chat = intervalo_por_chat
+        self.parse_mode = parse_mode
+
+    async def _enviar_parte(self, chat_id: str, texto: str, resultado: ResultadoDifusion) -> bool:
+        from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+        intentos = 0
+        esperas = 0
+        while True:
+            await self.bucket.adquirir()
+            try:
+                with metricas.medir('envio', modo='difusion'):
+                    await self.bot.send_message(chat_id=chat_id, text=texto, parse_mode=self.parse_mode)
+                metricas.incrementar('parrilla_mensajes_enviados_total', modo='difusion')
+                return True
+            except RetryAfter as e:
+                # Límite de Telegram: pausar a todos los workers. Tiene su propio tope,
+                # separado de los errores de red
+                espera = _segundos(e.retry_after)
+                self.bucket.penalizar(espera)
+                esperas += 1
+                if esperas > self.reintentos:
+                    logger.error(f"❌ Envío a {chat_id} abandonado tras {self.reintentos} pausas por RetryAfter")
+                    resultado.fallidos.append(chat_id)
+                    return False
+                logger.warning(f"⏳ RetryAfter de Telegram: pausa de {espera:.0f}s")
+                resultado.reintentos += 1
+            except Forbidden:
+                resultado.bloqueados.append(chat_id)
+                return False
+            except BadRequest as e:
+                if 'chat not found' in str(e).lower():
+                    resultado.bloqueados.append(chat_id)
+                else:
+                    logger.error(f"❌ Mensaje rechazado para {chat_id}: {e}")
+                    resultado.fallidos.append(chat_id)
+                return False
+            except (TimedOut, NetworkError) as e:
+                intentos += 1
+                if intentos > self.reintentos:
+                    logger.error(f"❌ Envío a {chat_id} fallido tras {self.reintentos} reintentos: {e}")
+                    resultado.fallidos.append(chat_id)
+                    return False
+                resultado.reintentos += 1
+                await asyncio.sleep(2 ** (intentos - 1))
+
+    async def _enviar_chat(self, chat_id: str, partes: List[str], resultado: ResultadoDifusion):
+        for i, parte in enumerate(partes):
+            if i > 0:
+                await asyncio.sleep(self.intervalo_por_chat)
+            if not await self._enviar_parte(chat_id, parte, resultado):
+                return
+        resultado.enviados += 1
+
+    async def difundir(self, chat_ids: Iterable[str], partes: List[str]) -> ResultadoDifusion:
+        """Envía las partes a todos los chats; chat_ids puede ser un iterador perezoso"""
+        resultado = ResultadoDifusion()
+        inicio = time.monotonic()
+        cola: asyncio.Queue = asyncio.Queue(maxsize=self.concurrencia * 2)
+
+        async def worker():
+            while True:
+                chat_id = await cola.get()
+                try:
+                    if chat_id is None:
+                        return
+                    await self._enviar_chat(chat_id, partes, resultado)
+                except Exception as e:
+                    logger.error(f"❌ Error inesperado enviando a {chat_id}: {e}")
+                    resultado.fallidos.append(chat_id)
+                finally:
+                    cola.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrencia)]
+        try:
+            for chat_id in chat_ids:
+                await cola.put(str(chat_id))
+            for _ in workers:
+                await cola.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for tarea in workers:
+                tarea.cancel()
+
+        resultado.duracion = time.monotonic() - inicio
+        logger.info(f"📣 Difusión terminada: {resultado}")
+        return resultado
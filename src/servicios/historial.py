@@ -0,0 +1,235 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from servicios.agregador import SEPARADOR_EQUIPOS
+from servicios.indice import tokenizar
+from servicios.ligas import clasificar_liga
+from servicios.mensajes import huella_partidos
+from servicios.metricas import metricas
+from servicios.texto import normalizar
+
+logger = logging.getLogger('ParrillaCronBot')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS partidos (
+    id            INTEGER PRIMARY KEY,
+    fecha         TEXT NOT NULL,         -- ISO: el orden del texto es el de las fechas
+    fuente        TEXT NOT NULL,
+    clave         TEXT NOT NULL,         -- equipos y liga normalizados (identidad de servicios.cambios)
+    equipos       TEXT NOT NULL,
+    liga          TEXT NOT NULL,
+    liga_id       TEXT NOT NULL,         -- id canónico de servicios.ligas
+    hora          TEXT NOT NULL,
+    canal         TEXT NOT NULL,
+    visto_primero REAL NOT NULL,         -- time.time() de la primera descarga que lo trajo
+    cambiado_en   REAL NOT NULL          -- última vez que cambió la hora o el canal
+);
+
+-- "qué hubo el 16 de octubre" (y unicidad de cada partido por fuente)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_partidos_fecha
+    ON partidos (fecha, fuente, clave);
+
+-- "partidos de liga-betplay en octubre"
+CREATE INDEX IF NOT EXISTS idx_partidos_liga
+    ON partidos (liga_id, fecha);
+
+CREATE TABLE IF NOT EXISTS partido_equipos (
+    equipo     TEXT NOT NULL,            -- nombre de un equipo tokenizado: 'atletico nacional'
+    partido_id INTEGER NOT NULL REFERENCES partidos (id),
+    PRIMARY KEY (equipo, partido_id)
+) WITHOUT ROWID;
+
+-- Cada palabra de un equipo, para buscarlo por prefijo de cualquiera de ellas
+CREATE TABLE IF NOT EXISTS palabras_equipo (
+    palabra TEXT NOT NULL,
+    equipo  TEXT NOT NULL,
+    PRIMARY KEY (palabra, equipo)
+) WITHOUT ROWID;
+"""
+
+# Columnas para reconstruir un Partido (fecha ISO, fuente, datos de to_dict())
+_COLUMNAS = "p.fecha, p.fuente, p.equipos, p.liga, p.hora, p.canal"
+
+
+def equipos_de(partido) -> List[str]:
+    """Nombres tokenizados de los equipos de un partido ('Atlético Nacional vs Millonarios')"""
+    return [clave for clave in (' '.join(tokenizar(e)) for e in SEPARADOR_EQUIPOS.split(partido.equipos)) if clave]
+
+
+class ArchivoPartidos:
+    """
+    Archivo histórico en SQLite de todos los partidos descargados, por fecha y
+    fuente. Nunca se borra nada: un partido que desaparece de la parrilla sigue
+    en el archivo, y uno que vuelve a llegar solo actualiza su hora y canal
+    (con cambiado_en) si cambiaron. Con él se responde "qué hubo ayer" aunque la
+    fuente ya haya pasado de día, y el historial de un equipo, sin descargar nada.
+
+    Índices: por fecha (único, con fuente y partido), por liga canónica y fecha,
+    y por equipo (más una tabla de palabras para resolver nombres por prefijo,
+    igual que IndicePartidos). La base se abre con el primer acceso.
+    """
+
+    def __init__(self, ruta: str, desde_dict: Callable[[Dict], Any]):
+        self.ruta = ruta
+        self.desde_dict = desde_dict
+        self._conexion: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._huellas: Dict[str, int] = {}   # última parrilla registrada por fuente
+        self.registros = 0
+
+    def _abrir(self) -> sqlite3.Connection:
+        if self._conexion is None:
+            directorio = os.path.dirname(self.ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            self._conexion = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript(ESQUEMA)
+        return self._conexion
+
+    # === Escritura ===
+
+    def registrar(self, fuente: str, partidos_por_fecha: Dict[date, List[Any]]) -> bool:
+        """
+        Agrega al archivo los partidos de una descarga. Una parrilla igual a la
+        última registrada de la misma fuente no se vuelve a escribir. Retorna
+        True si escribió.
+        """
+        huella = huella_partidos(partidos_por_fecha)
+        if self._huellas.get(fuente) == huella:
+            return False
+
+        ahora = time.time()
+        filas = []
+        equipos = []
+        for fecha, partidos in partidos_por_fecha.items():
+            for partido in partidos:
+                clave = f"{normalizar(partido.equipos)}|{normalizar(partido.liga)}"
+                filas.append((fecha.isoformat(), fuente, clave, partido.equipos, partido.liga,
+                              clasificar_liga(partido.liga).id, partido.hora, partido.canal, ahora, ahora))
+                equipos.extend((equipo, fecha.isoformat(), fuente, clave) for equipo in equipos_de(partido))
+        palabras = {(palabra, equipo) for equipo, _, _, _ in equipos for palabra in equipo.split()}
+
+        try:
+            with self._lock, metricas.medir('archivo', fuente=fuente):
+                conexion = self._abrir()
+                with conexion:
+                    conexion.executemany(
+                        "INSERT INTO partidos (fecha, fuente, clave, equipos, liga, liga_id, hora, canal, "
+                        "visto_primero, cambiado_en) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT (fecha, fuente, clave) DO UPDATE SET "
+                        "hora = excluded.hora, canal = excluded.canal, cambiado_en = excluded.cambiado_en "
+                        "WHERE partidos.hora != excluded.hora OR partidos.canal != excluded.canal",
+                        filas)
+                    conexion.executemany(
+                        "INSERT OR IGNORE INTO partido_equipos (equipo, partido_id) "
+                        "SELECT ?, id FROM partidos WHERE fecha = ? AND fuente = ? AND clave = ?",
+                        equipos)
+                    conexion.executemany(
+                        "INSERT OR IGNORE INTO palabras_equipo (palabra, equipo) VALUES (?, ?)", palabras)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ No se pudo registrar {fuente} en el archivo de partidos: {e}")
+            return False
+
+        self._huellas[fuente] = huella
+        self.registros += 1
+        logger.debug(f"🗄️ Archivo de partidos: {len(filas)} partidos de {fuente}")
+        return True
+
+    # === Consultas ===
+
+    def _consultar(self, sql: str, parametros: Iterable = ()) -> List[tuple]:
+        try:
+            with self._lock, metricas.medir('consulta_archivo'):
+                return self._abrir().execute(sql, tuple(parametros)).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Archivo de partidos no disponible ({self.ruta}): {e}")
+            return []
+
+    def _partidos(self, filas: List[tuple]) -> List[Tuple[date, str, Any]]:
+        return [
+            (date.fromisoformat(fecha), fuente,
+             self.desde_dict({'equipos': equipos, 'liga': liga, 'hora': hora, 'canal': canal}))
+            for fecha, fuente, equipos, liga, hora, canal in filas
+        ]
+
+    def por_fecha(self, fecha: date, fuente: str = None) -> Dict[str, List[Any]]:
+        """{fuente: partidos} archivados de una fecha, en el orden en que se vieron por primera vez"""
+        sql = f"SELECT {_COLUMNAS} FROM partidos p WHERE p.fecha = ?"
+        parametros = [fecha.isoformat()]
+        if fuente is not None:
+            sql += " AND p.fuente = ?"
+            parametros.append(fuente)
+        resultado: Dict[str, List[Any]] = {}
+        for _, nombre, partido in self._partidos(self._consultar(sql + " ORDER BY p.id", parametros)):
+            resultado.setdefault(nombre, []).append(partido)
+        return resultado
+
+    def por_liga(self, liga_id: str, desde: date, hasta: date) -> List[Tuple[date, str, Any]]:
+        """(fecha, fuente, partido) de una liga canónica entre dos fechas (incluidas)"""
+        return self._partidos(self._consultar(
+            f"SELECT {_COLUMNAS} FROM partidos p WHERE p.liga_id = ? AND p.fecha BETWEEN ? AND ? "
+            "ORDER BY p.fecha, p.id", (liga_id, desde.isoformat(), hasta.isoformat())))
+
+    def equipos(self, consulta: str) -> List[str]:
+        """Equipos archivados cuyo nombre tiene una palabra que empieza por cada palabra de la consulta"""
+        tokens = tokenizar(consulta)
+        if not tokens:
+            return []
+        exacto = self._consultar("SELECT 1 FROM partido_equipos WHERE equipo = ? LIMIT 1", (' '.join(tokens),))
+        if exacto:
+            return [' '.join(tokens)]
+        candidatos: Optional[Set[str]] = None
+        for token in set(tokens):
+            # Prefijo como rango sobre la clave primaria: token <= palabra < token + U+FFFF
+            coinciden = {equipo for (equipo,) in self._consultar(
+                "SELECT equipo FROM palabras_equipo WHERE palabra >= ? AND palabra < ?", (token, token + '\uffff'))}
+            candidatos = coinciden if candidatos is None else candidatos & coinciden
+            if not candidatos:
+                return []
+        return sorted(candidatos)
+
+    def de_equipos(self, equipos: List[str], hasta: date = None, fechas: int = 20) -> List[Tuple[date, str, Any]]:
+        """
+        (fecha, fuente, partido) de las últimas 'fechas' jornadas en que jugó
+        alguno de los equipos, de la más reciente a la más antigua.
+        """
+        if not equipos:
+            return []
+        marcas = ', '.join('?' * len(equipos))
+        return self._partidos(self._consultar(
+            f"SELECT {_COLUMNAS} FROM partidos p "
+            f"WHERE p.id IN (SELECT partido_id FROM partido_equipos WHERE equipo IN ({marcas})) "
+            f"AND p.fecha IN (SELECT DISTINCT p2.fecha FROM partido_equipos e JOIN partidos p2 ON p2.id = e.partido_id "
+            f"                WHERE e.equipo IN ({marcas}) AND p2.fecha <= ? ORDER BY p2.fecha DESC LIMIT ?) "
+            "ORDER BY p.fecha DESC, p.id",
+            (*equipos, *equipos, (hasta or date.max).isoformat(), fechas)))
+
+    def resumen(self, limite: int = 10) -> Dict[str, Any]:
+        """Totales del archivo: partidos, rango de fechas, y los que más aparecen por fuente, liga y canal"""
+        total = self._consultar("SELECT COUNT(*), MIN(fecha), MAX(fecha), COUNT(DISTINCT fecha) FROM partidos")
+        partidos, primera, ultima, dias = total[0] if total else (0, None, None, 0)
+        agrupar = lambda columna: self._consultar(
+            f"SELECT {columna}, COUNT(*) AS n FROM partidos GROUP BY {columna} ORDER BY n DESC LIMIT ?", (limite,))
+        return {
+            'partidos': partidos,
+            'dias': dias,
+            'desde': date.fromisoformat(primera) if primera else None,
+            'hasta': date.fromisoformat(ultima) if ultima else None,
+            'reprogramados': (self._consultar(
+                "SELECT COUNT(*) FROM partidos WHERE cambiado_en > visto_primero") or [(0,)])[0][0],
+            'fuentes': agrupar('fuente'),
+            'ligas': agrupar('liga_id'),
+            'canales': agrupar('canal'),
+        }
+
+    def cerrar(self):
+        with self._lock:
+            if self._conexion is not None:
+                self._conexion.close()
+                self._conexion = None
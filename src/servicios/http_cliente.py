@@ -0,0 +1,157 @@
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+from servicios.snapshots import Snapshot, SnapshotStore
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger('ParrillaCronBot')
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/120.0.0.0 Safari/537.36"
+)
+
+
+class HttpCliente:
+    """
+    Cliente HTTP asíncrono compartido por scrapers y handlers.
+    
+    Mantiene un pool de conexiones keep-alive (httpx.AsyncClient) para no abrir
+    una conexión TLS nueva por consulta y no bloquear el event loop del bot.
+    httpx se importa con la primera petición: un proceso que responde desde la
+    cache no lo carga.
+    """
+    
+    def __init__(self, timeout: float = 15, max_conexiones: int = 20, max_keepalive: int = 10,
+                 headers: Dict[str, str] = None):
+        self.timeout = timeout
+        self.max_conexiones = max_conexiones
+        self.max_keepalive = max_keepalive
+        self.headers = {"User-Agent": USER_AGENT, **(headers or {})}
+        self._cliente: Optional["httpx.AsyncClient"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _obtener_cliente(self) -> "httpx.AsyncClient":
+        # Un AsyncClient queda ligado al event loop donde se usa por primera vez
+        loop = asyncio.get_running_loop()
+        if self._cliente is None or self._cliente.is_closed or self._loop is not loop:
+            import httpx
+            self._cliente = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_conexiones,
+                                    max_keepalive_connections=self.max_keepalive),
+                headers=self.headers,
+                follow_redirects=True,
+            )
+            self._loop = loop
+        return self._cliente
+    
+    async def get(self, url: str, timeout: float = None, **kwargs) -> "httpx.Response":
+        """GET que lanza httpx.HTTPError si falla la conexión o el status no es 2xx"""
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        response = await self._obtener_cliente().get(url, **kwargs)
+        response.raise_for_status()
+        return response
+    
+    @staticmethod
+    def _cabeceras_condicionales(previo: Optional[Snapshot]) -> Dict[str, str]:
+        headers = {}
+        if previo is not None:
+            if previo.etag:
+                headers["If-None-Match"] = previo.etag
+            if previo.last_modified:
+                headers["If-Modified-Since"] = previo.last_modified
+        return headers
+    
+    async def get_condicional(self, url: str, store: SnapshotStore, timeout: float = None) -> Tuple[Snapshot, bool]:
+        """
+        GET condicional (If-None-Match / If-Modified-Since) contra el último snapshot.
+        Retorna (snapshot vigente, cambió): ante un 304 se reutiliza el cuerpo guardado.
+        En modo replay no toca la red si ya hay un snapshot.
+        """
+        previo = store.cargar(url)
+        if previo is not None and store.replay:
+            return previo, False
+        
+        kwargs = {"headers": self._cabeceras_condicionales(previo)}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        response = await self._obtener_cliente().get(url, **kwargs)
+        
+        if response.status_code == 304 and previo is not None:
+            logger.info(f"📦 Sin cambios (304): {url}")
+            return store.tocar(url), False
+        
+        response.raise_for_status()
+        snapshot = store.guardar(
+            url,
+            response.text,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        return snapshot, previo is None or previo.hash != snapshot.hash
+    
+    async def get_incremental(self, url: str, store: SnapshotStore, consumir: Callable[[str], bool],
+                              timeout: float = None) -> Tuple[Optional[Snapshot], bool]:
+        """
+        GET condicional que entrega el cuerpo a consumir(fragmento) a medida que llega.
+        consumir devuelve False para dejar de leer: se cierra la conexión sin guardar
+        nada y se retorna (None, True). Si se lee entero se guarda el snapshot como en
+        get_condicional. Ante un 304 (o en replay) consumir no se llama y se retorna
+        (snapshot guardado, False).
+        """
+        previo = store.cargar(url)
+        if previo is not None and store.replay:
+            return previo, False
+        
+        kwargs = {"headers": self._cabeceras_condicionales(previo)}
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        async with self._obtener_cliente().stream("GET", url, **kwargs) as response:
+            if response.status_code == 304 and previo is not None:
+                logger.info(f"📦 Sin cambios (304): {url}")
+                return store.tocar(url), False
+            
+            response.raise_for_status()
+            fragmentos = []
+            async for fragmento in response.aiter_text():
+                fragmentos.append(fragmento)
+                if consumir(fragmento) is False:
+                    logger.info(f"✂️ Lectura detenida tras {sum(map(len, fragmentos)) // 1024} KB: {url}")
+                    return None, True
+            
+            snapshot = store.guardar(
+                url,
+                "".join(fragmentos),
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified"),
+            )
+        return snapshot, previo is None or previo.hash != snapshot.hash
+    
+    async def cerrar(self):
+        if self._cliente is not None and not self._cliente.is_closed:
+            await self._cliente.aclose()
+        self._cliente = None
+        self._loop = None
+
+
+_cliente_compartido: Optional[HttpCliente] = None
+
+
+def get_http_cliente() -> HttpCliente:
+    """Cliente compartido del proceso"""
+    global _cliente_compartido
+    if _cliente_compartido is None:
+        _cliente_compartido = HttpCliente()
+    return _cliente_compartido
+
+
+async def cerrar_http_cliente():
+    """Cierra las conexiones del cliente compartido"""
+    if _cliente_compartido is not None:
+        await _cliente_compartido.cerrar()
@@ -0,0 +1,101 @@
+import bisect
+import re
+from datetime import date
+from typing import Any, Dict, List, Set, Tuple
+
+from servicios.agregador import SEPARADOR_EQUIPOS
+from servicios.ligas import clasificar_liga
+from servicios.texto import normalizar
+
+_SEPARADORES = re.compile(r'[\W_]+')  # separa lo que no es letra (de cualquier alfabeto) ni dígito
+
+
+def tokenizar(texto: str) -> List[str]:
+    """Palabras sin tildes ni mayúsculas: 'Atlético-Nacional' -> ['atletico', 'nacional']"""
+    return [t for t in _SEPARADORES.split(normalizar(texto)) if t]
+
+
+class IndicePartidos:
+    """
+    Índice invertido en memoria sobre equipos, ligas y canales de una parrilla.
+
+    Cada palabra apunta a los partidos que la contienen; las palabras se guardan
+    además ordenadas para resolver prefijos con búsqueda binaria ("real ma"
+    encuentra "Real Madrid"). Una consulta con varias palabras exige que todas
+    coincidan (intersección), empezando por la de menos resultados.
+
+    También guarda particiones ya calculadas por liga canónica y por equipo,
+    para que /liga y /equipo no recorran ni filtren la parrilla completa.
+    """
+
+    def __init__(self, partidos_por_fecha: Dict[date, List[Any]]):
+        self.partidos: List[Tuple[date, Any]] = []
+        self._postings: Dict[str, Set[int]] = {}
+        self.por_liga: Dict[str, List[Tuple[date, Any]]] = {}
+        self.por_equipo: Dict[str, List[Tuple[date, Any]]] = {}
+
+        for fecha in sorted(partidos_por_fecha):
+            for partido in partidos_por_fecha[fecha]:
+                posicion = len(self.partidos)
+                self.partidos.append((fecha, partido))
+                liga = clasificar_liga(partido.liga)
+                self.por_liga.setdefault(liga.id, []).append((fecha, partido))
+                for equipo in SEPARADOR_EQUIPOS.split(partido.equipos):
+                    clave = ' '.join(tokenizar(equipo))
+                    if clave:
+                        self.por_equipo.setdefault(clave, []).append((fecha, partido))
+                texto = ' '.join((partido.equipos, partido.liga, partido.canal, liga.nombre, liga.id))
+                for token in set(tokenizar(texto)):
+                    self._postings.setdefault(token, set()).add(posicion)
+
+        self._tokens = sorted(self._postings)
+
+    def __len__(self) -> int:
+        return len(self.partidos)
+
+    def _con_prefijo(self, prefijo: str) -> Set[int]:
+        inicio = bisect.bisect_left(self._tokens, prefijo)
+        resultado: Set[int] = set()
+        for token in self._tokens[inicio:]:
+            if not token.startswith(prefijo):
+                break
+            resultado |= self._postings[token]
+        return resultado
+
+    def equipos(self, consulta: str) -> List[str]:
+        """Equipos cuyo nombre contiene todas las palabras de la consulta (como prefijos)"""
+        tokens = tokenizar(consulta)
+        clave = ' '.join(tokens)
+        if clave in self.por_equipo:
+            return [clave]
+        return [
+            equipo for equipo in self.por_equipo
+            if tokens and all(any(palabra.startswith(t) for palabra in equipo.split()) for t in tokens)
+        ]
+
+    def partidos_de_equipos(self, equipos: List[str]) -> List[Tuple[date, Any]]:
+        """Partidos de varios equipos sin repetir (dos equipos buscados pueden enfrentarse)"""
+        vistos: Set[int] = set()
+        resultado = []
+        for equipo in equipos:
+            for fecha, partido in self.por_equipo.get(equipo, []):
+                if id(partido) not in vistos:
+                    vistos.add(id(partido))
+                    resultado.append((fecha, partido))
+        resultado.sort(key=lambda x: x[0])
+        return resultado
+
+    def buscar(self, consulta: str, limite: int = 50) -> List[Tuple[date, Any]]:
+        """Partidos (fecha, partido) que contienen todas las palabras de la consulta, en orden de fecha"""
+        tokens = tokenizar(consulta)
+        if not tokens:
+            return self.partidos[:limite]
+
+        # La última palabra puede estar a medio escribir: todas se tratan como prefijo
+        conjuntos = sorted((self._con_prefijo(t) for t in set(tokens)), key=len)
+        posiciones = conjuntos[0]
+        for conjunto in conjuntos[1:]:
+            if not posiciones:
+                break
+            posiciones = posiciones & conjunto
+        return [self.partidos[i] for i in sorted(posiciones)[:limite]]
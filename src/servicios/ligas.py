@@ -0,0 +1,83 @@
+import functools
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from config.emoji_ligas import LIGAS
+from servicios.texto import normalizar
+
+
+class Liga(NamedTuple):
+    """Liga canónica: id estable para filtros, nombre para mostrar y emoji"""
+    id: str
+    nombre: str
+    emoji: str
+
+
+LIGA_DESCONOCIDA = Liga("otras", "Otras", "⚽")
+
+
+class ClasificadorLigas:
+    """
+    Clasifica el texto de liga de cualquier fuente en una Liga canónica.
+
+    Todas las palabras clave se compilan en una sola expresión regular con
+    alternancia, ordenada por prioridad (orden de LIGAS). La alternancia va dentro
+    de un lookahead para evaluar cada posición del texto: en cada posición gana la
+    palabra de mayor prioridad, y entre posiciones gana la de mayor prioridad
+    global, igual que recorrer LIGAS en orden. Los resultados se memorizan por texto.
+    """
+
+    def __init__(self, ligas: Dict[str, Tuple[str, str, List[str]]], memo: int = 4096):
+        self._por_id: Dict[str, Liga] = {}
+        self._prioridad: Dict[str, Tuple[int, Liga]] = {}
+
+        for liga_id, (emoji, nombre, palabras) in ligas.items():
+            liga = Liga(liga_id, nombre, emoji)
+            self._por_id[liga_id] = liga
+            for palabra in palabras:
+                clave = normalizar(palabra)
+                self._prioridad.setdefault(clave, (len(self._prioridad), liga))
+
+        alternativas = sorted(self._prioridad, key=lambda p: self._prioridad[p][0])
+        self._patron = re.compile(
+            r'(?=(?<!\w)(' + '|'.join(re.escape(p) for p in alternativas) + r')(?!\w))'
+        )
+        self.clasificar = functools.lru_cache(maxsize=memo)(self._clasificar)
+
+    def _clasificar(self, texto: str) -> Liga:
+        mejor = None
+        for coincidencia in self._patron.finditer(normalizar(texto)):
+            candidato = self._prioridad[coincidencia.group(1)]
+            if mejor is None or candidato[0] < mejor[0]:
+                mejor = candidato
+        return mejor[1] if mejor else LIGA_DESCONOCIDA
+
+    def por_id(self, liga_id: str) -> Optional[Liga]:
+        return self._por_id.get(liga_id)
+
+    def buscar(self, consulta: str) -> Optional[Liga]:
+        """Liga a partir de lo que escribe un usuario (id, nombre o palabra clave)"""
+        consulta_normalizada = normalizar(consulta)
+        if consulta_normalizada in self._por_id:
+            return self._por_id[consulta_normalizada]
+        for liga in self._por_id.values():
+            if normalizar(liga.nombre) == consulta_normalizada:
+                return liga
+        # "premier" -> Premier League antes que la genérica de Inglaterra
+        for liga in self._por_id.values():
+            if normalizar(liga.nombre).startswith(consulta_normalizada):
+                return liga
+        liga = self.clasificar(consulta)
+        return None if liga is LIGA_DESCONOCIDA else liga
+
+    def ligas(self) -> List[Liga]:
+        return list(self._por_id.values())
+
+
+# Construido una sola vez al importar
+clasificador = ClasificadorLigas(LIGAS)
+
+
+def clasificar_liga(texto: str) -> Liga:
+    """Liga canónica para un texto de liga (memorizado)"""
+    return clasificador.clasificar(texto)
@@ -0,0 +1,194 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+from typing import Any, Callable, Hashable, List, Sequence, Set, Tuple
+
+from servicios.metricas import metricas
+
+# Telegram admite 4096 caracteres por mensaje; se deja margen para el pie "Parte i/n"
+LIMITE_MENSAJE = 4000
+
+_CAMPOS_PARTIDO = attrgetter('equipos', 'liga', 'hora', 'canal', 'fecha')
+
+
+class MensajeRenderizado:
+    """Mensaje completo y sus partes listas para enviar"""
+
+    def __init__(self, texto: str, partes: List[str]):
+        self.texto = texto
+        self.partes = partes
+
+    @classmethod
+    def desde_bloques(cls, bloques: Sequence[str], limite: int = LIMITE_MENSAJE) -> 'MensajeRenderizado':
+        return cls(''.join(bloques), dividir_en_partes(bloques, limite))
+
+
+def _pie(i: int, total: int) -> str:
+    return f"\n\n📄 _Parte {i}/{total}_"
+
+
+def dividir_en_partes(bloques: Sequence[str], limite: int = LIMITE_MENSAJE) -> List[str]:
+    """
+    Agrupa bloques (encabezado, un partido, pie...) en partes de hasta 'limite'
+    caracteres sin partir nunca un bloque, así una entidad Markdown (*...*, _..._)
+    no queda abierta en una parte y cerrada en la siguiente. Un bloque que por sí
+    solo no cabe se divide por líneas.
+    """
+    texto = ''.join(bloques)
+    if len(texto) <= limite:
+        return [texto]
+
+    # Reservar espacio para el pie de parte más largo posible
+    disponible = limite - len(_pie(999, 999))
+    partes: List[str] = []
+    actual: List[str] = []
+    largo = 0
+
+    def cerrar():
+        nonlocal actual, largo
+        if actual:
+            partes.append(''.join(actual).rstrip('\n'))
+        actual, largo = [], 0
+
+    for bloque in bloques:
+        piezas = [bloque] if len(bloque) <= disponible else bloque.splitlines(keepends=True)
+        for pieza in piezas:
+            while len(pieza) > disponible:
+                # Línea imposible de respetar: último recurso, corte fijo
+                cerrar()
+                partes.append(pieza[:disponible])
+                pieza = pieza[disponible:]
+            if largo + len(pieza) > disponible:
+                cerrar()
+            actual.append(pieza)
+            largo += len(pieza)
+    cerrar()
+
+    partes = [p for p in partes if p.strip()]
+    return [parte + _pie(i, len(partes)) for i, parte in enumerate(partes, start=1)]
+
+
+def _mismo_origen(anterior: Any, actual: Any) -> bool:
+    """True si 'actual' son exactamente los mismos objetos de partidos (sin recorrerlos)"""
+    if anterior is actual:
+        return True
+    if isinstance(anterior, dict) and isinstance(actual, dict):
+        return anterior.keys() == actual.keys() and all(anterior[k] is actual[k] for k in actual)
+    return False
+
+
+def _huella_elemento(elemento: Any):
+    if isinstance(elemento, tuple):
+        # Pares (fecha, partido) de las particiones del índice
+        return tuple(_huella_elemento(e) for e in elemento)
+    if hasattr(elemento, 'equipos'):
+        return _CAMPOS_PARTIDO(elemento)
+    return elemento
+
+
+def _contenido(origen: Any) -> tuple:
+    if isinstance(origen, dict):
+        return tuple((clave, _contenido(partidos)) for clave, partidos in origen.items())
+    return tuple(_huella_elemento(p) for p in origen)
+
+
+def huella_partidos(origen: Any) -> int:
+    """Huella del contenido de una lista de partidos o pares (fecha, partido), o de un dict {fecha: partidos}"""
+    return hash(_contenido(origen))
+
+
+def huella_estable(origen: Any) -> str:
+    """Como huella_partidos pero igual entre procesos (hash() de str cambia en cada arranque)"""
+    return hashlib.sha1(repr(_contenido(origen)).encode('utf-8')).hexdigest()
+
+
+class EntradaMensaje:
+    def __init__(self, origen: Any, huella: int, mensaje: MensajeRenderizado, persistida: bool = False):
+        self.origen = origen
+        self.huella = huella
+        self.mensaje = mensaje
+        self.persistida = persistida
+
+
+class CacheMensajes:
+    """
+    Cache de mensajes ya renderizados y divididos en partes.
+
+    La clave es (fuente, fecha, filtro, versión de plantilla). Cada entrada guarda
+    los partidos de los que salió: si la consulta llega con los mismos objetos
+    (la parrilla no se ha vuelto a descargar) se sirve sin más; si no, se compara
+    la huella del contenido y solo se vuelve a renderizar si la parrilla cambió.
+
+    Con 'respaldo' (CachePersistente) una clave que no está en memoria se busca
+    una vez en disco y se reutiliza si salió de los mismos partidos.
+    """
+
+    def __init__(self, maximo: int = 256, respaldo=None):
+        self.maximo = maximo
+        self.respaldo = respaldo
+        self._entradas: 'OrderedDict[Hashable, EntradaMensaje]' = OrderedDict()
+        self._consultadas_en_respaldo: Set[Hashable] = set()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.renderizados = 0
+        self.desde_respaldo = 0
+
+    def obtener(self, clave: Hashable, origen: Any,
+                renderizar: Callable[[], Sequence[str]]) -> MensajeRenderizado:
+        """
+        Mensaje para 'clave' generado a partir de 'origen' (lista de partidos o
+        dict {fecha: partidos}); renderizar() devuelve los bloques del mensaje.
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and _mismo_origen(entrada.origen, origen):
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada.mensaje
+
+        huella = huella_partidos(origen)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada.huella == huella:
+                # Mismo contenido con objetos nuevos (p. ej. otra descarga idéntica)
+                entrada.origen = origen
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada.mensaje
+            consultar_respaldo = (entrada is None and self.respaldo is not None
+                                  and clave not in self._consultadas_en_respaldo)
+            if consultar_respaldo:
+                self._consultadas_en_respaldo.add(clave)
+
+        if consultar_respaldo:
+            guardado = self.respaldo.cargar_mensaje(clave)
+            if guardado is not None and guardado[0] == huella_estable(origen):
+                self._insertar(clave, EntradaMensaje(origen, huella, guardado[1], persistida=True))
+                with self._lock:
+                    self.aciertos += 1
+                    self.desde_respaldo += 1
+                return guardado[1]
+
+        with metricas.medir('formato'):
+            mensaje = MensajeRenderizado.desde_bloques(renderizar())
+        self._insertar(clave, EntradaMensaje(origen, huella, mensaje))
+        with self._lock:
+            self.renderizados += 1
+        return mensaje
+
+    def _insertar(self, clave: Hashable, entrada: EntradaMensaje):
+        with self._lock:
+            self._entradas[clave] = entrada
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+    def pendientes_de_respaldo(self) -> List[Tuple[Hashable, EntradaMensaje]]:
+        """Entradas renderizadas que todavía no están en el respaldo en disco"""
+        with self._lock:
+            return [(clave, entrada) for clave, entrada in self._entradas.items() if not entrada.persistida]
+
+    def invalidar(self):
+        with self._lock:
+            self._entradas.clear()
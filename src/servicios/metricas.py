@@ -0,0 +1,247 @@
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+
+logger = logging.getLogger('ParrillaCronBot')
+
+# Límites de los buckets de los histogramas de tiempo (segundos)
+BUCKETS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Histograma con la duración de cada etapa del pipeline
+ETAPA = 'parrilla_etapa_segundos'
+
+Etiquetas = Tuple[Tuple[str, str], ...]
+ValorMedidor = Union[float, List[Tuple[Dict[str, str], float]]]
+
+
+def _etiquetas(etiquetas: Dict[str, object]) -> Etiquetas:
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def _formatear_etiquetas(etiquetas: Etiquetas, extra: Tuple[str, str] = None) -> str:
+    pares = list(etiquetas) + ([extra] if extra else [])
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{k}="{_escapar(v)}"' for k, v in pares) + '}'
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histograma:
+    """Histograma acumulado de buckets fijos, como los de Prometheus"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS_SEGUNDOS):
+        self.buckets = buckets
+        self.cuentas = [0] * (len(buckets) + 1)   # el último es +Inf
+        self.suma = 0.0
+        self.total = 0
+        self.maximo = 0.0
+
+    def observar(self, valor: float):
+        self.cuentas[bisect.bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+        self.maximo = max(self.maximo, valor)
+
+    def percentil(self, p: float) -> float:
+        """Aproximación: límite superior del bucket donde cae el percentil"""
+        if not self.total:
+            return 0.0
+        objetivo = p / 100 * self.total
+        acumulado = 0
+        for limite, cuenta in zip(self.buckets, self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return min(limite, self.maximo)
+        return self.maximo
+
+
+class Metricas:
+    """
+    Registro de métricas del proceso: contadores, histogramas y medidores.
+
+    Los contadores e histogramas se actualizan en el punto donde ocurre el
+    evento; los medidores son funciones que se evalúan al exponer (tamaño de
+    una cola, aciertos de una cache...) para no duplicar contadores que otro
+    objeto ya lleva. exponer() devuelve el formato de texto de Prometheus.
+
+    Es seguro usarlo desde los hilos del pool de parseo. En modo 'process' lo
+    que se mide dentro del proceso hijo no llega a este registro.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._contadores: Dict[str, Dict[Etiquetas, float]] = {}
+        self._histogramas: Dict[str, Dict[Etiquetas, Histograma]] = {}
+        self._medidores: Dict[str, Tuple[str, str, Callable[[], ValorMedidor]]] = {}
+        self._ayuda: Dict[str, str] = {}
+        self.inicio = time.time()
+
+    def describir(self, nombre: str, ayuda: str):
+        self._ayuda[nombre] = ayuda
+
+    def incrementar(self, nombre: str, valor: float = 1, **etiquetas):
+        clave = _etiquetas(etiquetas)
+        with self._lock:
+            serie = self._contadores.setdefault(nombre, {})
+            serie[clave] = serie.get(clave, 0) + valor
+
+    def observar(self, nombre: str, valor: float, **etiquetas):
+        clave = _etiquetas(etiquetas)
+        with self._lock:
+            serie = self._histogramas.setdefault(nombre, {})
+            histograma = serie.get(clave)
+            if histograma is None:
+                histograma = serie[clave] = Histograma()
+            histograma.observar(valor)
+
+    @contextmanager
+    def medir(self, etapa: str, **etiquetas) -> Iterator[None]:
+        """Mide la duración del bloque en el histograma de etapas (también si lanza)"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(ETAPA, time.perf_counter() - inicio, etapa=etapa, **etiquetas)
+
+    def registrar_medidor(self, nombre: str, funcion: Callable[[], ValorMedidor], ayuda: str = '',
+                          tipo: str = 'gauge'):
+        """
+        funcion() devuelve un número o una lista de (etiquetas, valor).
+        tipo='counter' para valores que solo crecen y ya se cuentan en otro objeto.
+        """
+        self._medidores[nombre] = (tipo, ayuda, funcion)
+
+    def _evaluar_medidores(self) -> Iterator[Tuple[str, str, str, List[Tuple[Etiquetas, float]]]]:
+        for nombre, (tipo, ayuda, funcion) in list(self._medidores.items()):
+            try:
+                valor = funcion()
+            except Exception as e:
+                logger.debug(f"Medidor {nombre} no disponible: {e}")
+                continue
+            if isinstance(valor, (int, float)):
+                muestras = [((), float(valor))]
+            else:
+                muestras = [(_etiquetas(etiquetas), float(v)) for etiquetas, v in valor]
+            yield nombre, tipo, ayuda, muestras
+
+    def exponer(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus"""
+        lineas: List[str] = []
+
+        def encabezado(nombre: str, tipo: str, ayuda: str = None):
+            ayuda = ayuda or self._ayuda.get(nombre)
+            if ayuda:
+                lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+
+        with self._lock:
+            contadores = {n: dict(s) for n, s in self._contadores.items()}
+            histogramas = {n: {e: (h.buckets, list(h.cuentas), h.suma, h.total) for e, h in s.items()}
+                           for n, s in self._histogramas.items()}
+
+        for nombre, serie in sorted(contadores.items()):
+            encabezado(nombre, 'counter')
+            for etiquetas, valor in sorted(serie.items()):
+                lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {valor:g}")
+
+        for nombre, serie in sorted(histogramas.items()):
+            encabezado(nombre, 'histogram')
+            for etiquetas, (buckets, cuentas, suma, total) in sorted(serie.items()):
+                acumulado = 0
+                for limite, cuenta in zip(buckets, cuentas):
+                    acumulado += cuenta
+                    lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, ('le', f'{limite:g}'))} {acumulado}")
+                lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, ('le', '+Inf'))} {total}")
+                lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {suma:.6f}")
+                lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {total}")
+
+        for nombre, tipo, ayuda, muestras in self._evaluar_medidores():
+            encabezado(nombre, tipo, ayuda)
+            for etiquetas, valor in muestras:
+                lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {valor:g}")
+
+        encabezado('parrilla_uptime_segundos', 'gauge', 'Segundos desde que arrancó el proceso')
+        lineas.append(f"parrilla_uptime_segundos {time.time() - self.inicio:.0f}")
+        return '\n'.join(lineas) + '\n'
+
+    def etapas(self) -> List[Dict[str, object]]:
+        """Resumen de cada etapa medida (para el comando stats)"""
+        with self._lock:
+            serie = dict(self._histogramas.get(ETAPA, {}))
+            filas = []
+            for etiquetas, h in serie.items():
+                datos = dict(etiquetas)
+                filas.append({
+                    'etapa': datos.pop('etapa'),
+                    'etiquetas': ','.join(f'{k}={v}' for k, v in datos.items()),
+                    'n': h.total,
+                    'total': h.suma,
+                    'media': h.suma / h.total if h.total else 0.0,
+                    'p95': h.percentil(95),
+                    'max': h.maximo,
+                })
+        return sorted(filas, key=lambda f: (f['etapa'], f['etiquetas']))
+
+    def contadores(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {
+                nombre: {','.join(f'{k}={v}' for k, v in etiquetas): valor for etiquetas, valor in serie.items()}
+                for nombre, serie in self._contadores.items()
+            }
+
+    def reiniciar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._histogramas.clear()
+
+
+# Registro compartido del proceso
+metricas = Metricas()
+metricas.describir(ETAPA, 'Duración de cada etapa: descarga, parseo, extraccion, formato, envio, handler')
+
+
+async def servir_metricas(puerto: int, host: str = '127.0.0.1', registro: Metricas = None,
+                          tiempo_lectura: float = 5) -> asyncio.AbstractServer:
+    """
+    Servidor HTTP mínimo que responde GET /metrics (polling, webhook y daemon).
+    Escucha solo en localhost salvo que se indique otro host; cada petición
+    debe llegar en 'tiempo_lectura' segundos y con cabeceras acotadas.
+    """
+    registro = registro or metricas
+
+    async def leer_cabeceras(reader: asyncio.StreamReader) -> bytes:
+        linea = await reader.readline()
+        for _ in range(100):
+            if (await reader.readline()) in (b'\r\n', b'\n', b''):
+                return linea
+        raise ValueError('demasiadas cabeceras')
+
+    async def atender(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            try:
+                linea = await asyncio.wait_for(leer_cabeceras(reader), timeout=tiempo_lectura)
+            except (asyncio.TimeoutError, ValueError):
+                return
+            partes = linea.decode('latin-1').split()
+            if len(partes) >= 2 and partes[0] == 'GET' and partes[1].split('?')[0] == '/metrics':
+                estado, cuerpo = '200 OK', registro.exponer().encode('utf-8')
+            else:
+                estado, cuerpo = '404 Not Found', b''
+            writer.write(f"HTTP/1.1 {estado}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                         f"Content-Length: {len(cuerpo)}\r\nConnection: close\r\n\r\n".encode('latin-1') + cuerpo)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    servidor = await asyncio.start_server(atender, host, puerto, limit=16 * 1024)
+    logger.info(f"📈 Métricas en http://{host}:{puerto}/metrics")
+    return servidor
@@ -0,0 +1,53 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger('ParrillaCronBot')
+
+
+class ParsePool:
+    """
+    Ejecuta el parseo de HTML fuera del event loop.
+    
+    Modos:
+        inline:  en el mismo hilo (sin pool, útil para depurar y en cron)
+        thread:  ThreadPoolExecutor; libera el loop entre fragmentos de trabajo
+        process: ProcessPoolExecutor; paralelismo real, la función y su
+                 resultado deben ser serializables (funciones de módulo, Partido)
+    """
+    
+    MODOS = ('inline', 'thread', 'process')
+    
+    def __init__(self, modo: str = 'thread', workers: int = 2):
+        if modo not in self.MODOS:
+            raise ValueError(f"Modo de parseo no válido: {modo}. Usa: {', '.join(self.MODOS)}")
+        self.modo = modo
+        self.workers = max(1, workers)
+        self._executor: Optional[Executor] = None
+    
+    def _obtener_executor(self) -> Executor:
+        if self._executor is None:
+            # Importados aquí: en modo inline (cron) no se carga multiprocessing
+            from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+            if self.modo == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='parseo')
+            logger.info(f"🧵 Pool de parseo iniciado ({self.modo}, {self.workers} workers)")
+        return self._executor
+    
+    async def ejecutar(self, funcion: Callable[..., Any], *args) -> Any:
+        """Ejecuta funcion(*args) según el modo configurado y retorna su resultado"""
+        if self.modo == 'inline':
+            return funcion(*args)
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._obtener_executor(), functools.partial(funcion, *args))
+    
+    def cerrar(self):
+        """Libera los workers del pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
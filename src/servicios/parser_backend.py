@@ -0,0 +1,238 @@
+import functools
+import logging
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger('ParrillaCronBot')
+
+
+# === DATOS EXTRAÍDOS (independientes del motor) ===
+
+class TablaHtml(NamedTuple):
+    """Una <table>: texto de la primera fila y celdas <td> de las demás"""
+    encabezado: str
+    filas: List[List[str]]
+
+
+class PartidoHtml(NamedTuple):
+    """Un enlace .scf-match-item de partidos-de-hoy.co"""
+    texto: str
+    local: Optional[str]
+    visitante: Optional[str]
+    canal: Optional[str]
+
+
+class GrupoLigaHtml(NamedTuple):
+    """Un bloque .scf-league-group con su título y partidos"""
+    liga: Optional[str]
+    partidos: List[PartidoHtml]
+
+
+# === MOTORES ===
+
+class ParserBackend(ABC):
+    """
+    Interfaz común de extracción dirigida.
+
+    Cada motor solo devuelve lo que usan los scrapers (tablas de futbolred y
+    grupos de liga de partidos-de-hoy.co) como datos planos, de modo que el
+    resto del código no depende de la API de BeautifulSoup, lxml o selectolax.
+    """
+
+    nombre = 'base'
+
+    @abstractmethod
+    def tablas(self, html: str) -> List[TablaHtml]:
+        """Cada <table> del documento con su encabezado y celdas"""
+
+    @abstractmethod
+    def grupos_liga(self, html: str) -> List[GrupoLigaHtml]:
+        """Bloques .scf-league-group con sus partidos"""
+
+
+class SoupBackend(ParserBackend):
+    """
+    BeautifulSoup. En modo restringido usa SoupStrainer para construir solo los
+    subárboles que interesan (<table> o .scf-league-group) en vez del DOM completo.
+    """
+
+    nombre = 'soup'
+
+    def __init__(self, features: str = 'html.parser', restringido: bool = True):
+        from bs4 import BeautifulSoup, SoupStrainer
+        self._soup = BeautifulSoup
+        self._strainer = SoupStrainer
+        self.features = features
+        self.restringido = restringido
+
+    def _parsear(self, html: str, strainer):
+        return self._soup(html, self.features, parse_only=strainer if self.restringido else None)
+
+    def tablas(self, html: str) -> List[TablaHtml]:
+        soup = self._parsear(html, self._strainer('table'))
+        resultado = []
+        for tabla in soup.find_all('table'):
+            filas = tabla.find_all('tr')
+            if not filas:
+                continue
+            resultado.append(TablaHtml(
+                filas[0].get_text(strip=True),
+                [[td.get_text(strip=True) for td in fila.find_all('td')] for fila in filas[1:]],
+            ))
+        return resultado
+
+    def grupos_liga(self, html: str) -> List[GrupoLigaHtml]:
+        soup = self._parsear(html, self._strainer(class_='scf-league-group'))
+        resultado = []
+        for grupo in soup.select('.scf-league-group'):
+            titulo = grupo.find('h2')
+            partidos = []
+            for match in grupo.select('.scf-match-list li a.scf-match-item'):
+                local = match.select_one('.team-row.home .team-name')
+                visitante = match.select_one('.team-row.away .team-name')
+                canal_img = match.select_one('.scf-match-canal img')
+                partidos.append(PartidoHtml(
+                    match.get_text(' ', strip=True),
+                    local.get_text(strip=True) if local else None,
+                    visitante.get_text(strip=True) if visitante else None,
+                    canal_img.get('alt') if canal_img else None,
+                ))
+            resultado.append(GrupoLigaHtml(titulo.get_text(strip=True) if titulo else None, partidos))
+        return resultado
+
+
+def _xpath_clase(*clases: str) -> str:
+    """Predicado XPath equivalente a un selector .clase1.clase2"""
+    return ' and '.join(
+        f"contains(concat(' ', normalize-space(@class), ' '), ' {clase} ')" for clase in clases
+    )
+
+
+class LxmlBackend(ParserBackend):
+    """lxml.html (parser en C); la extracción se hace con XPath"""
+
+    nombre = 'lxml'
+
+    def __init__(self):
+        import lxml.html
+        self._html = lxml.html
+
+    def _parsear(self, html: str):
+        try:
+            return self._html.document_fromstring(html)
+        except ValueError:
+            # lxml rechaza str con declaración de encoding
+            return self._html.document_fromstring(html.encode('utf-8'))
+
+    @staticmethod
+    def _texto(nodo, separador: str = '') -> str:
+        return separador.join(t.strip() for t in nodo.xpath('.//text()') if t.strip())
+
+    def tablas(self, html: str) -> List[TablaHtml]:
+        resultado = []
+        for tabla in self._parsear(html).iter('table'):
+            filas = tabla.xpath('.//tr')
+            if not filas:
+                continue
+            resultado.append(TablaHtml(
+                self._texto(filas[0]),
+                [[self._texto(td) for td in fila.xpath('.//td')] for fila in filas[1:]],
+            ))
+        return resultado
+
+    def grupos_liga(self, html: str) -> List[GrupoLigaHtml]:
+        raiz = self._parsear(html)
+        resultado = []
+        for grupo in raiz.xpath(f"//*[{_xpath_clase('scf-league-group')}]"):
+            titulo = grupo.xpath('.//h2')
+            partidos = []
+            for match in grupo.xpath(f".//*[{_xpath_clase('scf-match-list')}]//li//a[{_xpath_clase('scf-match-item')}]"):
+                local = match.xpath(f".//*[{_xpath_clase('team-row', 'home')}]//*[{_xpath_clase('team-name')}]")
+                visitante = match.xpath(f".//*[{_xpath_clase('team-row', 'away')}]//*[{_xpath_clase('team-name')}]")
+                canal = match.xpath(f".//*[{_xpath_clase('scf-match-canal')}]//img/@alt")
+                partidos.append(PartidoHtml(
+                    self._texto(match, ' '),
+                    self._texto(local[0]) if local else None,
+                    self._texto(visitante[0]) if visitante else None,
+                    str(canal[0]) if canal else None,
+                ))
+            resultado.append(GrupoLigaHtml(self._texto(titulo[0]) if titulo else None, partidos))
+        return resultado
+
+
+class SelectolaxBackend(ParserBackend):
+    """selectolax (Lexbor, o Modest en versiones antiguas): parser en C con selectores CSS"""
+
+    nombre = 'selectolax'
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser as HTMLParser
+        except ImportError:
+            # selectolax < 0.3.x solo trae Modest
+            from selectolax.parser import HTMLParser
+        self._parser = HTMLParser
+
+    def tablas(self, html: str) -> List[TablaHtml]:
+        resultado = []
+        for tabla in self._parser(html).css('table'):
+            filas = tabla.css('tr')
+            if not filas:
+                continue
+            resultado.append(TablaHtml(
+                filas[0].text(strip=True),
+                [[td.text(strip=True) for td in fila.css('td')] for fila in filas[1:]],
+            ))
+        return resultado
+
+    def grupos_liga(self, html: str) -> List[GrupoLigaHtml]:
+        resultado = []
+        for grupo in self._parser(html).css('.scf-league-group'):
+            titulo = grupo.css_first('h2')
+            partidos = []
+            for match in grupo.css('.scf-match-list li a.scf-match-item'):
+                local = match.css_first('.team-row.home .team-name')
+                visitante = match.css_first('.team-row.away .team-name')
+                canal_img = match.css_first('.scf-match-canal img')
+                partidos.append(PartidoHtml(
+                    match.text(separator=' ', strip=True),
+                    local.text(strip=True) if local else None,
+                    visitante.text(strip=True) if visitante else None,
+                    canal_img.attributes.get('alt') if canal_img else None,
+                ))
+            resultado.append(GrupoLigaHtml(titulo.text(strip=True) if titulo else None, partidos))
+        return resultado
+
+
+BACKENDS = {
+    'selectolax': SelectolaxBackend,
+    'lxml': LxmlBackend,
+    'soup': SoupBackend,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def obtener_backend(nombre: str = 'auto') -> ParserBackend:
+    """
+    Motor de parseo por nombre: auto | selectolax | lxml | soup | soup-completo.
+    'auto' elige el más rápido instalado. Si el motor pedido no está instalado
+    se usa BeautifulSoup restringido. Se cachea por proceso (workers del pool).
+    """
+    if nombre == 'soup-completo':
+        return SoupBackend(restringido=False)
+
+    candidatos = list(BACKENDS) if nombre == 'auto' else [nombre]
+    for candidato in candidatos:
+        clase = BACKENDS.get(candidato)
+        if clase is None:
+            raise ValueError(f"Motor de parseo desconocido: {nombre}")
+        try:
+            return clase()
+        except ImportError:
+            if nombre != 'auto':
+                logger.warning(f"⚠️ Motor de parseo '{nombre}' no instalado, se usa BeautifulSoup")
+
+    if nombre == 'auto':
+        logger.warning("⚠️ Sin selectolax ni lxml se parsea con BeautifulSoup (más lento): "
+                       "pip install -r config/requirements-parseo.txt")
+    return SoupBackend()
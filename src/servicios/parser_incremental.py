@@ -0,0 +1,147 @@
+import logging
+from html.parser import HTMLParser
+from typing import List
+
+from servicios.parser_backend import LxmlBackend, TablaHtml
+
+logger = logging.getLogger('ParrillaCronBot')
+
+
+class TablasIncrementales:
+    """
+    Parser incremental de <table>: se alimenta con fragmentos del HTML a medida
+    que llegan de la red y devuelve cada tabla en cuanto se cierra, con los
+    mismos datos que ParserBackend.tablas().
+
+    Con lxml se usa HTMLPullParser y se descarta cada tabla ya entregada junto
+    con el marcado anterior, así nunca se tiene el DOM completo en memoria. Sin
+    lxml se usa html.parser de la biblioteca estándar (más lento).
+    """
+
+    def __init__(self):
+        try:
+            from lxml import etree
+        except ImportError:
+            self._lxml = None
+            self._estandar = _TablasHtmlParser()
+        else:
+            self._lxml = etree.HTMLPullParser(events=('end',), tag='table')
+            self._estandar = None
+        self.caracteres = 0
+
+    def alimentar(self, fragmento: str) -> List[TablaHtml]:
+        """Procesa un fragmento y devuelve las tablas que se cerraron en él"""
+        self.caracteres += len(fragmento)
+        if self._estandar is not None:
+            self._estandar.feed(fragmento)
+            return self._estandar.recoger()
+        self._lxml.feed(fragmento)
+        return self._recoger_lxml()
+
+    def cerrar(self) -> List[TablaHtml]:
+        """Fin del documento: tablas que quedaban abiertas"""
+        if self._estandar is not None:
+            self._estandar.close()
+            return self._estandar.recoger()
+        try:
+            self._lxml.close()
+        except Exception as e:
+            # HTML truncado o vacío: lo ya entregado sigue siendo válido
+            logger.debug(f"Cierre del parser incremental: {e}")
+        return self._recoger_lxml()
+
+    def _recoger_lxml(self) -> List[TablaHtml]:
+        tablas = []
+        for _, tabla in self._lxml.read_events():
+            filas = tabla.xpath('.//tr')
+            if filas:
+                tablas.append(TablaHtml(
+                    LxmlBackend._texto(filas[0]),
+                    [[LxmlBackend._texto(td) for td in fila.xpath('.//td')] for fila in filas[1:]],
+                ))
+            # Liberar la tabla y todo el marcado anterior. Una tabla anidada se
+            # conserva: la que la contiene todavía no se ha entregado
+            if next(tabla.iterancestors('table'), None) is None:
+                tabla.clear(keep_tail=True)
+                nodo = tabla
+                while nodo.getparent() is not None:
+                    while nodo.getprevious() is not None:
+                        del nodo.getparent()[0]
+                    nodo = nodo.getparent()
+        return tablas
+
+
+class _TablasHtmlParser(HTMLParser):
+    """
+    Alternativa sin lxml: sigue <table>/<tr>/<td> con html.parser. Igual que
+    .//tr, .//td y .//text() en los otros motores, las filas, celdas y texto de
+    una tabla anidada cuentan también para las tablas que la contienen.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._pila: List[dict] = []   # tablas abiertas, de la más externa a la más interna
+        self._terminadas: List[TablaHtml] = []
+        # Un nodo de texto puede llegar partido entre dos fragmentos: se acumula
+        # hasta la siguiente etiqueta para recortarlo entero, como .//text()
+        self._texto: List[str] = []
+
+    def recoger(self) -> List[TablaHtml]:
+        tablas, self._terminadas = self._terminadas, []
+        return tablas
+
+    def close(self):
+        super().close()
+        self._vaciar_texto()
+
+    def handle_starttag(self, tag, attrs):
+        self._vaciar_texto()
+        if tag == 'table':
+            self._pila.append({'filas': [], 'fila': None})
+        elif not self._pila:
+            return
+        elif tag == 'tr':
+            # Un <tr> sin cerrar el anterior lo cierra, como hacen los parsers HTML
+            fila = {'texto': [], 'celdas': [], 'celda': None}
+            self._pila[-1]['fila'] = fila
+            for tabla in self._pila:
+                tabla['filas'].append(fila)
+        elif tag in ('td', 'th') and self._pila[-1]['fila'] is not None:
+            celda = {'texto': []}
+            self._pila[-1]['fila']['celda'] = celda
+            if tag == 'td':
+                for tabla in self._pila:
+                    if tabla['fila'] is not None:
+                        tabla['fila']['celdas'].append(celda)
+
+    def handle_endtag(self, tag):
+        self._vaciar_texto()
+        if not self._pila:
+            return
+        tabla = self._pila[-1]
+        if tag in ('td', 'th') and tabla['fila'] is not None:
+            tabla['fila']['celda'] = None
+        elif tag == 'tr':
+            tabla['fila'] = None
+        elif tag == 'table':
+            self._pila.pop()
+            filas = tabla['filas']
+            if filas:
+                self._terminadas.append(TablaHtml(
+                    ''.join(filas[0]['texto']),
+                    [[''.join(celda['texto']) for celda in fila['celdas']] for fila in filas[1:]],
+                ))
+
+    def handle_data(self, data):
+        self._texto.append(data)
+
+    def _vaciar_texto(self):
+        texto, self._texto = ''.join(self._texto).strip(), []
+        if not texto:
+            return
+        for tabla in self._pila:
+            fila = tabla['fila']
+            if fila is not None:
+                fila['texto'].append(texto)
+                if fila['celda'] is not None:
+                    fila['celda']['texto'].append(texto)
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from datetime import datetime, time, timedelta, tzinfo
+from typing import Awaitable, Callable, FrozenSet, List, Optional
+
+from servicios.texto import normalizar
+
+logger = logging.getLogger('ParrillaCronBot')
+
+DIAS_SEMANA = {
+    'lun': 0, 'lunes': 0,
+    'mar': 1, 'martes': 1,
+    'mie': 2, 'miercoles': 2,
+    'jue': 3, 'jueves': 3,
+    'vie': 4, 'viernes': 4,
+    'sab': 5, 'sabado': 5,
+    'dom': 6, 'domingo': 6,
+}
+
+
+class Tarea:
+    """Una acción programada a una hora fija, opcionalmente solo ciertos días"""
+
+    def __init__(self, accion: str, hora: time, dias: Optional[FrozenSet[int]] = None):
+        self.accion = accion
+        self.hora = hora
+        self.dias = dias  # None = todos los días; 0 = lunes
+
+    def siguiente(self, desde: datetime) -> datetime:
+        """Próxima ejecución estrictamente posterior a 'desde'"""
+        candidato = desde.replace(hour=self.hora.hour, minute=self.hora.minute, second=0, microsecond=0)
+        if candidato <= desde:
+            candidato += timedelta(days=1)
+        while self.dias is not None and candidato.weekday() not in self.dias:
+            candidato += timedelta(days=1)
+        return candidato
+
+    def __repr__(self) -> str:
+        dias = '' if self.dias is None else ' ' + ','.join(str(d) for d in sorted(self.dias))
+        return f"Tarea({self.accion} {self.hora.strftime('%H:%M')}{dias})"
+
+
+def parsear_programacion(texto: str) -> List[Tarea]:
+    """
+    Convierte una programación tipo cron legible en tareas.
+
+    Formato: entradas separadas por ';' con '<acción> <HH:MM> [días]', p. ej.
+        "hoy 07:00; manana 20:00; semana 09:00 lun; cambios:hoy 12:00 sab,dom"
+    """
+    tareas = []
+    for entrada in texto.split(';'):
+        partes = entrada.split()
+        if not partes:
+            continue
+        if len(partes) not in (2, 3):
+            raise ValueError(f"Entrada de programación no válida: '{entrada.strip()}'")
+
+        accion = partes[0].lower()
+        try:
+            hora = datetime.strptime(partes[1], '%H:%M').time()
+        except ValueError:
+            raise ValueError(f"Hora no válida en '{entrada.strip()}', usa HH:MM")
+
+        dias = None
+        if len(partes) == 3:
+            nombres = normalizar(partes[2]).split(',')
+            desconocidos = [n for n in nombres if n not in DIAS_SEMANA]
+            if desconocidos:
+                raise ValueError(f"Días no válidos en '{entrada.strip()}': {', '.join(desconocidos)}")
+            dias = frozenset(DIAS_SEMANA[n] for n in nombres)
+
+        tareas.append(Tarea(accion, hora, dias))
+    return tareas
+
+
+class Programador:
+    """
+    Ejecuta tareas a su hora dentro de un proceso residente.
+
+    La función ejecutar recibe la Tarea; los errores se registran y no
+    detienen el programador.
+    """
+
+    def __init__(self, tareas: List[Tarea], ejecutar: Callable[[Tarea], Awaitable], zona: tzinfo = None):
+        if not tareas:
+            raise ValueError("No hay tareas programadas")
+        self.tareas = tareas
+        self.ejecutar = ejecutar
+        self.zona = zona
+        self._detener = asyncio.Event()
+
+    def _ahora(self) -> datetime:
+        return datetime.now(self.zona)
+
+    def proximas(self) -> List[tuple]:
+        """(hora de ejecución, tarea) ordenadas, a partir de ahora"""
+        ahora = self._ahora()
+        return sorted(((t.siguiente(ahora), t) for t in self.tareas), key=lambda x: x[0])
+
+    async def ejecutar_siempre(self):
+        """Bucle principal: espera a la próxima tarea, la ejecuta y repite"""
+        while not self._detener.is_set():
+            momento, _ = self.proximas()[0]
+            pendientes = [t for m, t in self.proximas() if m == momento]
+            espera = max(0.0, (momento - self._ahora()).total_seconds())
+            logger.info(f"⏰ Próxima ejecución: {', '.join(t.accion for t in pendientes)} a las {momento:%Y-%m-%d %H:%M}")
+
+            try:
+                await asyncio.wait_for(self._detener.wait(), timeout=espera)
+                break  # se pidió detener
+            except asyncio.TimeoutError:
+                pass
+
+            for tarea in pendientes:
+                try:
+                    await self.ejecutar(tarea)
+                except Exception as e:
+                    logger.error(f"❌ Error ejecutando {tarea.accion}: {e}")
+
+            # Evitar repetir la misma tarea si terminó dentro del mismo minuto
+            restante = (momento + timedelta(seconds=1) - self._ahora()).total_seconds()
+            if restante > 0:
+                await asyncio.sleep(restante)
+
+    def detener(self):
+        self._detener.set()
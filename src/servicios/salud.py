@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger('ParrillaCronBot')
+
+T = TypeVar('T')
+
+CERRADO = 'cerrado'          # la fuente responde: se consulta normalmente
+ABIERTO = 'abierto'          # demasiados fallos: se falla al instante sin tocar la red
+SEMIABIERTO = 'semiabierto'  # pasó el enfriamiento: se deja pasar una sola consulta de prueba
+
+
+class CircuitoAbierto(Exception):
+    """La fuente está marcada como caída; se falla rápido para servir datos en cache"""
+
+    def __init__(self, fuente: str, reintentar_en: float):
+        super().__init__(f"Fuente {fuente} no disponible (circuito abierto, reintento en {reintentar_en:.0f}s)")
+        self.fuente = fuente
+        self.reintentar_en = reintentar_en
+
+
+class SaludFuente:
+    """
+    Estado de salud de una fuente: latencias recientes, fallos y circuito.
+
+    El timeout se adapta a la latencia observada (percentil 95 por un factor,
+    acotado entre timeout_minimo y timeout_maximo). Tras 'umbral_fallos' fallos
+    seguidos el circuito se abre durante 'enfriamiento' segundos, que se duplican
+    cada vez que falla la consulta de prueba (hasta 'enfriamiento_maximo').
+    """
+
+    def __init__(self, nombre: str, umbral_fallos: int = 3, enfriamiento: float = 30,
+                 enfriamiento_maximo: float = 600, timeout_inicial: float = 15, timeout_minimo: float = 3,
+                 timeout_maximo: float = 30, factor_timeout: float = 2.0, ventana: int = 50,
+                 muestras_minimas: int = 5):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.enfriamiento = enfriamiento
+        self.enfriamiento_maximo = enfriamiento_maximo
+        self.timeout_inicial = timeout_inicial
+        self.timeout_minimo = timeout_minimo
+        self.timeout_maximo = timeout_maximo
+        self.factor_timeout = factor_timeout
+        self.muestras_minimas = muestras_minimas
+
+        self.latencias: deque = deque(maxlen=ventana)
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.aperturas_seguidas = 0
+        self.abierto_hasta = 0.0
+        self.prueba_en_curso = False
+        self.exitos = 0
+        self.fallos = 0
+        self.rechazadas = 0
+        self.ultimo_exito: Optional[float] = None   # time.time()
+        self.ultimo_fallo: Optional[float] = None
+        self.ultimo_error: Optional[str] = None
+
+    def percentil(self, p: float) -> Optional[float]:
+        if not self.latencias:
+            return None
+        ordenadas = sorted(self.latencias)
+        return ordenadas[min(len(ordenadas) - 1, math.ceil(p / 100 * len(ordenadas)) - 1)]
+
+    def timeout(self) -> float:
+        """Timeout para la próxima consulta según las latencias observadas"""
+        if len(self.latencias) < self.muestras_minimas:
+            return self.timeout_inicial
+        return min(self.timeout_maximo, max(self.timeout_minimo, self.percentil(95) * self.factor_timeout))
+
+    def reintentar_en(self) -> float:
+        return max(0.0, self.abierto_hasta - time.monotonic())
+
+    def permitir(self) -> bool:
+        """True si se puede consultar la fuente ahora (o como prueba del semiabierto)"""
+        if self.estado == CERRADO:
+            return True
+        if self.estado == ABIERTO and time.monotonic() >= self.abierto_hasta:
+            self.estado = SEMIABIERTO
+            logger.info(f"🔌 Circuito de {self.nombre} semiabierto: consulta de prueba")
+        if self.estado == SEMIABIERTO and not self.prueba_en_curso:
+            self.prueba_en_curso = True
+            return True
+        self.rechazadas += 1
+        return False
+
+    def registrar_exito(self, latencia: float):
+        self.latencias.append(latencia)
+        self.exitos += 1
+        self.ultimo_exito = time.time()
+        self.fallos_consecutivos = 0
+        self.prueba_en_curso = False
+        if self.estado != CERRADO:
+            logger.info(f"✅ Circuito de {self.nombre} cerrado: la fuente responde de nuevo")
+        self.estado = CERRADO
+        self.aperturas_seguidas = 0
+
+    def registrar_fallo(self, error: BaseException):
+        self.fallos += 1
+        self.fallos_consecutivos += 1
+        self.ultimo_fallo = time.time()
+        self.ultimo_error = repr(error)
+        prueba_fallida = self.estado == SEMIABIERTO
+        self.prueba_en_curso = False
+        if prueba_fallida or self.fallos_consecutivos >= self.umbral_fallos:
+            self.aperturas_seguidas += 1
+            espera = min(self.enfriamiento_maximo, self.enfriamiento * 2 ** (self.aperturas_seguidas - 1))
+            self.estado = ABIERTO
+            self.abierto_hasta = time.monotonic() + espera
+            logger.warning(f"🚫 Circuito de {self.nombre} abierto {espera:.0f}s tras "
+                           f"{self.fallos_consecutivos} fallos: {self.ultimo_error}")
+
+    def resumen(self) -> Dict:
+        """Estado en memoria para /status y métricas"""
+        return {
+            'fuente': self.nombre,
+            'estado': self.estado,
+            'reintentar_en': self.reintentar_en() if self.estado == ABIERTO else 0.0,
+            'timeout': self.timeout(),
+            'p50': self.percentil(50),
+            'p95': self.percentil(95),
+            'exitos': self.exitos,
+            'fallos': self.fallos,
+            'rechazadas': self.rechazadas,
+            'fallos_consecutivos': self.fallos_consecutivos,
+            'ultimo_exito': self.ultimo_exito,
+            'ultimo_error': self.ultimo_error,
+        }
+
+
+class MonitorSalud:
+    """Salud de todas las fuentes; envuelve cada consulta con circuito y timeout adaptativo"""
+
+    def __init__(self, **parametros):
+        self.parametros = parametros
+        self.fuentes: Dict[str, SaludFuente] = {}
+
+    def fuente(self, nombre: str) -> SaludFuente:
+        if nombre not in self.fuentes:
+            self.fuentes[nombre] = SaludFuente(nombre, **self.parametros)
+        return self.fuentes[nombre]
+
+    def disponible(self, nombre: str) -> bool:
+        """False mientras el circuito de la fuente está abierto (no consume la prueba)"""
+        salud = self.fuente(nombre)
+        return salud.estado != ABIERTO or time.monotonic() >= salud.abierto_hasta
+
+    async def ejecutar(self, nombre: str, consulta: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Ejecuta consulta(timeout) con el timeout adaptativo de la fuente.
+        Lanza CircuitoAbierto sin ejecutarla si la fuente está marcada como caída.
+        """
+        salud = self.fuente(nombre)
+        if not salud.permitir():
+            raise CircuitoAbierto(nombre, salud.reintentar_en())
+
+        timeout = salud.timeout()
+        inicio = time.monotonic()
+        try:
+            resultado = await asyncio.wait_for(consulta(timeout), timeout)
+        except asyncio.CancelledError:
+            salud.prueba_en_curso = False
+            raise
+        except Exception as e:
+            salud.registrar_fallo(e)
+            raise
+        salud.registrar_exito(time.monotonic() - inicio)
+        return resultado
+
+    def estado(self) -> List[Dict]:
+        return [salud.resumen() for salud in self.fuentes.values()]
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger('ParrillaCronBot')
+
+
+class Snapshot:
+    """Última versión descargada de una URL"""
+
+    def __init__(self, url: str, cuerpo: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+                 hash_contenido: Optional[str] = None, descargado_en: Optional[float] = None):
+        self.url = url
+        self.cuerpo = cuerpo
+        self.etag = etag
+        self.last_modified = last_modified
+        self.hash = hash_contenido or hashlib.sha256(cuerpo.encode('utf-8')).hexdigest()
+        self.descargado_en = descargado_en if descargado_en is not None else time.time()
+
+    def metadatos(self) -> Dict:
+        return {
+            'url': self.url,
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'hash': self.hash,
+            'descargado_en': self.descargado_en,
+        }
+
+
+class SnapshotStore:
+    """
+    Guarda en disco el último HTML de cada URL con su ETag, Last-Modified y hash.
+
+    Por URL se escriben dos archivos: <id>.html (cuerpo tal cual) y <id>.json
+    (metadatos). Sirven para hacer GET condicionales, para saltar el parseo
+    cuando el contenido no cambió y como fixtures reproducibles (modo replay).
+    """
+
+    def __init__(self, directorio: str = 'data/snapshots', replay: bool = False):
+        self.directorio = directorio
+        self.replay = replay
+        self._memoria: Dict[str, Snapshot] = {}
+
+    def _ruta_base(self, url: str) -> str:
+        return os.path.join(self.directorio, hashlib.sha1(url.encode('utf-8')).hexdigest()[:16])
+
+    def cargar(self, url: str) -> Optional[Snapshot]:
+        """Último snapshot de la URL (memoria y luego disco) o None"""
+        if url in self._memoria:
+            return self._memoria[url]
+
+        base = self._ruta_base(url)
+        try:
+            with open(base + '.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(base + '.html', encoding='utf-8') as f:
+                cuerpo = f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Snapshot ilegible para {url}: {e}")
+            return None
+
+        snapshot = Snapshot(url, cuerpo, meta.get('etag'), meta.get('last_modified'),
+                            meta.get('hash'), meta.get('descargado_en'))
+        self._memoria[url] = snapshot
+        return snapshot
+
+    def guardar(self, url: str, cuerpo: str, etag: Optional[str] = None,
+                last_modified: Optional[str] = None) -> Snapshot:
+        """Reemplaza el snapshot de la URL"""
+        snapshot = Snapshot(url, cuerpo, etag, last_modified)
+        self._memoria[url] = snapshot
+
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            _escribir_atomico(self._ruta_base(url) + '.html', cuerpo)
+            self._escribir_metadatos(snapshot)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo guardar el snapshot de {url}: {e}")
+
+        return snapshot
+
+    def tocar(self, url: str) -> Optional[Snapshot]:
+        """Marca el snapshot como vigente (respuesta 304 Not Modified)"""
+        snapshot = self.cargar(url)
+        if snapshot is not None:
+            snapshot.descargado_en = time.time()
+            try:
+                self._escribir_metadatos(snapshot)
+            except OSError as e:
+                logger.warning(f"⚠️ No se pudieron actualizar los metadatos de {url}: {e}")
+        return snapshot
+
+    def _escribir_metadatos(self, snapshot: Snapshot):
+        _escribir_atomico(self._ruta_base(snapshot.url) + '.json', json.dumps(snapshot.metadatos()))
+
+
+def _escribir_atomico(ruta: str, contenido: str):
+    """Escribe en un temporal y renombra, para no dejar archivos a medias"""
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
@@ -0,0 +1,194 @@
+import logging
+import os
+import sqlite3
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger('ParrillaCronBot')
+
+ZONA_POR_DEFECTO = 'America/Bogota'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS suscriptores (
+    chat_id        TEXT PRIMARY KEY,
+    hora_envio     TEXT,                 -- 'HH:MM' en la zona del chat, NULL = sin envío diario
+    zona_horaria   TEXT NOT NULL DEFAULT 'America/Bogota',
+    activo         INTEGER NOT NULL DEFAULT 1,
+    creado_en      TEXT NOT NULL,
+    actualizado_en TEXT NOT NULL
+) WITHOUT ROWID;
+
+-- "todos los chats activos que quieren envío a las 07:00 en America/Bogota"
+CREATE INDEX IF NOT EXISTS idx_suscriptores_envio
+    ON suscriptores (activo, zona_horaria, hora_envio, chat_id);
+
+CREATE TABLE IF NOT EXISTS suscriptor_ligas (
+    chat_id TEXT NOT NULL REFERENCES suscriptores (chat_id) ON DELETE CASCADE,
+    liga    TEXT NOT NULL,
+    PRIMARY KEY (chat_id, liga)
+) WITHOUT ROWID;
+
+-- "todos los chats que siguen liga-betplay" (id canónico de servicios.ligas)
+CREATE INDEX IF NOT EXISTS idx_suscriptor_ligas_liga
+    ON suscriptor_ligas (liga, chat_id);
+"""
+
+
+class Suscriptor:
+    """Preferencias de un chat"""
+
+    def __init__(self, chat_id: str, hora_envio: Optional[str], zona_horaria: str, activo: bool,
+                 ligas: Set[str] = None):
+        self.chat_id = chat_id
+        self.hora_envio = hora_envio
+        self.zona_horaria = zona_horaria
+        self.activo = activo
+        self.ligas = ligas or set()
+
+
+class RegistroSuscripciones:
+    """
+    Registro de suscriptores en SQLite con índices para las consultas de difusión.
+
+    Las consultas masivas se recorren por lotes con paginación por clave
+    (chat_id > último), así nunca se cargan todos los chats en memoria ni se
+    mantiene un cursor abierto mientras se envían mensajes.
+    """
+
+    def __init__(self, ruta: str = 'data/suscripciones.sqlite'):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.ruta = ruta
+        self._conexion = sqlite3.connect(ruta)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA foreign_keys=ON")
+        self._conexion.executescript(ESQUEMA)
+
+    @staticmethod
+    def _ahora() -> str:
+        return datetime.now().isoformat(timespec='seconds')
+
+    @staticmethod
+    def normalizar_liga(liga: str) -> str:
+        return ' '.join(liga.lower().split())
+
+    def registrar(self, chat_id, zona_horaria: str = None):
+        """Alta (o reactivación) de un chat; conserva sus preferencias"""
+        ahora = self._ahora()
+        with self._conexion:
+            self._conexion.execute(
+                """
+                INSERT INTO suscriptores (chat_id, zona_horaria, activo, creado_en, actualizado_en)
+                VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT (chat_id) DO UPDATE SET activo = 1, actualizado_en = excluded.actualizado_en
+                """,
+                (str(chat_id), zona_horaria or ZONA_POR_DEFECTO, ahora, ahora),
+            )
+
+    def desactivar(self, chat_id):
+        with self._conexion:
+            self._conexion.execute(
+                "UPDATE suscriptores SET activo = 0, actualizado_en = ? WHERE chat_id = ?",
+                (self._ahora(), str(chat_id)),
+            )
+
+    def desactivar_varios(self, chat_ids: Iterable):
+        """Baja de chats que bloquearon al bot (resultado de una difusión)"""
+        ahora = self._ahora()
+        with self._conexion:
+            self._conexion.executemany(
+                "UPDATE suscriptores SET activo = 0, actualizado_en = ? WHERE chat_id = ?",
+                ((ahora, str(c)) for c in chat_ids),
+            )
+
+    def configurar_envio(self, chat_id, hora_envio: Optional[str], zona_horaria: str = None):
+        """Hora diaria de envío ('HH:MM' o None para desactivarla)"""
+        if hora_envio is not None:
+            hora_envio = datetime.strptime(hora_envio, '%H:%M').strftime('%H:%M')
+        self.registrar(chat_id, zona_horaria)
+        with self._conexion:
+            self._conexion.execute(
+                """
+                UPDATE suscriptores
+                SET hora_envio = ?, zona_horaria = COALESCE(?, zona_horaria), actualizado_en = ?
+                WHERE chat_id = ?
+                """,
+                (hora_envio, zona_horaria, self._ahora(), str(chat_id)),
+            )
+
+    def configurar_ligas(self, chat_id, ligas: Iterable[str]):
+        """Reemplaza las ligas preferidas por sus ids canónicos (vacío = todas)"""
+        self.registrar(chat_id)
+        ligas_normalizadas = {self.normalizar_liga(l) for l in ligas if l.strip()}
+        with self._conexion:
+            self._conexion.execute("DELETE FROM suscriptor_ligas WHERE chat_id = ?", (str(chat_id),))
+            self._conexion.executemany(
+                "INSERT INTO suscriptor_ligas (chat_id, liga) VALUES (?, ?)",
+                ((str(chat_id), liga) for liga in ligas_normalizadas),
+            )
+
+    def obtener(self, chat_id) -> Optional[Suscriptor]:
+        fila = self._conexion.execute(
+            "SELECT chat_id, hora_envio, zona_horaria, activo FROM suscriptores WHERE chat_id = ?",
+            (str(chat_id),),
+        ).fetchone()
+        if fila is None:
+            return None
+        ligas = {l for (l,) in self._conexion.execute(
+            "SELECT liga FROM suscriptor_ligas WHERE chat_id = ?", (str(chat_id),))}
+        return Suscriptor(fila[0], fila[1], fila[2], bool(fila[3]), ligas)
+
+    def zonas_horarias(self) -> List[str]:
+        """Zonas con suscriptores activos (usa el índice de envío)"""
+        return [z for (z,) in self._conexion.execute(
+            "SELECT DISTINCT zona_horaria FROM suscriptores WHERE activo = 1")]
+
+    def ligas_con_hora(self, zona_horaria: str, hora_envio: str) -> List[str]:
+        """Ligas elegidas por los chats de una zona y hora de envío"""
+        return [l for (l,) in self._conexion.execute(
+            """
+            SELECT DISTINCT l.liga
+            FROM suscriptores s JOIN suscriptor_ligas l ON l.chat_id = s.chat_id
+            WHERE s.activo = 1 AND s.zona_horaria = ? AND s.hora_envio = ?
+            """,
+            (zona_horaria, hora_envio),
+        )]
+
+    def iterar_chat_ids(self, hora_envio: str = None, zona_horaria: str = None, liga: str = None,
+                        sin_ligas: bool = False, lote: int = 1000) -> Iterator[str]:
+        """
+        Chats activos que cumplen los filtros, por lotes.
+        liga: solo chats que siguen esa liga. sin_ligas: solo chats sin preferencia de liga.
+        """
+        condiciones = ["s.activo = 1", "s.chat_id > ?"]
+        parametros: list = []
+        if zona_horaria is not None:
+            condiciones.append("s.zona_horaria = ?")
+            parametros.append(zona_horaria)
+        if hora_envio is not None:
+            condiciones.append("s.hora_envio = ?")
+            parametros.append(hora_envio)
+        if liga is not None:
+            condiciones.append("EXISTS (SELECT 1 FROM suscriptor_ligas l WHERE l.liga = ? AND l.chat_id = s.chat_id)")
+            parametros.append(self.normalizar_liga(liga))
+        if sin_ligas:
+            condiciones.append("NOT EXISTS (SELECT 1 FROM suscriptor_ligas l WHERE l.chat_id = s.chat_id)")
+
+        consulta = (f"SELECT s.chat_id FROM suscriptores s WHERE {' AND '.join(condiciones)} "
+                    f"ORDER BY s.chat_id LIMIT ?")
+        ultimo = ''
+        while True:
+            filas = self._conexion.execute(consulta, (ultimo, *parametros, lote)).fetchall()
+            for (chat_id,) in filas:
+                yield chat_id
+            if len(filas) < lote:
+                return
+            ultimo = filas[-1][0]
+
+    def contar(self, activos: bool = True) -> int:
+        consulta = "SELECT COUNT(*) FROM suscriptores" + (" WHERE activo = 1" if activos else "")
+        return self._conexion.execute(consulta).fetchone()[0]
+
+    def cerrar(self):
+        self._conexion.close()
@@ -0,0 +1,19 @@
+import unicodedata
+
+
+def sin_tildes(texto: str) -> str:
+    """
+    'Atlético' -> 'Atletico' (también ñ -> n); conserva mayúsculas, espacios y
+    letras de otros alfabetos ('Зенит' sigue siendo 'Зенит'): solo quita las
+    marcas diacríticas.
+    """
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+
+
+def normalizar(texto: str) -> str:
+    """
+    Minúsculas, sin tildes y con espacios simples. Es la única normalización de
+    texto del proyecto: ligas, índice, cambios, agregador y archivo comparan
+    equipos y ligas con ella para que todos vean el mismo nombre igual.
+    """
+    return ' '.join(sin_tildes(texto).lower().split())
@@ -0,0 +1,50 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+logger = logging.getLogger('ParrillaCronBot')
+
+T = TypeVar('T')
+
+
+class VueloUnico:
+    """
+    Agrupa consultas idénticas concurrentes (single-flight).
+
+    La primera llamada con una clave lanza la consulta; las que llegan mientras
+    sigue en curso esperan esa misma tarea y reciben el mismo resultado (o la
+    misma excepción), así una ráfaga de /hoy con la cache vencida provoca una
+    sola descarga y un solo parseo. El resultado es compartido: no modificarlo.
+
+    Si un solicitante se cancela (p. ej. un handler que expira) la consulta
+    sigue para los demás; al terminar la clave se libera y la siguiente
+    llamada vuelve a consultar.
+    """
+
+    def __init__(self):
+        self._en_vuelo: Dict[Hashable, asyncio.Task] = {}
+        self.consultas = 0   # consultas realmente lanzadas
+        self.agrupadas = 0   # llamadas que reutilizaron una consulta en curso
+
+    async def ejecutar(self, clave: Hashable, consulta: Callable[[], Awaitable[T]]) -> T:
+        tarea = self._en_vuelo.get(clave)
+        # Una tarea de otro event loop (p. ej. un asyncio.run anterior) no se puede esperar
+        if tarea is not None and not tarea.done() and tarea.get_loop() is asyncio.get_running_loop():
+            self.agrupadas += 1
+            logger.debug(f"🤝 Consulta {clave!r} en curso, se reutiliza")
+        else:
+            tarea = asyncio.ensure_future(consulta())
+            self._en_vuelo[clave] = tarea
+            self.consultas += 1
+            tarea.add_done_callback(lambda t: self._liberar(clave, t))
+        return await asyncio.shield(tarea)
+
+    def _liberar(self, clave: Hashable, tarea: asyncio.Task):
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        # Marcar la excepción como recuperada si todos los solicitantes se cancelaron
+        if not tarea.cancelled():
+            tarea.exception()
+
+    def en_vuelo(self) -> int:
+        return len(self._en_vuelo)
@@ -0,0 +1,307 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from servicios.metricas import Metricas, metricas
+
+logger = logging.getLogger('ParrillaCronBot')
+
+MAX_CUERPO = 1024 * 1024  # Telegram nunca envía updates tan grandes
+# Límites de las cabeceras (número y bytes en total, línea de petición incluida)
+MAX_CABECERAS = 100
+MAX_TAMANO_CABECERAS = 16 * 1024
+# Segundos para recibir una petición completa una vez empezada, y sin peticiones
+# antes de cerrar una conexión keep-alive
+TIEMPO_LECTURA = 10
+TIEMPO_INACTIVO = 30
+
+_RAZONES = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized', 404: 'Not Found',
+            405: 'Method Not Allowed', 408: 'Request Timeout', 413: 'Payload Too Large',
+            431: 'Request Header Fields Too Large', 503: 'Service Unavailable'}
+
+
+class PeticionInvalida(Exception):
+    """Petición HTTP mal formada; 'estado' es el código con el que se responde"""
+
+    def __init__(self, estado: int):
+        super().__init__(_RAZONES.get(estado, str(estado)))
+        self.estado = estado
+
+
+class MetricasCola:
+    """Contadores del servidor de webhook para ver la presión sobre la cola"""
+
+    def __init__(self):
+        self.recibidos = 0
+        self.encolados = 0
+        self.rechazados = 0   # cola llena: se respondió 503 y Telegram reintentará
+        self.invalidos = 0
+        self.procesados = 0
+        self.errores = 0
+        self.ocupacion_maxima = 0
+
+    def por_resultado(self):
+        return [({'resultado': nombre}, getattr(self, nombre))
+                for nombre in ('encolados', 'rechazados', 'invalidos', 'procesados', 'errores')]
+
+
+class ServidorWebhook:
+    """
+    Servidor HTTP asíncrono mínimo para recibir updates de Telegram.
+
+    El endpoint solo valida y encola: responde 200 en cuanto el update está en
+    una cola acotada y un grupo de workers lo procesa después. Si la cola está
+    llena durante 'espera_encolar' segundos se responde 503 y Telegram vuelve
+    a enviar el update más tarde (contrapresión en lugar de memoria sin límite).
+    Solo se aceptan updates con el secreto en X-Telegram-Bot-Api-Secret-Token,
+    que es obligatorio. GET /health sirve de sonda; las métricas (con la
+    ocupación de la cola) no se exponen aquí sino en el servidor de
+    servir_metricas, en otro puerto y solo en localhost por defecto.
+
+    Se usa asyncio.start_server directamente: el endpoint es tan pequeño que no
+    justifica un framework, y así comparte el event loop del bot. Como queda
+    expuesto, cada lectura tiene plazo: una petición empezada debe llegar
+    completa en 'tiempo_lectura' segundos (408 si no), una conexión keep-alive
+    se cierra tras 'tiempo_inactivo' segundos sin peticiones, y las cabeceras
+    están limitadas en número y tamaño (431).
+    """
+
+    def __init__(self, procesar: Callable[[Dict], Awaitable], host: str = '0.0.0.0', puerto: int = 10000,
+                 ruta: str = '/webhook', secreto: str = None, workers: int = 8, capacidad: int = 1000,
+                 espera_encolar: float = 0.5, registro: Metricas = None,
+                 tiempo_lectura: float = TIEMPO_LECTURA, tiempo_inactivo: float = TIEMPO_INACTIVO):
+        self.procesar = procesar
+        self.host = host
+        self.puerto = puerto
+        self.ruta = ruta
+        if not secreto:
+            raise ValueError("El webhook necesita un secreto: sin él cualquiera podría enviar updates falsos")
+        self.secreto = secreto
+        self.workers = max(1, workers)
+        self.espera_encolar = espera_encolar
+        self.tiempo_lectura = tiempo_lectura
+        self.tiempo_inactivo = tiempo_inactivo
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=capacidad)
+        self.metricas = MetricasCola()
+        self.registro = registro or metricas
+        self.registro.describir('parrilla_webhook_espera_segundos', 'Tiempo de un update en la cola hasta que lo toma un worker')
+        self.registro.registrar_medidor('parrilla_webhook_cola', self.cola.qsize, 'Updates esperando un worker')
+        self.registro.registrar_medidor('parrilla_webhook_cola_capacidad', lambda: self.cola.maxsize)
+        self.registro.registrar_medidor('parrilla_webhook_cola_maxima', lambda: self.metricas.ocupacion_maxima,
+                                        'Mayor ocupación de la cola observada')
+        self.registro.registrar_medidor('parrilla_webhook_workers', lambda: self.workers)
+        self.registro.registrar_medidor('parrilla_webhook_updates_total', self.metricas.por_resultado,
+                                        'Updates recibidos por resultado', tipo='counter')
+        self._servidor: Optional[asyncio.base_events.Server] = None
+        self._tareas = []
+
+    # === Ciclo de vida ===
+
+    async def iniciar(self):
+        self._tareas = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        # 'limit' acota cada línea: readline() falla con ValueError en vez de acumular sin fin
+        self._servidor = await asyncio.start_server(self._atender, self.host, self.puerto,
+                                                    limit=MAX_TAMANO_CABECERAS)
+        logger.info(f"🌐 Webhook escuchando en {self.host}:{self.puerto}{self.ruta} "
+                    f"({self.workers} workers, cola de {self.cola.maxsize})")
+
+    async def servir_siempre(self):
+        async with self._servidor:
+            await self._servidor.serve_forever()
+
+    async def detener(self, vaciar: float = 10):
+        """Deja de aceptar conexiones y espera hasta 'vaciar' segundos a que se procese la cola"""
+        if self._servidor is not None:
+            self._servidor.close()
+        try:
+            await asyncio.wait_for(self.cola.join(), timeout=vaciar)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Se descartan {self.cola.qsize()} updates sin procesar al detener el webhook")
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+
+    # === Workers ===
+
+    async def _worker(self):
+        while True:
+            datos, encolado_en = await self.cola.get()
+            self.registro.observar('parrilla_webhook_espera_segundos', time.monotonic() - encolado_en)
+            try:
+                with self.registro.medir('update'):
+                    await self.procesar(datos)
+                self.metricas.procesados += 1
+            except Exception as e:
+                self.metricas.errores += 1
+                logger.error(f"❌ Error procesando update {datos.get('update_id')}: {e}")
+            finally:
+                self.cola.task_done()
+
+    async def encolar(self, datos: Dict) -> bool:
+        """Encola un update; False si la cola siguió llena durante espera_encolar"""
+        elemento = (datos, time.monotonic())
+        try:
+            self.cola.put_nowait(elemento)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self.cola.put(elemento), timeout=self.espera_encolar)
+            except asyncio.TimeoutError:
+                self.metricas.rechazados += 1
+                return False
+        self.metricas.encolados += 1
+        self.metricas.ocupacion_maxima = max(self.metricas.ocupacion_maxima, self.cola.qsize())
+        return True
+
+    # === HTTP ===
+
+    async def _leer_peticion(self, reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        """Siguiente petición de la conexión; None si el cliente cerró o quedó inactiva"""
+        try:
+            linea = await asyncio.wait_for(reader.readline(), timeout=self.tiempo_inactivo)
+        except asyncio.TimeoutError:
+            return None
+        except ValueError:
+            raise PeticionInvalida(431)
+        if not linea:
+            return None
+        partes = linea.decode('latin-1').split()
+        if len(partes) != 3:
+            raise PeticionInvalida(400)
+        metodo, ruta, _ = partes
+        try:
+            cabeceras, cuerpo = await asyncio.wait_for(self._leer_resto(reader, len(linea)),
+                                                       timeout=self.tiempo_lectura)
+        except asyncio.TimeoutError:
+            raise PeticionInvalida(408)
+        return metodo, ruta.split('?', 1)[0], cabeceras, cuerpo
+
+    @staticmethod
+    async def _leer_resto(reader: asyncio.StreamReader, leido: int) -> Tuple[Dict[str, str], bytes]:
+        """Cabeceras y cuerpo de una petición cuya primera línea ocupó 'leido' bytes"""
+        cabeceras = {}
+        lineas = 0
+        while True:
+            try:
+                linea = await reader.readline()
+            except ValueError:
+                raise PeticionInvalida(431)
+            if linea in (b'\r\n', b'\n', b''):
+                break
+            lineas += 1
+            leido += len(linea)
+            if lineas > MAX_CABECERAS or leido > MAX_TAMANO_CABECERAS:
+                raise PeticionInvalida(431)
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            cabeceras[nombre.strip().lower()] = valor.strip()
+        try:
+            largo = int(cabeceras.get('content-length', 0))
+        except ValueError:
+            raise PeticionInvalida(400)
+        if largo > MAX_CUERPO:
+            raise PeticionInvalida(413)
+        try:
+            cuerpo = await reader.readexactly(largo) if largo else b''
+        except asyncio.IncompleteReadError:
+            raise PeticionInvalida(400)
+        return cabeceras, cuerpo
+
+    @staticmethod
+    def _responder(writer: asyncio.StreamWriter, estado: int, cuerpo: bytes = b'',
+                   tipo: str = 'text/plain', extra: Dict[str, str] = None):
+        cabeceras = [f"HTTP/1.1 {estado} {_RAZONES.get(estado, '')}",
+                     f"Content-Type: {tipo}", f"Content-Length: {len(cuerpo)}"]
+        cabeceras += [f"{k}: {v}" for k, v in (extra or {}).items()]
+        writer.write(('\r\n'.join(cabeceras) + '\r\n\r\n').encode('latin-1') + cuerpo)
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Una conexión (keep-alive): atiende peticiones hasta que el cliente cierra o queda inactiva"""
+        try:
+            while True:
+                try:
+                    peticion = await self._leer_peticion(reader)
+                except PeticionInvalida as e:
+                    self._responder(writer, e.estado, extra={'Connection': 'close'})
+                    await writer.drain()
+                    break
+                if peticion is None:
+                    break
+                metodo, ruta, cabeceras, cuerpo = peticion
+                await self._despachar(writer, metodo, ruta, cabeceras, cuerpo)
+                await writer.drain()
+                if cabeceras.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def _despachar(self, writer: asyncio.StreamWriter, metodo: str, ruta: str,
+                         cabeceras: Dict[str, str], cuerpo: bytes):
+        if ruta == '/health':
+            self._responder(writer, 200, b'ok')
+            return
+        if ruta != self.ruta:
+            self._responder(writer, 404)
+            return
+        if metodo != 'POST':
+            self._responder(writer, 405)
+            return
+
+        self.metricas.recibidos += 1
+        if cabeceras.get('x-telegram-bot-api-secret-token') != self.secreto:
+            self.metricas.invalidos += 1
+            self._responder(writer, 401)
+            return
+        try:
+            datos = json.loads(cuerpo)
+            if not isinstance(datos, dict):
+                raise ValueError('se esperaba un objeto')
+        except ValueError:
+            self.metricas.invalidos += 1
+            self._responder(writer, 400)
+            return
+
+        if await self.encolar(datos):
+            self._responder(writer, 200)
+        else:
+            self._responder(writer, 503, extra={'Retry-After': '1'})
+
+
+async def simular_telegram(url: str, cantidad: int = 100, concurrencia: int = 10, secreto: str = None,
+                           texto: str = '/status', chat_id: int = 1) -> Dict[str, object]:
+    """
+    Cliente falso de Telegram para pruebas locales: envía 'cantidad' updates de
+    mensaje al webhook con 'concurrencia' conexiones y resume las respuestas.
+    """
+    import httpx
+
+    cabeceras = {'X-Telegram-Bot-Api-Secret-Token': secreto} if secreto else {}
+    estados: Dict[int, int] = {}
+    siguiente = iter(range(1, cantidad + 1))
+
+    async def enviar(cliente: httpx.AsyncClient):
+        for update_id in siguiente:
+            update = {
+                'update_id': update_id,
+                'message': {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'from': {'id': chat_id, 'is_bot': False, 'first_name': 'Prueba'},
+                    'text': texto,
+                },
+            }
+            try:
+                respuesta = await cliente.post(url, json=update, headers=cabeceras)
+                estados[respuesta.status_code] = estados.get(respuesta.status_code, 0) + 1
+            except httpx.HTTPError:
+                estados[0] = estados.get(0, 0) + 1
+
+    inicio = time.monotonic()
+    async with httpx.AsyncClient(timeout=10) as cliente:
+        await asyncio.gather(*(enviar(cliente) for _ in range(concurrencia)))
+    duracion = time.monotonic() - inicio
+    return {'enviados': cantidad, 'estados': estados, 'duracion': round(duracion, 2),
+            'updates_por_segundo': round(cantidad / duracion, 1) if duracion else None}
@@ -0,0 +1,6 @@
+@echo off
+echo ⏱️ Benchmarks offline del Bot de Partidos
+echo ==========================================
+cd /d "%~dp0.."
+python benchmarks/bench_parrilla.py %*
+pause
@@ -0,0 +1,6 @@
+@echo off
+echo 🌐 Iniciando Bot de Partidos - Modo Webhook
+echo ==========================================
+cd /d "%~dp0"
+python src/bot_local.py webhook
+pause
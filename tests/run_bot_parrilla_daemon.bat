@@ -0,0 +1,6 @@
+@echo off
+echo 🕰️ Iniciando Bot de Partidos - Modo Daemon
+echo ==========================================
+cd /d "%~dp0"
+python src/bot_parrilla.py daemon
+pause